@@ -0,0 +1,152 @@
+# ⚙️ App-Konfiguration als prozessweiter Snapshot
+# Write-through bei Admin-Updates, Verteilung an andere Worker per Pub/Sub
+# (Capped Collection + Tailable Cursor) und App-Icon als eigenes Static Asset
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import CursorType
+
+# Eindeutige ID dieses Worker-Prozesses (eigene Events werden ignoriert)
+WORKER_ID = str(uuid.uuid4())
+
+EVENTS_COLLECTION = "app_config_events"
+EVENTS_COLLECTION_SIZE = 1024 * 1024  # 1 MB Ringpuffer
+
+ICON_ROUTE = "/api/app/icon/"
+ICON_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/svg+xml": "svg",
+}
+
+
+def _sniff_media_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data.startswith(b"GIF8"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def decode_icon(value: Optional[str]):
+    """base64 / data-URI in (Bytes, Media-Type) umwandeln - None wenn kein Bild"""
+    if not value:
+        return None
+    media_type = None
+    payload = value
+    if value.startswith("data:"):
+        header, _, payload = value.partition(",")
+        if ";base64" not in header:
+            return None
+        media_type = header[5:].split(";")[0] or None
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return data, media_type or _sniff_media_type(data)
+
+
+class AppConfigStore:
+    """Aktueller Stand der App-Konfiguration (ohne base64-Icon im Antwort-Dict)"""
+
+    def __init__(self):
+        self.config: Optional[Dict[str, Any]] = None
+        self.icon: Optional[bytes] = None
+        self.icon_media_type: Optional[str] = None
+        self.icon_file: Optional[str] = None
+
+    def clear(self):
+        self.config = self.icon = self.icon_media_type = self.icon_file = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.config is not None
+
+    def set(self, doc: Dict[str, Any]):
+        config = {k: v for k, v in doc.items() if k != "_id"}
+        icon = decode_icon(config.get("app_icon"))
+        if icon is None:
+            self.icon = self.icon_media_type = self.icon_file = None
+        else:
+            self.icon, self.icon_media_type = icon
+            digest = hashlib.sha256(self.icon).hexdigest()[:16]
+            self.icon_file = f"{digest}.{_EXTENSIONS.get(self.icon_media_type, 'bin')}"
+            config["app_icon"] = None
+        self.config = config
+
+    def icon_url(self, base_url: str) -> Optional[str]:
+        if self.icon_file is None:
+            return None
+        return f"{base_url.rstrip('/')}{ICON_ROUTE}{self.icon_file}"
+
+    def is_icon_url(self, value: Optional[str]) -> bool:
+        """Erkennt, ob ein Client die ausgelieferte Icon-URL unverändert zurückschickt"""
+        return bool(value and self.icon_file and value.endswith(ICON_ROUTE + self.icon_file))
+
+    def public(self, base_url: str) -> Dict[str, Any]:
+        """Konfiguration für Clients - app_icon zeigt auf die Icon-URL"""
+        config = dict(self.config)
+        if self.icon_file is not None:
+            config["app_icon"] = self.icon_url(base_url)
+        return config
+
+    async def reload(self, db):
+        doc = await db.app_config.find_one()
+        if doc is not None:
+            self.set(doc)
+        return doc
+
+
+# ================================================
+# PUB/SUB ZWISCHEN WORKERN
+# ================================================
+
+async def ensure_events_collection(db):
+    """Capped Collection für Konfigurations-Events anlegen (falls noch nicht vorhanden)"""
+    if EVENTS_COLLECTION not in await db.list_collection_names():
+        await db.create_collection(EVENTS_COLLECTION, capped=True, size=EVENTS_COLLECTION_SIZE)
+
+
+async def publish_change(db, config_id: str):
+    await db[EVENTS_COLLECTION].insert_one({
+        "worker": WORKER_ID,
+        "config_id": config_id,
+        "timestamp": datetime.utcnow(),
+    })
+
+
+async def listen_for_changes(db, on_change: Callable[[], Awaitable[None]], retry_delay: float = 5.0):
+    """Tailable Cursor auf die Event-Collection - ruft on_change für fremde Updates auf"""
+    since = datetime.utcnow()
+    while True:
+        try:
+            await ensure_events_collection(db)
+            cursor = db[EVENTS_COLLECTION].find(
+                {"timestamp": {"$gt": since}},
+                cursor_type=CursorType.TAILABLE_AWAIT,
+            )
+            while cursor.alive:
+                async for event in cursor:
+                    since = event["timestamp"]
+                    if event.get("worker") != WORKER_ID:
+                        await on_change()
+                await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ App-Config Listener Fehler: {e}")
+        await asyncio.sleep(retry_delay)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Stadtwache - Kompressions-Benchmark für API-Antworten
+Misst für realistische Listen (Benutzer, Vorfälle, Berichte, Berichtsordner) je Verfahren
+und Stufe die CPU-Zeit und die eingesparten Bytes. Grundlage für die Standardwerte in
+response_compression.py (COMPRESSION_*_LEVEL, COMPRESSION_MIN_BYTES, COMPRESSION_THREAD_MIN_BYTES).
+
+Aufruf: python bench_compression.py
+"""
+
+import base64
+import calendar
+import os
+import random
+import time
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+from fast_json import dumps
+from response_compression import (
+    COMPRESSION_MIN_BYTES, COMPRESSION_THREAD_MIN_BYTES, available_encodings, compress
+)
+
+SIZES = (100, 500, 1000)
+REPEAT = 5
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 6, 11), "zstd": (1, 3, 9, 19)}
+
+STATUSES = ("Im Dienst", "Pause", "Einsatz", "Streife", "Nicht verfügbar")
+STREETS = ("Hauptstraße", "Bahnhofstraße", "Kölner Straße", "Untermauerstraße", "Römerstraße")
+PHRASES = (
+    "Laute Musik im Hinterhof, Anwohner beschweren sich.",
+    "Verkehrsunfall mit Sachschaden, keine Verletzten.",
+    "Fahrrad vor dem Supermarkt entwendet, Täter flüchtig.",
+    "Ruhestörung durch Feiernde im Stadtpark.",
+    "Falschparker blockiert Feuerwehrzufahrt.",
+)
+
+
+def _photo(size=6000):
+    # Profilfotos sind base64-kodierte JPEGs - praktisch nicht weiter komprimierbar
+    return "data:image/jpeg;base64," + base64.b64encode(os.urandom(size)).decode()
+
+
+def make_users(count, rng):
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "email": f"beamter{i}@stadtwache.de",
+            "username": f"Beamter {i}",
+            "role": "police" if i % 10 else "admin",
+            "badge_number": f"SW-{1000 + i}",
+            "department": "Streifendienst",
+            "phone": f"+49 2336 {rng.randint(100000, 999999)}",
+            "service_number": f"{rng.randint(10000, 99999)}",
+            "rank": rng.choice(("Polizeimeister", "Polizeiobermeister", "Kommissar")),
+            "status": rng.choice(STATUSES),
+            # Jeder fünfte Benutzer mit Foto
+            "photo": _photo() if i % 5 == 0 else None,
+            "is_active": True,
+            "notification_sound": "default",
+            "vibration_pattern": "standard",
+            "battery_saver_mode": False,
+            "check_in_interval": 30,
+            "assigned_district": f"Bezirk {i % 8}",
+            "patrol_team": f"Team {i % 12}",
+            "last_check_in": now - timedelta(minutes=rng.randint(0, 90)),
+            "missed_check_ins": rng.randint(0, 3),
+            "created_at": now - timedelta(days=i),
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def make_incidents(count, rng):
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"{rng.choice(PHRASES).split(',')[0]} ({i})",
+            "description": " ".join(rng.choice(PHRASES) for _ in range(3)),
+            "priority": rng.choice(("high", "medium", "low")),
+            "status": rng.choice(("open", "in_progress", "closed")),
+            "location": {"lat": 51.2879 + rng.random() / 100, "lng": 7.2954 + rng.random() / 100},
+            "address": f"{rng.choice(STREETS)} {rng.randint(1, 120)}, 58332 Schwelm",
+            "reported_by": str(uuid.uuid4()),
+            "assigned_to": None,
+            "assigned_to_name": None,
+            "assigned_at": None,
+            "images": [],
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now - timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def make_reports(count, rng):
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Schichtbericht {(now - timedelta(days=i)).strftime('%d.%m.%Y')}",
+            "content": "\n".join(rng.choice(PHRASES) for _ in range(12)),
+            "author_id": str(uuid.uuid4()),
+            "author_name": f"Beamter {i % 40}",
+            "shift_date": (now - timedelta(days=i)).strftime("%Y-%m-%d"),
+            "images": [],
+            "created_at": now - timedelta(days=i),
+            "updated_at": now - timedelta(days=i),
+            "status": rng.choice(("draft", "submitted", "reviewed")),
+            "last_edited_by": None,
+            "last_edited_by_name": None,
+            "revision_count": rng.randint(0, 4),
+        }
+        for i in range(count)
+    ]
+
+
+def make_report_folders(rng):
+    # Ordnerindex: ein Eintrag pro Monat - typischerweise unter der Mindestgröße
+    year = datetime.utcnow().year
+    return [
+        {"path": f"Berichte/{year - m // 12}/{calendar.month_name[12 - m % 12]}", "year": year - m // 12,
+         "month": 12 - m % 12, "count": rng.randint(20, 200)}
+        for m in range(24)
+    ]
+
+
+def payloads():
+    rng = random.Random(42)
+    yield "report-folders", dumps(make_report_folders(rng))
+    for size in SIZES:
+        yield f"users x{size}", dumps(make_users(size, rng))
+        yield f"incidents x{size}", dumps(make_incidents(size, rng))
+        yield f"reports x{size}", dumps(make_reports(size, rng))
+
+
+def main():
+    encodings = available_encodings(LEVELS)
+    print(f"🗜️ Kompression von API-Antworten (beste von {REPEAT} Läufen, Verfahren: {', '.join(encodings)})")
+    print(f"   Mindestgröße {COMPRESSION_MIN_BYTES} B, Thread-Pool ab {COMPRESSION_THREAD_MIN_BYTES // 1024} KB")
+    for name, body in payloads():
+        note = "unter Mindestgröße - bleibt unkomprimiert" if len(body) < COMPRESSION_MIN_BYTES else (
+            "Thread-Pool" if len(body) >= COMPRESSION_THREAD_MIN_BYTES else "Event-Loop")
+        print(f"\n=== {name}: {len(body) / 1024:.1f} KB ({note}) ===")
+        print(f"{'Verfahren':<10} {'komprimiert':>12} {'gespart':>8} {'CPU (ms)':>9} {'MB/s':>8} {'KB gespart/ms':>14}")
+        for encoding in encodings:
+            for level in LEVELS[encoding]:
+                encoded = compress(encoding, body, level)
+                seconds = min(timeit.repeat(lambda: compress(encoding, body, level), number=1, repeat=REPEAT,
+                                            timer=time.process_time))
+                saved = len(body) - len(encoded)
+                milliseconds = max(seconds * 1000, 0.001)
+                print(f"{encoding + ' ' + str(level):<10} {len(encoded) / 1024:>10.1f}KB {saved / len(body):>7.0%} "
+                      f"{milliseconds:>9.2f} {len(body) / 1e6 / (milliseconds / 1000):>8.0f} "
+                      f"{saved / 1024 / milliseconds:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
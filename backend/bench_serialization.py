@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Stadtwache - Serialisierungs-Microbenchmark
+Vergleicht den alten Antwortpfad (serialize_mongo_data + Pydantic + response_model)
+mit dem schnellen Pfad (Projektion + orjson) für Listen mit 100 bis 1.000 Dokumenten.
+
+Aufruf: python bench_serialization.py
+"""
+
+import json
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from fast_json import dumps, with_defaults
+from server import Incident, INCIDENT_DEFAULTS, serialize_mongo_data
+
+SIZES = (100, 250, 500, 1000)
+REPEAT = 5
+
+
+def make_incident_docs(count):
+    """Synthetische Vorfälle, wie sie aus MongoDB kommen (inkl. _id)"""
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "title": f"Ruhestörung {i}",
+            "description": "Laute Musik im Hinterhof, Anwohner beschweren sich. " * 3,
+            "priority": ("high", "medium", "low")[i % 3],
+            "status": "open",
+            "location": {"lat": 51.2879 + i * 1e-4, "lng": 7.2954 - i * 1e-4},
+            "address": f"Hauptstraße {i}, 58332 Schwelm",
+            "reported_by": "Administrator",
+            "assigned_to": None,
+            "images": [],
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now - timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_path(docs):
+    models = [Incident(**doc) for doc in serialize_mongo_data(docs)]
+    # FastAPI: response_model-Validierung + jsonable_encoder + json.dumps
+    validated = [Incident.model_validate(model.model_dump()) for model in models]
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def fast_path(docs):
+    # Die Projektion verwirft _id bereits in der Query
+    projected = [{k: v for k, v in doc.items() if k != "_id"} for doc in docs]
+    return dumps(with_defaults(projected, INCIDENT_DEFAULTS))
+
+
+def main():
+    print("📊 Serialisierung von Vorfall-Listen (beste von %d Läufen)" % REPEAT)
+    print(f"{'Dokumente':>10} {'alt (ms)':>10} {'neu (ms)':>10} {'Faktor':>8}")
+    for size in SIZES:
+        docs = make_incident_docs(size)
+        assert json.loads(legacy_path(docs)) == json.loads(fast_path(docs))
+        legacy = min(timeit.repeat(lambda: legacy_path(docs), number=1, repeat=REPEAT))
+        fast = min(timeit.repeat(lambda: fast_path(docs), number=1, repeat=REPEAT))
+        print(f"{size:>10} {legacy * 1000:>10.2f} {fast * 1000:>10.2f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# 📥 Massen-Import (CSV / NDJSON) für Personen und Benutzer
+# Der Request-Body wird gestreamt gelesen, in Chunks validiert und per
+# unordered insert_many geschrieben - Fehler werden pro Zeile gemeldet.
+
+import asyncio
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+# Zeilen pro Validierungs- und Insert-Chunk
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+# Es werden nur die ersten Fehler zurückgegeben, gezählt werden alle
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# bcrypt gibt den GIL während des Hashens frei - Threads reichen für echte Parallelität
+hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="bcrypt")
+
+Row = Tuple[int, Any]  # (Zeilennummer, Datensatz oder Fehler)
+
+
+class ImportResult:
+    def __init__(self):
+        self.total = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def detect_format(content_type: Optional[str], explicit: Optional[str] = None) -> str:
+    if explicit:
+        return explicit
+    return "csv" if content_type and "csv" in content_type else "ndjson"
+
+
+async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Body-Chunks in Zeilen zerlegen (UTF-8, BOM wird entfernt)"""
+    pending = b""
+    first = True
+    async for chunk in body:
+        if first:
+            chunk = chunk.removeprefix(b"\xef\xbb\xbf")
+            first = False
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            yield line.decode("utf-8", errors="replace").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def iter_rows(body: AsyncIterator[bytes], import_format: str) -> AsyncIterator[Row]:
+    """Datensätze aus dem gestreamten Body - Zeilennummern wie in der Datei"""
+    if import_format == "ndjson":
+        line_number = 0
+        async for line in _lines(body):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield line_number, ValueError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield line_number, ValueError("Expected a JSON object")
+                continue
+            yield line_number, record
+        return
+
+    header = None
+    record_lines: List[str] = []
+    line_number = start_line = 0
+    async for line in _lines(body):
+        line_number += 1
+        if not record_lines:
+            start_line = line_number
+        record_lines.append(line)
+        # Zeilenumbrüche in Anführungszeichen gehören noch zum Datensatz
+        if sum(part.count('"') for part in record_lines) % 2:
+            continue
+        text = "\n".join(record_lines)
+        record_lines = []
+        if not text.strip():
+            continue
+        values = next(csv.reader(io.StringIO(text)))
+        if header is None:
+            header = [column.strip() for column in values]
+            continue
+        if len(values) != len(header):
+            yield start_line, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield start_line, dict(zip(header, values))
+    if record_lines:
+        yield start_line, ValueError("Unterminated quoted field")
+
+
+def _clean(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Leere CSV-Felder weglassen, damit Modell-Defaults greifen"""
+    return {key: value for key, value in record.items() if value is not None and value != ""}
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+
+async def hash_passwords(passwords: List[str], hasher: Callable[[str], str]) -> List[str]:
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(loop.run_in_executor(hash_pool, hasher, password) for password in passwords))
+
+
+PrepareChunk = Callable[[List[Tuple[int, BaseModel]], ImportResult], Awaitable[List[Tuple[int, Dict[str, Any]]]]]
+
+
+async def run_import(rows: AsyncIterator[Row], model: type, prepare: PrepareChunk, collection,
+                     on_inserted: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None) -> ImportResult:
+    """Zeilen validieren, chunkweise vorbereiten (prepare) und unordered einfügen"""
+    result = ImportResult()
+    chunk: List[Tuple[int, BaseModel]] = []
+
+    async def flush():
+        docs = await prepare(chunk, result)
+        chunk.clear()
+        if not docs:
+            return
+        failed_rows = set()
+        try:
+            await collection.insert_many([doc for _, doc in docs], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                row = docs[write_error["index"]][0]
+                failed_rows.add(row)
+                message = "Duplicate key" if write_error.get("code") == 11000 else write_error.get("errmsg", "Write error")
+                result.add_error(row, message)
+        inserted = [doc for row, doc in docs if row not in failed_rows]
+        result.imported += len(inserted)
+        if on_inserted and inserted:
+            await on_inserted(inserted)
+
+    async for row_number, record in rows:
+        result.total += 1
+        if isinstance(record, Exception):
+            result.add_error(row_number, str(record))
+            continue
+        try:
+            chunk.append((row_number, model(**_clean(record))))
+        except ValidationError as e:
+            result.add_error(row_number, _validation_message(e))
+            continue
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await flush()
+    if chunk:
+        await flush()
+    return result
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Stadtwache - Import-Budget für den Kaltstart
+Importiert server.py in frischen Interpretern und prüft:
+  - Import-Zeit von server (kumuliert, bestes von mehreren Läufen) unter dem Budget
+  - keine Ausgaben und kein Netzwerk/DNS beim Import (mongodb+srv auf eine .invalid-Domain)
+  - schwere Module (SQLAlchemy, Motor, pandas, numpy, boto3) werden nicht geladen
+
+Aufruf: python check_import_time.py [budget_ms]   (Standard: IMPORT_BUDGET_MS oder 1000)
+Exit-Code 1 bei Verstoß. Dieselben Prüfungen laufen mit pytest (tests/test_import_time.py).
+"""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+RUNS = 3
+TOP = 10
+# Dürfen erst im Lifespan-Startup bzw. beim ersten Zugriff geladen werden
+FORBIDDEN_MODULES = ("sqlalchemy", "motor.motor_asyncio", "pandas", "numpy", "boto3")
+
+PROBE = f"""
+import sys
+import server
+loaded = [name for name in {FORBIDDEN_MODULES!r} if name in sys.modules]
+sys.stderr.write("FORBIDDEN:" + ",".join(loaded) + "\\n")
+"""
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def run_probe(database_type: str):
+    env = {
+        **os.environ,
+        "DATABASE_TYPE": database_type,
+        # Jede DNS-Auflösung beim Import würde hier mit einem Fehler abbrechen
+        "MONGO_URL": "mongodb+srv://cold-start-check.invalid/stadtwache_db",
+        "SQLITE_DB": "/nonexistent/cold-start-check.db",
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    modules = {}
+    forbidden = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+        elif line.startswith("FORBIDDEN:"):
+            forbidden = [name for name in line[len("FORBIDDEN:"):].split(",") if name]
+    return result, modules, forbidden
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+    failures = []
+
+    for database_type in ("mongodb", "sqlite"):
+        best = None
+        for _ in range(RUNS):
+            result, modules, forbidden = run_probe(database_type)
+            if result.returncode != 0:
+                failures.append(f"{database_type}: Import fehlgeschlagen\n{result.stderr[-2000:]}")
+                break
+            if best is None or modules["server"][1] < best[1]["server"][1]:
+                best = (result, modules, forbidden)
+        if best is None:
+            continue
+
+        result, modules, forbidden = best
+        server_ms = modules["server"][1] / 1000
+        print(f"\n=== DATABASE_TYPE={database_type}: import server {server_ms:.0f} ms (Budget {budget_ms:.0f} ms) ===")
+        print(f"{'Modul':<45} {'selbst':>10} {'kumuliert':>10}")
+        for name, (own, cumulative) in sorted(modules.items(), key=lambda item: -item[1][0])[:TOP]:
+            print(f"{name:<45} {own / 1000:>8.1f}ms {cumulative / 1000:>8.1f}ms")
+
+        if server_ms > budget_ms:
+            failures.append(f"{database_type}: {server_ms:.0f} ms > Budget {budget_ms:.0f} ms")
+        if forbidden:
+            failures.append(f"{database_type}: beim Import geladen: {', '.join(forbidden)}")
+        if result.stdout.strip():
+            failures.append(f"{database_type}: Ausgaben beim Import:\n{result.stdout.strip()}")
+
+    if failures:
+        print("\n❌ Import-Budget verletzt:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Import-Budget eingehalten")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# 📊 Tages-Rollups der Check-Ins pro Benutzer (Collection checkin_rollups)
+# Wird bei jedem Check-In inkrementell gepflegt - Anwesenheits-Auswertungen
+# lesen nur die Rollups eines Monats statt aller Check-In-Dokumente.
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+ROLLUP_COLLECTION = "checkin_rollups"
+
+
+def day_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d")
+
+
+def month_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m")
+
+
+async def ensure_indexes(db):
+    # Unique: parallele Upserts desselben Tages landen im selben Dokument
+    await db[ROLLUP_COLLECTION].create_index([("user_id", 1), ("day", 1)], unique=True)
+    await db[ROLLUP_COLLECTION].create_index([("month", 1), ("user_id", 1)])
+    # rebuild() sortiert die komplette Historie nach (user_id, timestamp) - ohne Index ein In-Memory-Sort
+    await db.checkins.create_index([("user_id", 1), ("timestamp", 1)])
+
+
+def _rollup_update(user_id: str, user_name: Optional[str], moment: datetime,
+                   gap_seconds: Optional[float], late: bool) -> Dict[str, Any]:
+    gap = gap_seconds or 0
+    update: Dict[str, Any] = {
+        "$setOnInsert": {"user_id": user_id, "day": day_key(moment), "month": month_key(moment)},
+        "$set": {"user_name": user_name},
+        "$min": {"first_check_in": moment},
+        "$max": {"last_check_in": moment, "max_gap_seconds": gap},
+        "$inc": {"count": 1, "total_gap_seconds": gap, "late_check_ins": 1 if late else 0},
+    }
+    return update
+
+
+def _gap(previous: Optional[datetime], moment: datetime) -> Optional[float]:
+    """Abstand zum vorherigen Check-In - nur innerhalb desselben Tages"""
+    if previous is None or previous > moment or day_key(previous) != day_key(moment):
+        return None
+    return (moment - previous).total_seconds()
+
+
+async def record_check_in(db, user_id: str, user_name: Optional[str], moment: datetime,
+                          previous: Optional[datetime], interval_minutes: Optional[int]):
+    """Rollup des Tages fortschreiben (ein Upsert pro Check-In)"""
+    gap = _gap(previous, moment)
+    late = bool(gap and interval_minutes and gap > interval_minutes * 60)
+    await db[ROLLUP_COLLECTION].update_one(
+        {"user_id": user_id, "day": day_key(moment)},
+        _rollup_update(user_id, user_name, moment, gap, late),
+        upsert=True
+    )
+
+
+async def record_missed(db, user_id: str, user_name: Optional[str], moment: datetime):
+    await db[ROLLUP_COLLECTION].update_one(
+        {"user_id": user_id, "day": day_key(moment)},
+        {
+            "$setOnInsert": {"user_id": user_id, "day": day_key(moment), "month": month_key(moment), "count": 0},
+            "$set": {"user_name": user_name},
+            "$inc": {"missed_check_ins": 1},
+        },
+        upsert=True
+    )
+
+
+async def monthly_attendance(db, month: str, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Monatsübersicht pro Benutzer - eine Aggregation über den Index (month, user_id)"""
+    match: Dict[str, Any] = {"month": month}
+    if user_id:
+        match["user_id"] = user_id
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": "$user_id",
+            "user_name": {"$last": "$user_name"},
+            "days_present": {"$sum": {"$cond": [{"$gt": ["$count", 0]}, 1, 0]}},
+            "check_ins": {"$sum": "$count"},
+            "late_check_ins": {"$sum": "$late_check_ins"},
+            "missed_check_ins": {"$sum": "$missed_check_ins"},
+            "max_gap_seconds": {"$max": "$max_gap_seconds"},
+            "total_gap_seconds": {"$sum": "$total_gap_seconds"},
+            "first_check_in": {"$min": "$first_check_in"},
+            "last_check_in": {"$max": "$last_check_in"},
+        }},
+        {"$sort": {"user_name": 1}},
+    ]
+    if db.is_mongo:
+        rows = await db[ROLLUP_COLLECTION].aggregate(pipeline).to_list(None)
+    else:
+        # aggregate gibt es nur mit MongoDB
+        rows = _group_in_python(await db[ROLLUP_COLLECTION].find(match).to_list(None))
+    results = []
+    for row in rows:
+        # Lücken gibt es nur zwischen Check-Ins desselben Tages
+        gaps = row["check_ins"] - row["days_present"]
+        results.append({
+            "user_id": row.pop("_id"),
+            **row,
+            "max_gap_seconds": row.get("max_gap_seconds") or 0,
+            "total_gap_seconds": row.get("total_gap_seconds") or 0,
+            "late_check_ins": row.get("late_check_ins") or 0,
+            "missed_check_ins": row.get("missed_check_ins") or 0,
+            "avg_gap_seconds": round((row.get("total_gap_seconds") or 0) / gaps, 1) if gaps > 0 else None,
+        })
+    return results
+
+
+def _group_in_python(rollups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """$group/$sort der Monatsübersicht für SQL-Backends"""
+    groups: Dict[str, Dict[str, Any]] = {}
+    for rollup in rollups:
+        row = groups.setdefault(rollup["user_id"], {
+            "_id": rollup["user_id"], "days_present": 0, "check_ins": 0, "late_check_ins": 0,
+            "missed_check_ins": 0, "max_gap_seconds": None, "total_gap_seconds": 0,
+            "first_check_in": None, "last_check_in": None,
+        })
+        row["user_name"] = rollup.get("user_name")
+        row["days_present"] += 1 if rollup.get("count", 0) > 0 else 0
+        for field in ("check_ins", "late_check_ins", "missed_check_ins", "total_gap_seconds"):
+            row[field] += rollup.get("count" if field == "check_ins" else field) or 0
+        for field, pick in (("max_gap_seconds", max), ("first_check_in", min), ("last_check_in", max)):
+            value = rollup.get(field)
+            if value is not None:
+                row[field] = value if row[field] is None else pick(row[field], value)
+    return sorted(groups.values(), key=lambda row: row.get("user_name") or "")
+
+
+async def daily_attendance(db, user_id: str, month: str) -> List[Dict[str, Any]]:
+    return await db[ROLLUP_COLLECTION].find(
+        {"user_id": user_id, "month": month}, {"_id": 0}
+    ).sort("day", 1).to_list(31)
+
+
+async def rebuild(db, since: Optional[datetime] = None, batch_size: int = 1000) -> int:
+    """Rollups aus den Check-In-Dokumenten neu berechnen (einmalig für Altdaten)"""
+    query: Dict[str, Any] = {}
+    scope: Dict[str, Any] = {}
+    if since:
+        query["timestamp"] = {"$gte": since}
+        scope["day"] = {"$gte": day_key(since)}
+    # Check-In-Werte zurücksetzen - verpasste Check-Ins stehen nur im Rollup und bleiben erhalten
+    await db[ROLLUP_COLLECTION].update_many(scope, {
+        "$set": {"count": 0, "total_gap_seconds": 0, "max_gap_seconds": 0, "late_check_ins": 0},
+        "$unset": {"first_check_in": "", "last_check_in": ""},
+    })
+
+    intervals = {
+        user["id"]: user.get("check_in_interval")
+        async for user in db.users.find({}, {"_id": 0, "id": 1, "check_in_interval": 1})
+    }
+    collection = db[ROLLUP_COLLECTION]
+    previous: Dict[str, datetime] = {}
+    operations = []
+    count = 0
+    cursor = db.checkins.find(query, {"_id": 0, "user_id": 1, "user_name": 1, "timestamp": 1}) \
+        .sort([("user_id", 1), ("timestamp", 1)])
+    async for checkin in cursor:
+        moment = checkin.get("timestamp")
+        if not isinstance(moment, datetime) or not checkin.get("user_id"):
+            continue
+        user_id = checkin["user_id"]
+        gap = _gap(previous.get(user_id), moment)
+        interval = intervals.get(user_id)
+        late = bool(gap and interval and gap > interval * 60)
+        previous[user_id] = moment
+        operations.append((
+            {"user_id": user_id, "day": day_key(moment)},
+            _rollup_update(user_id, checkin.get("user_name"), moment, gap, late)
+        ))
+        count += 1
+        if len(operations) >= batch_size:
+            await _write_batch(collection, operations)
+            operations = []
+    if operations:
+        await _write_batch(collection, operations)
+    return count
+
+
+async def _write_batch(collection, operations: List[Tuple[Dict[str, Any], Dict[str, Any]]]):
+    await collection.bulk_write([UpdateOne(query, update, upsert=True) for query, update in operations], ordered=True)
@@ -0,0 +1,129 @@
+# ⏰ Überwachung verpasster Check-Ins
+# Priority-Queue (Heap) mit der nächsten Check-In-Frist pro Beamten im Dienst.
+# Einfügen/Aktualisieren O(log n), der Scheduler schläft bis zur nächsten Frist.
+
+import asyncio
+import heapq
+import itertools
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Stati, in denen Check-Ins erwartet werden
+ON_DUTY_STATUSES = ("Im Dienst", "Einsatz", "Streife")
+
+DEFAULT_INTERVAL_MINUTES = 30
+# Kulanz nach Ablauf der Frist, bevor eskaliert wird
+CHECK_IN_GRACE_SECONDS = int(os.getenv("CHECK_IN_GRACE_SECONDS", "60"))
+# Beim Start nur Beamte mit Check-In in diesem Zeitraum übernehmen
+CHECK_IN_SEED_HOURS = int(os.getenv("CHECK_IN_SEED_HOURS", "12"))
+
+
+def as_stored(moment: datetime) -> datetime:
+    """Auf Millisekunden kürzen wie MongoDB - Fristen im Speicher und in der DB stimmen exakt überein"""
+    return moment.replace(microsecond=moment.microsecond // 1000 * 1000)
+
+
+def missed_filter(user_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Filter für das Zählen einer verpassten Frist: im Dienst, seitdem kein Check-In, noch nicht gezählt"""
+    return {
+        "id": user_id,
+        "status": {"$in": list(ON_DUTY_STATUSES)},
+        # Dienstbeginn ohne jeden Check-In: last_check_in ist null oder fehlt (null trifft beides)
+        "$or": [{"last_check_in": {"$lte": entry["last_check_in"]}}, {"last_check_in": None}],
+        "missed_check_in_deadline": {"$ne": entry["deadline"]},
+    }
+
+
+class CheckInWatch:
+    """Nächste Frist pro Benutzer - veraltete Heap-Einträge werden beim Entnehmen verworfen"""
+
+    def __init__(self, grace_seconds: int = CHECK_IN_GRACE_SECONDS):
+        self.grace = timedelta(seconds=grace_seconds)
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def deadline(self, user_id: str) -> Optional[datetime]:
+        entry = self._entries.get(user_id)
+        return entry["deadline"] if entry else None
+
+    def track(self, user_id: str, username: Optional[str], last_check_in: Optional[datetime],
+              interval_minutes: Optional[int]):
+        """Frist ab dem letzten Check-In setzen (ersetzt eine vorhandene Frist)"""
+        interval = timedelta(minutes=interval_minutes or DEFAULT_INTERVAL_MINUTES)
+        last_check_in = as_stored(last_check_in or datetime.utcnow())
+        self._schedule(user_id, {
+            "username": username,
+            "last_check_in": last_check_in,
+            "interval": interval,
+            "deadline": last_check_in + interval,
+        })
+
+    def untrack(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    def _schedule(self, user_id: str, entry: Dict[str, Any]):
+        self._entries[user_id] = entry
+        due = entry["deadline"] + self.grace
+        # Frühere Frist als bisher: schlafenden Scheduler wecken
+        wake = not self._heap or due < self._heap[0][0]
+        heapq.heappush(self._heap, (due, next(self._counter), user_id))
+        if wake:
+            self._wakeup.set()
+
+    def pop_due(self, now: datetime) -> List[Tuple[str, Dict[str, Any]]]:
+        """Alle fälligen, noch gültigen Einträge entnehmen"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, user_id = heapq.heappop(self._heap)
+            entry = self._entries.get(user_id)
+            if entry is None or entry["deadline"] + self.grace != due_at:
+                continue  # untracked oder inzwischen neu terminiert
+            due.append((user_id, entry))
+        return due
+
+    def reschedule_missed(self, user_id: str, entry: Dict[str, Any]):
+        """Nach einer Eskalation: nächste Frist ein Intervall später"""
+        self._schedule(user_id, {**entry, "deadline": entry["deadline"] + entry["interval"]})
+
+    def next_due(self) -> Optional[datetime]:
+        while self._heap:
+            due_at, _, user_id = self._heap[0]
+            entry = self._entries.get(user_id)
+            if entry is not None and entry["deadline"] + self.grace == due_at:
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    async def run(self, on_missed: Callable[[str, Dict[str, Any]], Awaitable[None]]):
+        """Bis zur nächsten Frist schlafen, fällige Einträge an on_missed übergeben"""
+        while True:
+            self._wakeup.clear()
+            next_due = self.next_due()
+            timeout = None if next_due is None else max((next_due - datetime.utcnow()).total_seconds(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            for user_id, entry in self.pop_due(datetime.utcnow()):
+                try:
+                    await on_missed(user_id, entry)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ Check-In-Eskalation für {user_id} fehlgeschlagen: {e}")
+
+
+async def seed(watch: CheckInWatch, db):
+    """Beamte im Dienst mit kürzlichem Check-In übernehmen (Index auf last_check_in)"""
+    since = datetime.utcnow() - timedelta(hours=CHECK_IN_SEED_HOURS)
+    projection = {"_id": 0, "id": 1, "username": 1, "last_check_in": 1, "check_in_interval": 1}
+    query = {"last_check_in": {"$gte": since}, "status": {"$in": list(ON_DUTY_STATUSES)}}
+    async for user in db.users.find(query, projection):
+        watch.track(user["id"], user.get("username"), user["last_check_in"], user.get("check_in_interval"))
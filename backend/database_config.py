@@ -1,10 +1,18 @@
 # 🗄️ Database Configuration für SQL-Datenbanken
 # Beispiel-Konfigurationen für MySQL, PostgreSQL, SQLite
 
+import asyncio
+import logging
 import os
-from sqlalchemy import create_engine, text
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -39,6 +47,32 @@ class DatabaseConfig:
     SQLITE_CONFIG = {
         "database": os.getenv("SQLITE_DB", "/app/data/stadtwache.db")
     }
+    
+    # Connection-Pool pro Worker-Prozess (Gesamt = Worker x (pool_size + max_overflow))
+    POOL_CONFIG = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),  # Sekunden Warten auf eine freie Verbindung
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+    
+    # SQL-Logging: echo nur zum Debuggen, langsame Queries werden gesampelt geloggt
+    LOGGING_CONFIG = {
+        "echo": os.getenv("DB_ECHO", "false").lower() == "true",
+        "slow_query_ms": float(os.getenv("DB_SLOW_QUERY_MS", "200")),
+        "slow_query_sample_rate": float(os.getenv("DB_SLOW_QUERY_SAMPLE_RATE", "0.1")),
+    }
+    
+    # SQLite: WAL erlaubt Lesen parallel zum Schreiben
+    SQLITE_PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}",
+        "PRAGMA foreign_keys=ON",
+        "PRAGMA temp_store=MEMORY",
+        f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '65536'))}",
+    )
 
 # ================================================
 # CONNECTION STRINGS
@@ -59,51 +93,206 @@ def get_sqlite_url():
     config = DatabaseConfig.SQLITE_CONFIG
     return f"sqlite+aiosqlite:///{config['database']}"
 
+# ================================================
+# METRIKEN (Query-Latenz, Pool-Wartezeit)
+# ================================================
+
+logger = logging.getLogger("database")
+
+# Obergrenzen der Histogramm-Buckets in Millisekunden
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+def _bucket(milliseconds: float) -> str:
+    for bound in WAIT_BUCKETS_MS:
+        if milliseconds <= bound:
+            return f"<={bound}ms"
+    return f">{WAIT_BUCKETS_MS[-1]}ms"
+
+
+class EngineMetrics:
+    """Zähler pro Engine - werden im Event-Loop-Thread aktualisiert, daher ohne Locks"""
+
+    def __init__(self, slow_query_ms: float, slow_query_sample_rate: float):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.slow_query_sample_rate = slow_query_sample_rate
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.slow_queries = 0
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max = 0.0
+        self.checkout_timeouts = 0
+        self.checkout_wait_histogram: Counter = Counter()
+
+    def record_query(self, statement: str, seconds: float):
+        self.queries += 1
+        self.query_seconds += seconds
+        if seconds < self.slow_query_seconds:
+            return
+        self.slow_queries += 1
+        if random.random() < self.slow_query_sample_rate:
+            logger.warning("🐢 Langsame Query (%.0f ms): %s", seconds * 1000, " ".join(statement.split())[:500])
+
+    def record_checkout(self, seconds: float, timed_out: bool = False):
+        self.checkouts += 1
+        self.checkout_wait_seconds += seconds
+        self.checkout_wait_max = max(self.checkout_wait_max, seconds)
+        self.checkout_wait_histogram[_bucket(seconds * 1000)] += 1
+        if timed_out:
+            self.checkout_timeouts += 1
+
+    def snapshot(self, pool=None) -> Dict[str, Any]:
+        data = {
+            "queries": self.queries,
+            "query_avg_ms": round(self.query_seconds / self.queries * 1000, 2) if self.queries else 0,
+            "slow_queries": self.slow_queries,
+            "slow_query_threshold_ms": self.slow_query_seconds * 1000,
+            "checkouts": self.checkouts,
+            "checkout_wait_avg_ms": round(self.checkout_wait_seconds / self.checkouts * 1000, 2) if self.checkouts else 0,
+            "checkout_wait_max_ms": round(self.checkout_wait_max * 1000, 2),
+            "checkout_timeouts": self.checkout_timeouts,
+            "checkout_wait_histogram": {
+                bucket: self.checkout_wait_histogram[bucket]
+                for bucket in [f"<={bound}ms" for bound in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+            },
+        }
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            data["pool"] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "checked_in": pool.checkedin(),
+            }
+        return data
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Queue-Pool, der die Wartezeit beim Auschecken einer Verbindung misst"""
+
+    metrics: Optional[EngineMetrics] = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.record_checkout(time.perf_counter() - started, timed_out="TimeoutError" in type(e).__name__)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+
+_ENGINE_METRICS: Dict[int, EngineMetrics] = {}
+
+
+def get_engine_metrics(engine: AsyncEngine) -> Optional[EngineMetrics]:
+    return _ENGINE_METRICS.get(id(engine.sync_engine))
+
+
+def _instrument(engine: AsyncEngine, metrics: EngineMetrics):
+    sync_engine = engine.sync_engine
+    _ENGINE_METRICS[id(sync_engine)] = metrics
+    if isinstance(sync_engine.pool, MeteredPool):
+        sync_engine.pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        metrics.record_query(statement, time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _drop_timer(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if started:
+            started.pop()
+
+
+def _apply_sqlite_pragmas(engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in DatabaseConfig.SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
 # ================================================
 # DATABASE CONNECTION FACTORY
 # ================================================
 
-def create_database_engine(db_type="mysql"):
-    """Database Engine basierend auf Typ erstellen"""
+def create_database_engine(db_type="mysql", **overrides):
+    """Database Engine basierend auf Typ erstellen (Pool und Logging aus DatabaseConfig)"""
+    db_type = db_type.lower()
+    pool_config = {**DatabaseConfig.POOL_CONFIG}
+    logging_config = {**DatabaseConfig.LOGGING_CONFIG}
+    for key, value in overrides.items():
+        (logging_config if key in logging_config else pool_config)[key] = value
     
-    if db_type.lower() == "mysql":
+    if db_type == "mysql":
         database_url = get_mysql_url()
-        engine = create_async_engine(
-            database_url,
-            echo=True,  # SQL-Queries loggen
-            pool_size=20,
-            max_overflow=30,
-            pool_pre_ping=True,
-            pool_recycle=3600
-        )
-        print(f"🔗 MySQL Engine erstellt: {database_url.split('@')[1]}")
-        
-    elif db_type.lower() == "postgresql" or db_type.lower() == "postgres":
+    elif db_type in ("postgresql", "postgres"):
         database_url = get_postgres_url()
-        engine = create_async_engine(
-            database_url,
-            echo=True,
-            pool_size=20,
-            max_overflow=30,
-            pool_pre_ping=True,
-            pool_recycle=3600
-        )
-        print(f"🔗 PostgreSQL Engine erstellt: {database_url.split('@')[1]}")
-        
-    elif db_type.lower() == "sqlite":
+    elif db_type == "sqlite":
         database_url = get_sqlite_url()
-        engine = create_async_engine(
-            database_url,
-            echo=True,
-            connect_args={"check_same_thread": False}
-        )
-        print(f"🔗 SQLite Engine erstellt: {database_url}")
-        
     else:
         raise ValueError(f"Unsupported database type: {db_type}")
     
+    options: Dict[str, Any] = {"echo": logging_config["echo"]}
+    if db_type == "sqlite" and DatabaseConfig.SQLITE_CONFIG["database"] == ":memory:":
+        # In-Memory: eine gemeinsame Verbindung (SQLAlchemy-Standard), kein Pool
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(poolclass=MeteredPool, **pool_config)
+        if db_type == "sqlite":
+            options["connect_args"] = {"check_same_thread": False}
+    
+    engine = create_async_engine(database_url, **options)
+    _instrument(engine, EngineMetrics(logging_config["slow_query_ms"], logging_config["slow_query_sample_rate"]))
+    if db_type == "sqlite":
+        _apply_sqlite_pragmas(engine)
+    
+    # Nur Host und Datenbank ausgeben - nie Benutzer oder Passwort
+    location = f"{engine.url.host}:{engine.url.port}/{engine.url.database}" if engine.url.host else engine.url.database
+    pool_info = f"pool {pool_config['pool_size']}+{pool_config['max_overflow']}" if "poolclass" in options else "ohne Pool"
+    print(f"🔗 {db_type.upper()} Engine erstellt: {location} ({pool_info})")
+    
     return engine
 
+# ================================================
+# HEALTH CHECK
+# ================================================
+
+async def check_database_health(engine: AsyncEngine, timeout: float = 2.0) -> Dict[str, Any]:
+    """SELECT 1 mit Timeout - Latenz, Pool-Zustand und Fehlertyp für Health-Probes"""
+    started = time.perf_counter()
+    
+    async def probe():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    try:
+        await asyncio.wait_for(probe(), timeout)
+        status, error = "ok", None
+    except asyncio.TimeoutError:
+        status, error = "timeout", f"no response within {timeout}s"
+    except Exception as e:
+        status, error = "error", type(e).__name__
+    result = {
+        "status": status,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    if error:
+        result["error"] = error
+    metrics = get_engine_metrics(engine)
+    if metrics is not None:
+        result["pool"] = metrics.snapshot(engine.sync_engine.pool).get("pool")
+    return result
+
 # ================================================
 # SESSION FACTORY
 # ================================================
@@ -162,41 +351,40 @@ POSTGRES_PASSWORD=ihr-sicheres-passwort
 SQLITE_DB=/pfad/zu/ihrer/stadtwache.db
 
 # Datenbank-Typ auswählen
-DATABASE_TYPE=mysql  # oder postgresql, sqlite
+# Datenbank für die Repository-Schicht (repositories.py), Standard: mongodb
+DATABASE_TYPE=sqlite  # oder mongodb, mysql, postgresql
+
+# Connection-Pool pro Worker (Summe über alle Worker unter max_connections der DB halten)
+DB_POOL_SIZE=10
+DB_MAX_OVERFLOW=10
+DB_POOL_TIMEOUT=10
+DB_POOL_RECYCLE=1800
+
+# SQL-Logging: DB_ECHO nur lokal, langsame Queries ab Schwelle gesampelt loggen
+DB_ECHO=false
+DB_SLOW_QUERY_MS=200
+DB_SLOW_QUERY_SAMPLE_RATE=0.1
 """
 
 # ================================================
 # MIGRATION SCRIPT
 # ================================================
 
-async def run_database_migrations(db_type="mysql"):
-    """Datenbank-Schema aus SQL-Datei ausführen"""
+async def run_database_migrations(db_type="mysql", directory=None, target=None):
+    """Versionierte Migrationen aus backend/migrations anwenden (siehe sql_migrations.py)"""
+    from sql_migrations import MIGRATIONS_DIR, migrate
+    
+    engine = create_database_engine(db_type)
     try:
-        engine = create_database_engine(db_type)
-        
-        # SQL-Schema-Datei laden
-        with open('/app/STADTWACHE_DATABASE_SCHEMA.sql', 'r', encoding='utf-8') as f:
-            schema_sql = f.read()
-        
-        # SQL in einzelne Statements aufteilen
-        statements = [stmt.strip() for stmt in schema_sql.split(';') if stmt.strip()]
-        
-        async with engine.begin() as conn:
-            for statement in statements:
-                if statement and not statement.startswith('--'):
-                    try:
-                        await conn.execute(text(statement))
-                        print(f"✅ SQL Statement ausgeführt: {statement[:50]}...")
-                    except Exception as e:
-                        print(f"⚠️ SQL Statement übersprungen: {e}")
-        
-        await engine.dispose()
-        print("🎉 Datenbank-Migration abgeschlossen!")
+        applied = await migrate(engine, directory or MIGRATIONS_DIR, target)
+        print(f"🎉 Datenbank-Migration abgeschlossen! ({len(applied)} neu angewendet)")
         return True
         
     except Exception as e:
         print(f"❌ Migration fehlgeschlagen: {e}")
         return False
+    finally:
+        await engine.dispose()
 
 # ================================================
 # MAIN EXECUTION
@@ -0,0 +1,30 @@
+# 🔒 MongoDB-Transaktionen, falls der Server sie unterstützt
+# Transaktionen gibt es nur auf Replica Sets / Sharded Clustern - auf einem
+# Standalone-Server laufen die Schritte ohne Session nacheinander.
+
+from contextlib import asynccontextmanager
+
+_support_cache = {}
+
+
+async def supports_transactions(client) -> bool:
+    """Einmal pro Client per hello-Kommando prüfen (Replica Set oder mongos)"""
+    key = id(client)
+    if key not in _support_cache:
+        try:
+            hello = await client.admin.command("hello")
+            _support_cache[key] = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+        except Exception:
+            _support_cache[key] = False
+    return _support_cache[key]
+
+
+@asynccontextmanager
+async def maybe_transaction(client):
+    """Session mit laufender Transaktion - oder None ohne Transaktions-Support (session=None ist für Motor gültig)"""
+    if not await supports_transactions(client):
+        yield None
+        return
+    async with await client.start_session() as session:
+        async with session.start_transaction():
+            yield session
@@ -0,0 +1,142 @@
+# 📤 Streaming-Export (NDJSON / CSV) direkt aus MongoDB-Cursorn
+# Speicherverbrauch bleibt konstant - es wird immer nur ein Batch gehalten
+
+import csv
+import io
+from datetime import datetime, time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fast_json import dumps
+
+# Dokumente pro Cursor-Batch bzw. Zeilen pro geschriebenem Chunk
+BATCH_SIZE = 500
+
+
+class ExportDataset:
+    """Beschreibung eines exportierbaren Datenbestands"""
+
+    def __init__(self, collection: str, date_field: str, columns: List[str],
+                 query: Optional[Dict[str, Any]] = None, archive_collection: Optional[str] = None):
+        self.collection = collection
+        self.date_field = date_field
+        self.columns = columns
+        self.query = query or {}
+        # Kalt-Archiv mit älteren Dokumenten (wird vor der heißen Collection gelesen)
+        self.archive_collection = archive_collection
+
+    @property
+    def collections(self) -> List[str]:
+        if self.archive_collection:
+            return [self.archive_collection, self.collection]
+        return [self.collection]
+
+    @property
+    def projection(self) -> Dict[str, int]:
+        projection = {column: 1 for column in self.columns}
+        projection["_id"] = 0
+        return projection
+
+
+EXPORT_DATASETS = {
+    "reports": ExportDataset(
+        "reports", "created_at",
+        ["id", "title", "content", "author_id", "author_name", "shift_date",
+         "status", "created_at", "updated_at", "last_edited_by_name"],
+        {"incident_id": {"$exists": False}},
+        archive_collection="reports_archive",
+    ),
+    # Von complete_incident erzeugte Archiv-Berichte
+    "incidents": ExportDataset(
+        "reports", "created_at",
+        ["id", "incident_id", "title", "content", "author_id", "author_name",
+         "shift_date", "status", "created_at"],
+        {"incident_id": {"$exists": True}},
+        archive_collection="reports_archive",
+    ),
+    "checkins": ExportDataset(
+        "checkins", "timestamp",
+        ["id", "user_id", "user_name", "timestamp", "status", "location", "message"],
+    ),
+    "vacations": ExportDataset(
+        "vacations", "created_at",
+        ["id", "user_id", "user_name", "start_date", "end_date", "reason",
+         "status", "approved_by", "approved_at", "created_at"],
+    ),
+}
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def parse_date(value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """YYYY-MM-DD oder ISO-Zeitstempel in datetime umwandeln"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.replace(tzinfo=None) - parsed.utcoffset()
+    if end_of_day and len(value) == 10:
+        parsed = datetime.combine(parsed.date(), time.max)
+    return parsed
+
+
+def build_query(dataset: ExportDataset, start: Optional[datetime], end: Optional[datetime]) -> Dict[str, Any]:
+    query = dict(dataset.query)
+    date_range = {}
+    if start:
+        date_range["$gte"] = start
+    if end:
+        date_range["$lte"] = end
+    if date_range:
+        query[dataset.date_field] = date_range
+    return query
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode("utf-8")
+    return value
+
+
+async def _documents(collections, dataset: ExportDataset, query: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    for collection in collections:
+        cursor = collection.find(query, dataset.projection, batch_size=BATCH_SIZE).sort(dataset.date_field, 1)
+        async for doc in cursor:
+            yield doc
+
+
+async def stream_export(collections, dataset: ExportDataset, query: Dict[str, Any],
+                        export_format: str) -> AsyncIterator[bytes]:
+    """Cursor batchweise lesen (Archiv vor heißer Collection) und als NDJSON- bzw. CSV-Chunks ausgeben"""
+    documents = _documents(collections, dataset, query)
+
+    if export_format == "ndjson":
+        chunk = []
+        async for doc in documents:
+            chunk.append(dumps(doc))
+            if len(chunk) >= BATCH_SIZE:
+                yield b"\n".join(chunk) + b"\n"
+                chunk = []
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(dataset.columns)
+    rows = 0
+    async for doc in documents:
+        writer.writerow([_csv_value(doc.get(column)) for column in dataset.columns])
+        rows += 1
+        if rows >= BATCH_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue().encode("utf-8")
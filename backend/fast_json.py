@@ -0,0 +1,66 @@
+# ⚡ Schneller JSON-Antwortpfad für vertrauenswürdige DB-Reads
+# MongoDB-Dokumente direkt mit orjson serialisieren - ohne serialize_mongo_data
+# und ohne erneute Pydantic-Validierung über response_model
+
+from typing import Any, Dict, Iterable, List, Type
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+# Projektion, die das Mongo-_id direkt in der Query verwirft
+NO_ID = {"_id": 0}
+
+
+def _default(value: Any):
+    """Fallback für Typen, die orjson nicht nativ kennt"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON-Bytes für Mongo-Dokumente (datetime nativ, ObjectId als String)"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """Antwort, die Mongo-Dokumente ohne Zwischenschritte serialisiert
+
+    FastAPI überspringt bei direkt zurückgegebenen Responses die
+    response_model-Validierung, response_model bleibt nur für die Doku.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_projection(model: Type[BaseModel], exclude: Iterable[str] = ()) -> Dict[str, int]:
+    """Mongo-Projektion mit genau den Feldern eines Pydantic-Models (ohne _id)
+
+    Entspricht dem, was Model(**doc) an Feldern übrig lassen würde.
+    """
+    excluded = set(exclude)
+    projection = {name: 1 for name in model.model_fields if name not in excluded}
+    projection["_id"] = 0
+    return projection
+
+
+def model_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Statische Default-Werte eines Models (Felder ohne default_factory)"""
+    defaults = {}
+    for name, field in model.model_fields.items():
+        if field.default is not PydanticUndefined:
+            defaults[name] = field.default
+    return defaults
+
+
+def with_defaults(docs: List[Dict[str, Any]], defaults: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Fehlende Felder älterer Dokumente mit Model-Defaults auffüllen"""
+    for doc in docs:
+        for key, value in defaults.items():
+            if key not in doc:
+                doc[key] = value
+    return docs
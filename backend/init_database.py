@@ -9,8 +9,11 @@ import motor.motor_asyncio
 from passlib.context import CryptContext
 from datetime import datetime
 import os
+import sys
 from dotenv import load_dotenv
 
+from report_archive import ensure_archive_collection
+
 # Lade Umgebungsvariablen
 load_dotenv()
 
@@ -21,6 +24,49 @@ DATABASE_NAME = "stadtwache"
 # Password Hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+def _is_edited(report):
+    return bool(report.get("revision_count") or report.get("edit_history") or report.get("last_edited_by"))
+
+
+async def dedupe_incident_reports(db):
+    """Doppelte Archiv-Berichte je Vorfall bereinigen - Voraussetzung für den Unique-Index auf reports.incident_id
+
+    Je Vorfall behält ein Bericht die incident_id (der älteste bearbeitete, sonst der älteste).
+    Weitere bearbeitete Kopien bleiben als eigenständige Berichte erhalten, nur unbearbeitete
+    Kopien werden gelöscht. Jede Änderung wird protokolliert.
+    """
+    pipeline = [
+        {"$match": {"incident_id": {"$type": "string"}}},
+        {"$sort": {"created_at": 1, "_id": 1}},
+        {"$group": {"_id": "$incident_id", "reports": {"$push": {
+            "_id": "$_id", "id": "$id", "title": "$title", "revision_count": "$revision_count",
+            "edit_history": "$edit_history", "last_edited_by": "$last_edited_by",
+        }}}},
+        {"$match": {"reports.1": {"$exists": True}}},
+    ]
+    removed, detached = [], []
+    async for group in db.reports.aggregate(pipeline, allowDiskUse=True):
+        reports = group["reports"]
+        keep = next((report for report in reports if _is_edited(report)), reports[0])
+        for report in reports:
+            if report is keep:
+                continue
+            if _is_edited(report):
+                # Bearbeitete Kopie behalten, nur von der Vorfall-Zuordnung lösen
+                await db.reports.update_one(
+                    {"_id": report["_id"]},
+                    {"$set": {"duplicate_of_incident_id": group["_id"]}, "$unset": {"incident_id": ""}}
+                )
+                detached.append(report)
+                print(f"🔗 Bericht {report.get('id')} ('{report.get('title')}') von Vorfall {group['_id']} gelöst (bearbeitet, behalten)")
+            else:
+                await db.reports.delete_one({"_id": report["_id"]})
+                removed.append(report)
+                print(f"🗑️ Bericht {report.get('id')} ('{report.get('title')}') gelöscht - Kopie von {keep.get('id')} (Vorfall {group['_id']})")
+    print(f"✅ Archiv-Berichte bereinigt: {len(removed)} gelöscht, {len(detached)} gelöst")
+    return {"removed": [report.get("id") for report in removed], "detached": [report.get("id") for report in detached]}
+
+
 async def init_database():
     """Initialisiert die komplette Datenbank"""
     
@@ -230,6 +276,30 @@ async def init_database():
         # Team-Indizes
         await teams_collection.create_index("user_email", unique=True)
         
+        # Berichts-Indizes (Archiv-Ordner und Export nach Datumsbereich)
+        await db.reports.create_index("created_at")
+        await db.reports.create_index([("author_id", 1), ("created_at", -1)])
+        await db.report_revisions.create_index([("report_id", 1), ("revision", -1)], unique=True)
+        await dedupe_incident_reports(db)
+        await db.reports.create_index("incident_id", unique=True, partialFilterExpression={"incident_id": {"$type": "string"}})
+        await db.checkins.create_index("timestamp")
+        # Check-In-Rollups: ein Dokument pro Benutzer und Tag, Monatsauswertung über month
+        await db.checkin_rollups.create_index([("user_id", 1), ("day", 1)], unique=True)
+        await db.checkin_rollups.create_index([("month", 1), ("user_id", 1)])
+        await db.vacations.create_index("created_at")
+        # Dienstplan lädt nur genehmigten Urlaub der letzten Zeit
+        await db.vacations.create_index([("status", 1), ("end_at", 1)])
+        # Check-In-Überwachung: Beamte im Dienst mit kürzlichem Check-In
+        await users_collection.create_index([("last_check_in", 1), ("status", 1)])
+        # Dienstplan: Schichten nach Zeitraum, Team und Bezirk
+        await db.shifts.create_index([("start_time", 1), ("end_time", 1)])
+        await db.shifts.create_index([("team_id", 1), ("start_time", 1)])
+        await db.shifts.create_index([("district_id", 1), ("start_time", 1)])
+        # Kalt-Archiv für alte Berichte (zstd-komprimiert, Datums-Indizes)
+        await ensure_archive_collection(db)
+        # Blocking-Index für die Dubletten-Erkennung (Multikey)
+        await db.persons.create_index("dedupe_keys")
+        
         print("✅ Alle Indizes erstellt")
         
         print("\n" + "=" * 50)
@@ -256,7 +326,26 @@ async def init_database():
     
     return True
 
+async def run_dedupe_incident_reports():
+    """Einmaliger Bereinigungs-Schritt auf einer bestehenden Datenbank, danach Unique-Index anlegen"""
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    db = client[DATABASE_NAME]
+    try:
+        await dedupe_incident_reports(db)
+        await db.reports.create_index("incident_id", unique=True, partialFilterExpression={"incident_id": {"$type": "string"}})
+        print("✅ Unique-Index reports.incident_id angelegt")
+    except Exception as e:
+        print(f"❌ Bereinigung fehlgeschlagen: {e}")
+        return False
+    finally:
+        client.close()
+    return True
+
 if __name__ == "__main__":
+    if "--dedupe-incident-reports" in sys.argv[1:]:
+        print("Bereinige doppelte Archiv-Berichte...")
+        exit(0 if asyncio.run(run_dedupe_incident_reports()) else 1)
+
     print("Starte Datenbank-Initialisierung...")
     result = asyncio.run(init_database())
     
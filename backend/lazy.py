@@ -0,0 +1,39 @@
+# 💤 Platzhalter für schwere Objekte (DB-Clients, Engines)
+# Das echte Objekt entsteht beim ersten Zugriff oder explizit im Lifespan-Startup -
+# der Import von server.py bleibt dadurch frei von Netzwerk- und DNS-Zugriffen.
+
+from typing import Any, Callable
+
+
+class Lazy:
+    """Reicht Attribut- und Item-Zugriffe an das beim ersten Gebrauch erzeugte Objekt weiter"""
+
+    def __init__(self, factory: Callable[[], Any], name: str = "object"):
+        self._factory = factory
+        self._name = name
+        self._instance = None
+
+    @property
+    def resolved(self) -> bool:
+        return self._instance is not None
+
+    def resolve(self):
+        if self._instance is None:
+            self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name: str):
+        # Nur für Attribute, die Lazy selbst nicht hat
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __getitem__(self, key):
+        return self.resolve()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.resolve()
+
+    def __repr__(self) -> str:
+        state = repr(self._instance) if self.resolved else "not created"
+        return f"<Lazy {self._name}: {state}>"
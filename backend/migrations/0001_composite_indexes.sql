@@ -0,0 +1,12 @@
+-- Zusammengesetzte Indizes für die SQL-Backends
+-- (create_index der Repositories ist dort ein No-op, die Tabellen legt build_tables an)
+
+-- Tages-Rollups: Upsert pro (user_id, day), Monatsübersicht über (month, user_id)
+CREATE UNIQUE INDEX ux_checkin_rollups_user_day ON checkin_rollups (user_id, day);
+CREATE INDEX ix_checkin_rollups_month_user ON checkin_rollups (month, user_id);
+
+-- Check-In-Verlauf pro Benutzer und Rebuild der Rollups
+CREATE INDEX ix_checkins_user_timestamp ON checkins (user_id, timestamp);
+
+-- Schichtplan pro Bezirk
+CREATE INDEX ix_shifts_district_start ON shifts (district_id, start_time);
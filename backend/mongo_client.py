@@ -0,0 +1,292 @@
+# 🍃 MongoDB-Client: Pool, Timeouts, Kompression, Read Preference und Monitoring
+# Alle Optionen per Umgebungsvariable - gleiche Konfiguration lokal und in der Cloud.
+# Command- und Pool-Listener zählen Latenzen pro Collection und Wartezeiten im Pool
+# (GET /api/admin/db/metrics).
+
+import hashlib
+import importlib.util
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from pymongo import monitoring
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "5")),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    # Anfragen warten höchstens so lange auf eine freie Verbindung, statt sich unbegrenzt zu stauen
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    "retryWrites": True,
+    "retryReads": True,
+}
+
+# Bevorzugte Reihenfolge - nur Verfahren, deren Python-Modul installiert ist (zlib ist immer dabei)
+MONGO_COMPRESSORS = [c.strip() for c in os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib").split(",") if c.strip()]
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+# Read Preference für Listen-Endpunkte
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "secondaryPreferred")
+# MongoDB verlangt mindestens 90 Sekunden
+MONGO_MAX_STALENESS_SECONDS = max(int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "90")), 90)
+MONGO_ANALYTICS_MAX_STALENESS_SECONDS = max(int(os.getenv("MONGO_ANALYTICS_MAX_STALENESS_SECONDS", "300")), 90)
+
+# Read-Policies pro Route (READ_ROUTES in server.py): Name -> (Read Preference, maxStalenessSeconds)
+READ_POLICIES = {
+    "primary": ("primary", None),
+    # Dashboards, Auswertungen, Exporte - einige Minuten alt ist in Ordnung
+    "analytics": (os.getenv("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPreferred"), MONGO_ANALYTICS_MAX_STALENESS_SECONDS),
+    # Listen - nach eigenen Schreibzugriffen liest der Client vom Primary (RecentWriters)
+    "lists": (MONGO_READ_PREFERENCE, MONGO_MAX_STALENESS_SECONDS),
+}
+
+_READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Obergrenzen der Histogramm-Buckets in Millisekunden
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def available_compressors():
+    return [name for name in MONGO_COMPRESSORS
+            if name in _COMPRESSOR_MODULES and importlib.util.find_spec(_COMPRESSOR_MODULES[name])]
+
+
+def read_preference(name: str = MONGO_READ_PREFERENCE, max_staleness: Optional[int] = MONGO_MAX_STALENESS_SECONDS):
+    if name not in _READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference: {name}")
+    if name == "primary":
+        return Primary()
+    return _READ_PREFERENCES[name](max_staleness=max_staleness or -1)
+
+
+class RecentWriters:
+    """Clients mit Schreibzugriff innerhalb der maximalen Staleness (read-your-writes)
+
+    Pro Worker-Prozess; Schlüssel ist ein Hash des Authorization-Headers.
+    """
+
+    def __init__(self, window_seconds: int = max(MONGO_MAX_STALENESS_SECONDS, MONGO_ANALYTICS_MAX_STALENESS_SECONDS),
+                 max_entries: int = 10000):
+        self.window = window_seconds
+        self.max_entries = max_entries
+        self._writes: Dict[str, float] = {}
+
+    @staticmethod
+    def _key(credentials: Optional[str]) -> Optional[str]:
+        return hashlib.sha1(credentials.encode()).hexdigest() if credentials else None
+
+    def mark(self, credentials: Optional[str]):
+        key = self._key(credentials)
+        if key is None:
+            return
+        now = time.monotonic()
+        if len(self._writes) >= self.max_entries:
+            self._writes = {k: t for k, t in self._writes.items() if now - t < self.window}
+        self._writes.pop(key, None)
+        self._writes[key] = now
+
+    def recent(self, credentials: Optional[str]) -> bool:
+        key = self._key(credentials)
+        written = self._writes.get(key) if key else None
+        return written is not None and time.monotonic() - written < self.window
+
+
+def redact_url(url: str) -> str:
+    """Host(s) ohne Benutzer und Passwort für Log-Ausgaben"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc.rsplit('@', 1)[-1]}"
+
+
+# ================================================
+# MONITORING
+# ================================================
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, milliseconds: float):
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+        for bound in self.buckets:
+            if milliseconds <= bound:
+                self.counts[f"<={bound}ms"] += 1
+                return
+        self.counts[f">{self.buckets[-1]}ms"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 2) if self.count else 0,
+            "max_ms": round(self.max, 2),
+            "buckets": {bucket: self.counts[bucket]
+                        for bucket in [f"<={bound}ms" for bound in self.buckets] + [f">{self.buckets[-1]}ms"]},
+        }
+
+
+class MongoMonitor(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """Latenz pro (Collection, Command) und Wartezeit beim Auschecken aus dem Pool
+
+    Die Listener laufen in den Worker-Threads von Motor, daher mit Lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started: Dict[Tuple[Any, int], str] = {}
+        self.commands: Dict[str, Histogram] = defaultdict(Histogram)
+        self.failures: Counter = Counter()
+        self.pool_wait = Histogram()
+        self.checkout_failures: Counter = Counter()
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checked_out = 0
+
+    # --- Commands ----------------------------------------------------------
+
+    @staticmethod
+    def _collection(event) -> str:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        if not isinstance(target, str):
+            target = "-"
+        return f"{event.database_name}.{target}"
+
+    def started(self, event):
+        key = (event.connection_id, event.request_id)
+        with self._lock:
+            self._started[key] = f"{self._collection(event)}:{event.command_name}"
+
+    def _finished(self, event, failed: bool):
+        with self._lock:
+            name = self._started.pop((event.connection_id, event.request_id), None) or f"-:{event.command_name}"
+            self.commands[name].observe(event.duration_micros / 1000)
+            if failed:
+                self.failures[name] += 1
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    # --- Connection Pool ---------------------------------------------------
+
+    def connection_check_out_started(self, event):
+        self._local.check_out_started = time.perf_counter()
+
+    def _checkout_wait_ms(self) -> float:
+        started = getattr(self._local, "check_out_started", None)
+        self._local.check_out_started = None
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    def connection_checked_out(self, event):
+        wait = self._checkout_wait_ms()
+        with self._lock:
+            self.pool_wait.observe(wait)
+            self.checked_out += 1
+
+    def connection_check_out_failed(self, event):
+        wait = self._checkout_wait_ms()
+        with self._lock:
+            self.pool_wait.observe(wait)
+            self.checkout_failures[str(event.reason)] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "commands": {name: {**histogram.snapshot(), "failures": self.failures[name]}
+                             for name, histogram in sorted(self.commands.items())},
+                "pool": {
+                    "max_size": MONGO_POOL_OPTIONS["maxPoolSize"],
+                    "min_size": MONGO_POOL_OPTIONS["minPoolSize"],
+                    "checked_out": self.checked_out,
+                    "open_connections": self.connections_created - self.connections_closed,
+                    "checkout_wait": self.pool_wait.snapshot(),
+                    "checkout_failures": dict(self.checkout_failures),
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self.commands.clear()
+            self.failures.clear()
+            self.pool_wait = Histogram()
+            self.checkout_failures.clear()
+
+
+monitor = MongoMonitor()
+
+
+def client_options(**overrides) -> Dict[str, Any]:
+    options = {**MONGO_POOL_OPTIONS, "event_listeners": [monitor]}
+    compressors = available_compressors()
+    if compressors:
+        options["compressors"] = compressors
+        if "zlib" in compressors:
+            options["zlibCompressionLevel"] = int(os.getenv("MONGO_ZLIB_LEVEL", "1"))
+    options.update(overrides)
+    return options
+
+
+def create_client(url: str, **overrides):
+    """Motor-Client mit Pool-, Timeout- und Kompressions-Einstellungen"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    options = client_options(**overrides)
+    client = AsyncIOMotorClient(url, **options)
+    print(f"🔗 MongoDB-Client: {redact_url(url)} (pool {options['minPoolSize']}-{options['maxPoolSize']}, "
+          f"Kompression: {', '.join(options.get('compressors', [])) or 'aus'})")
+    return client
+
+
+def read_only_database(database, policy: str = "lists"):
+    """Datenbank-Handle für reine Lesezugriffe mit der Read Preference einer Policy"""
+    if policy not in READ_POLICIES:
+        raise ValueError(f"Unknown read policy: {policy}")
+    return database.with_options(read_preference=read_preference(*READ_POLICIES[policy]))
@@ -0,0 +1,191 @@
+# 👥 Dubletten-Erkennung für Personen-Einträge
+# Blocking-Keys (Aktenzeichen, Kölner Phonetik des Namens + Geburtsdatum/Alter)
+# werden am Dokument gespeichert und über einen Multikey-Index abgefragt -
+# pro Insert eine indizierte Abfrage statt eines Scans der persons-Collection.
+
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+# Gewichtung der Übereinstimmung je Key-Typ
+KEY_SCORES = {
+    "cn": 1.0,   # gleiches Aktenzeichen
+    "nb": 0.95,  # Name (phonetisch) + Geburtsdatum
+    "na": 0.8,   # Name (phonetisch) + Alter (±1 Jahr)
+    "n": 0.5,    # nur Name (phonetisch)
+}
+
+# Key-Typen, deren Treffer immer vollständig geliefert werden
+STRONG_KEYS = ("cn", "nb")
+# Obergrenze für Treffer aus den phonetischen Keys (na, n)
+MAX_CANDIDATES = 20
+
+_UMLAUTS = str.maketrans({"Ä": "A", "Ö": "O", "Ü": "U", "ß": "S"})
+
+
+def koelner_phonetik(text: Optional[str]) -> str:
+    """Kölner Phonetik - phonetischer Code für deutsche Namen (Meier/Mayer/Maier -> 67)"""
+    if not text:
+        return ""
+    letters = [char for char in text.upper().translate(_UMLAUTS) if "A" <= char <= "Z"]
+    codes = []
+    for i, char in enumerate(letters):
+        previous = letters[i - 1] if i > 0 else ""
+        following = letters[i + 1] if i + 1 < len(letters) else ""
+        if char in "AEIJOUY":
+            code = "0"
+        elif char == "H":
+            code = ""
+        elif char == "B":
+            code = "1"
+        elif char == "P":
+            code = "3" if following == "H" else "1"
+        elif char in "DT":
+            code = "8" if following in ("C", "S", "Z") else "2"
+        elif char in "FVW":
+            code = "3"
+        elif char in "GKQ":
+            code = "4"
+        elif char == "C":
+            if i == 0:
+                code = "4" if following in ("A", "H", "K", "L", "O", "Q", "R", "U", "X") else "8"
+            elif previous in ("S", "Z"):
+                code = "8"
+            else:
+                code = "4" if following in ("A", "H", "K", "O", "Q", "U", "X") else "8"
+        elif char == "X":
+            code = "8" if previous in ("C", "K", "Q") else "48"
+        elif char == "L":
+            code = "5"
+        elif char in "MN":
+            code = "6"
+        elif char == "R":
+            code = "7"
+        else:  # S, Z
+            code = "8"
+        codes.append(code)
+
+    raw = "".join(codes)
+    collapsed = []
+    for digit in raw:
+        if not collapsed or collapsed[-1] != digit:
+            collapsed.append(digit)
+    if not collapsed:
+        return ""
+    # Nullen nur am Anfang behalten
+    return collapsed[0] + "".join(digit for digit in collapsed[1:] if digit != "0")
+
+
+def normalize_case_number(value: Optional[str]) -> str:
+    return re.sub(r"[^0-9A-Z]", "", (value or "").upper())
+
+
+def _age_from_birth_date(birth_date: Optional[str], today: Optional[date] = None) -> Optional[int]:
+    try:
+        born = date.fromisoformat(birth_date)
+    except (TypeError, ValueError):
+        return None
+    today = today or date.today()
+    return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+
+def _name_key(person: Dict[str, Any]) -> Optional[str]:
+    last = koelner_phonetik(person.get("last_name"))
+    first = koelner_phonetik(person.get("first_name"))
+    if not last or not first:
+        return None
+    return f"{last}|{first}"
+
+
+def _ages(person: Dict[str, Any]) -> List[int]:
+    ages = []
+    if isinstance(person.get("age"), int):
+        ages.append(person["age"])
+    derived = _age_from_birth_date(person.get("birth_date"))
+    if derived is not None and derived not in ages:
+        ages.append(derived)
+    return ages
+
+
+def blocking_keys(person: Dict[str, Any]) -> List[str]:
+    """Keys, unter denen eine Person gespeichert wird (Feld dedupe_keys)"""
+    keys = []
+    case_number = normalize_case_number(person.get("case_number"))
+    if case_number:
+        keys.append(f"cn:{case_number}")
+    name = _name_key(person)
+    if name:
+        keys.append(f"n:{name}")
+        if person.get("birth_date"):
+            keys.append(f"nb:{name}|{person['birth_date']}")
+        for age in _ages(person):
+            keys.append(f"na:{name}|{age}")
+    return keys
+
+
+def probe_keys(person: Dict[str, Any]) -> List[str]:
+    """Keys für die Dubletten-Suche - Alter mit ±1 Jahr Toleranz"""
+    keys = []
+    name = _name_key(person)
+    for key in blocking_keys(person):
+        if not key.startswith("na:"):
+            keys.append(key)
+    if name:
+        for age in _ages(person):
+            for candidate in (age - 1, age, age + 1):
+                key = f"na:{name}|{candidate}"
+                if key not in keys:
+                    keys.append(key)
+    return keys
+
+
+def score_candidate(probe: List[str], candidate_keys: List[str]) -> Dict[str, Any]:
+    matched = set(probe) & set(candidate_keys or [])
+    kinds = sorted({key.split(":", 1)[0] for key in matched}, key=lambda kind: -KEY_SCORES[kind])
+    return {
+        "match_score": max((KEY_SCORES[kind] for kind in kinds), default=0.0),
+        "matched_on": kinds,
+    }
+
+
+async def find_duplicates(collection, person: Dict[str, Any], exclude_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Wahrscheinliche Dubletten über den dedupe_keys-Index, nach Score sortiert"""
+    probe = probe_keys(person)
+    if not probe:
+        return []
+    projection = {
+        "_id": 0, "id": 1, "first_name": 1, "last_name": 1, "birth_date": 1, "age": 1,
+        "case_number": 1, "status": 1, "dedupe_keys": 1,
+    }
+    # Starke Keys (Aktenzeichen, Name + Geburtsdatum) zuerst und ohne Limit - sonst könnten
+    # Treffer aus großen phonetischen Blöcken eine exakte Übereinstimmung verdrängen
+    tiers = [[key for key in probe if key.split(":", 1)[0] in kinds] for kinds in (STRONG_KEYS, ("na",), ("n",))]
+    seen = [exclude_id] if exclude_id else []
+    candidates = []
+    for strong, tier in zip((True, False, False), tiers):
+        remaining = MAX_CANDIDATES - len(candidates)
+        if not tier or (not strong and remaining <= 0):
+            continue
+        query: Dict[str, Any] = {"dedupe_keys": {"$in": tier}, "is_active": True}
+        if seen:
+            query["id"] = {"$nin": seen}
+        cursor = collection.find(query, projection)
+        found = await (cursor.to_list(None) if strong else cursor.limit(remaining).to_list(remaining))
+        candidates.extend(found)
+        seen.extend(candidate["id"] for candidate in found)
+    results = []
+    for candidate in candidates:
+        keys = candidate.pop("dedupe_keys", [])
+        results.append({**candidate, **score_candidate(probe, keys)})
+    results.sort(key=lambda item: item["match_score"], reverse=True)
+    return results
+
+
+async def backfill_keys(collection) -> int:
+    """dedupe_keys für ältere Einträge ohne Keys nachtragen"""
+    updated = 0
+    projection = {"_id": 0, "id": 1, "first_name": 1, "last_name": 1, "birth_date": 1, "age": 1, "case_number": 1}
+    async for person in collection.find({"dedupe_keys": {"$exists": False}}, projection):
+        await collection.update_one({"id": person["id"]}, {"$set": {"dedupe_keys": blocking_keys(person)}})
+        updated += 1
+    return updated
@@ -0,0 +1,191 @@
+# 🧊 Kalt-Archiv für alte Berichte (Collection reports_archive)
+# Berichte älter als REPORT_ARCHIVE_AFTER_DAYS werden aus der heißen
+# reports-Collection in eine zstd-komprimierte Archiv-Collection verschoben.
+# Lesende Endpunkte fragen das Archiv nur an, wenn der Zeitraum vor der
+# Archiv-Grenze (watermark) liegt.
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReplaceOne
+
+ARCHIVE_COLLECTION = "reports_archive"
+STATE_COLLECTION = "report_archive_state"
+
+# Alter in Tagen, ab dem Berichte archiviert werden (0 = Archivierung aus)
+REPORT_ARCHIVE_AFTER_DAYS = int(os.getenv("REPORT_ARCHIVE_AFTER_DAYS", "365"))
+# Abstand zwischen zwei Archivierungsläufen in Sekunden
+REPORT_ARCHIVE_INTERVAL = int(os.getenv("REPORT_ARCHIVE_INTERVAL", str(6 * 3600)))
+
+MOVE_BATCH_SIZE = 500
+
+
+class ReportArchive:
+    """Archiv-Grenze dieses Workers und Cache der Archiv-Ordnerzählung"""
+
+    def __init__(self):
+        # Alle Berichte mit created_at < watermark können im Archiv liegen
+        self.watermark: Optional[datetime] = None
+        # Zähler im Zustands-Dokument - jede Änderung am Archiv (Lauf, Wiederherstellung, Löschung) erhöht ihn
+        self.version = 0
+        self._folder_cache: Dict[Tuple[Optional[str], Optional[datetime]], List[Dict[str, Any]]] = {}
+
+    def covers(self, period_start: Optional[datetime]) -> bool:
+        """Muss für einen Zeitraum ab period_start (None = alles) das Archiv gelesen werden?"""
+        if self.watermark is None:
+            return False
+        return period_start is None or period_start < self.watermark
+
+    def set_watermark(self, watermark: Optional[datetime]):
+        if watermark != self.watermark:
+            self.watermark = watermark
+            self._folder_cache.clear()
+
+    def invalidate(self):
+        self._folder_cache.clear()
+
+    async def load(self, db):
+        state = await db[STATE_COLLECTION].find_one({"_id": "reports"}) or {}
+        self.set_watermark(state.get("archived_before"))
+        if state.get("version", 0) != self.version:
+            self.version = state.get("version", 0)
+            self._folder_cache.clear()
+
+    async def folder_counts(self, db, scope: Dict[str, Any], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Ordner-Gruppen des Archivs - gecacht, bis sich das Archiv ändert (auch auf anderen Workern)"""
+        # Ein Lookup per _id statt der Aggregation über das Archiv
+        await self.load(db)
+        if self.watermark is None:
+            return []
+        key = (scope.get("author_id"), self.watermark)
+        if key not in self._folder_cache:
+            self._folder_cache[key] = await db[ARCHIVE_COLLECTION].aggregate(pipeline).to_list(None)
+        return self._folder_cache[key]
+
+
+async def ensure_archive_collection(db):
+    """Archiv-Collection mit zstd-Blockkompression und Datums-Indizes anlegen"""
+    if ARCHIVE_COLLECTION not in await db.list_collection_names():
+        await db.create_collection(
+            ARCHIVE_COLLECTION,
+            storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}}
+        )
+    archive = db[ARCHIVE_COLLECTION]
+    await archive.create_index("id", unique=True)
+    await archive.create_index("created_at")
+    await archive.create_index([("author_id", 1), ("created_at", -1)])
+
+
+async def archive_old_reports(db, now: Optional[datetime] = None) -> int:
+    """Berichte vor der Archiv-Grenze verschieben - wiederholbar, falls ein Lauf abbricht"""
+    if REPORT_ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(days=REPORT_ARCHIVE_AFTER_DAYS)
+    await ensure_archive_collection(db)
+    # Grenze zuerst setzen, damit Leser das Archiv schon während des Verschiebens einbeziehen
+    await db[STATE_COLLECTION].update_one(
+        {"_id": "reports"}, {"$max": {"archived_before": cutoff}}, upsert=True
+    )
+
+    moved = 0
+    while True:
+        batch = await db.reports.find({"created_at": {"$lt": cutoff}}, {"_id": 0}) \
+            .limit(MOVE_BATCH_SIZE).to_list(MOVE_BATCH_SIZE)
+        if not batch:
+            break
+        await db[ARCHIVE_COLLECTION].bulk_write(
+            [ReplaceOne({"id": report["id"]}, report, upsert=True) for report in batch],
+            ordered=False
+        )
+        await db.reports.delete_many({"id": {"$in": [report["id"] for report in batch]}})
+        moved += len(batch)
+    if moved:
+        await mark_changed(db)
+    return moved
+
+
+async def mark_changed(db):
+    """Archiv-Inhalt geändert - alle Worker verwerfen ihre Ordner-Caches beim nächsten Zugriff"""
+    await db[STATE_COLLECTION].update_one({"_id": "reports"}, {"$inc": {"version": 1}}, upsert=True)
+
+
+async def restore(db, report_id: str) -> bool:
+    """Archivierten Bericht zurück in die heiße Collection holen (z.B. vor einer Bearbeitung)
+
+    Der Bericht behält sein altes created_at und liegt danach vor der Archiv-Grenze
+    in reports - find_page sortiert solche Berichte mit dem Archiv zusammen ein.
+    """
+    report = await db[ARCHIVE_COLLECTION].find_one({"id": report_id}, {"_id": 0})
+    if report is None:
+        return False
+    await db.reports.replace_one({"id": report_id}, report, upsert=True)
+    await db[ARCHIVE_COLLECTION].delete_one({"id": report_id})
+    await mark_changed(db)
+    return True
+
+
+async def find_one(db, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None):
+    """Bericht zuerst in reports, dann im Archiv suchen"""
+    report = await db.reports.find_one(query, projection)
+    if report is None:
+        report = await db[ARCHIVE_COLLECTION].find_one(query, projection)
+    return report
+
+
+async def find_page(db, archive: ReportArchive, query: Dict[str, Any], projection: Dict[str, Any],
+                    skip: int, limit: int, period_start: Optional[datetime] = None,
+                    with_total: bool = False):
+    """Seite über heiße und archivierte Berichte (created_at absteigend)
+
+    Heiße Berichte ab der Archiv-Grenze kommen zuerst. Ältere Berichte - das Archiv
+    und wiederhergestellte Berichte in reports - werden nach created_at zusammengeführt.
+    """
+    hot = db.reports
+    if not archive.covers(period_start):
+        reports = await hot.find(query, projection).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+        if with_total:
+            return reports, await hot.count_documents(query)
+        return reports
+
+    older = {"created_at": {"$lt": archive.watermark}}
+    # $nor statt $gte: Altdaten mit ISO-String bleiben wie bisher bei den heißen Berichten
+    newer_query = {"$and": [query, {"$nor": [older]}]}
+    reports = await hot.find(newer_query, projection).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    remaining = limit - len(reports)
+    if remaining > 0:
+        newer_total = await hot.count_documents(newer_query) if skip else len(reports)
+        reports += await _older_page(db, query, {"$and": [query, older]}, projection,
+                                     max(skip - newer_total, 0), remaining)
+    if with_total:
+        total = await hot.count_documents(query) + await db[ARCHIVE_COLLECTION].count_documents(query)
+        return reports, total
+    return reports
+
+
+async def _older_page(db, query: Dict[str, Any], restored_query: Dict[str, Any], projection: Dict[str, Any],
+                      skip: int, limit: int) -> List[Dict[str, Any]]:
+    """Ausschnitt [skip, skip + limit) aus Archiv und wiederhergestellten Berichten, created_at absteigend
+
+    Wiederhergestellte Berichte sind wenige: sie werden komplett gelesen, ihr Rang ergibt
+    sich aus der Zahl neuerer Archiv-Berichte. Vom Archiv reicht das Fenster ab skip - r.
+    Bei gleichem created_at steht der wiederhergestellte Bericht vorn.
+    """
+    cold = db[ARCHIVE_COLLECTION]
+    projection = {**projection, "created_at": 1}
+    restored = await db.reports.find(restored_query, projection).sort("created_at", -1).to_list(None)
+    if not restored:
+        return await cold.find(query, projection).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+
+    first = max(skip - len(restored), 0)
+    window = skip + limit - first
+    segment = await cold.find(query, projection).sort("created_at", -1).skip(first).limit(window).to_list(window)
+    ranked = []
+    for index, report in enumerate(restored):
+        newer = await cold.count_documents({"$and": [query, {"created_at": {"$gt": report["created_at"]}}]})
+        ranked.append((index + newer, report))
+    for index, report in enumerate(segment, start=first):
+        ahead = sum(1 for restored_report in restored if restored_report["created_at"] >= report["created_at"])
+        ranked.append((index + ahead, report))
+    ranked.sort(key=lambda item: item[0])
+    return [report for rank, report in ranked if skip <= rank < skip + limit]
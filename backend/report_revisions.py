@@ -0,0 +1,78 @@
+# 📝 Versionshistorie für Berichte in eigener Collection (report_revisions)
+# Gespeichert werden kompakte Rückwärts-Diffs: aus dem aktuellen Stand und den
+# Diffs lässt sich jede ältere Version rekonstruieren.
+
+import difflib
+import os
+from typing import Any, Dict, List, Optional
+
+# Maximale Anzahl gespeicherter Revisionen pro Bericht (ältere werden verworfen)
+REPORT_REVISION_LIMIT = int(os.getenv("REPORT_REVISION_LIMIT", "50"))
+
+# Felder, die versioniert werden - content als Zeilen-Diff, der Rest als alter Wert
+TEXT_FIELDS = ("content",)
+VALUE_FIELDS = ("title", "shift_date")
+
+
+def line_diff(new_text: str, old_text: str) -> List[List[Any]]:
+    """Patch, der new_text in old_text zurückverwandelt: [[start, ende, [alte Zeilen]], ...]"""
+    new_lines = (new_text or "").splitlines(keepends=True)
+    old_lines = (old_text or "").splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, new_lines, old_lines, autojunk=False)
+    return [
+        [i1, i2, old_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_line_diff(text: str, patch: List[List[Any]]) -> str:
+    lines = (text or "").splitlines(keepends=True)
+    # Von hinten anwenden, damit die Indizes gültig bleiben
+    for start, end, replacement in reversed(patch):
+        lines[start:end] = replacement
+    return "".join(lines)
+
+
+def build_revision(before: Dict[str, Any], after: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Rückwärts-Diff zwischen zwei Ständen - None, wenn sich nichts geändert hat"""
+    changes = {}
+    for field in VALUE_FIELDS:
+        if before.get(field) != after.get(field):
+            changes[field] = before.get(field)
+    patches = {}
+    for field in TEXT_FIELDS:
+        if before.get(field) != after.get(field):
+            patches[field] = line_diff(after.get(field), before.get(field))
+    if not changes and not patches:
+        return None
+    return {"values": changes, "patches": patches}
+
+
+def reconstruct(current: Dict[str, Any], revisions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Stand vor der ältesten übergebenen Revision (revisions neueste zuerst)"""
+    state = {field: current.get(field) for field in VALUE_FIELDS + TEXT_FIELDS}
+    for revision in revisions:
+        state.update(revision.get("values", {}))
+        for field, patch in revision.get("patches", {}).items():
+            state[field] = apply_line_diff(state[field], patch)
+    return state
+
+
+def legacy_revisions(report_id: str, edit_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Alte eingebettete edit_history-Einträge in Revisionen umwandeln"""
+    revisions = []
+    for number, entry in enumerate(edit_history, start=1):
+        changes = entry.get("changes", {})
+        before = {field: change.get("old") for field, change in changes.items()}
+        after = {field: change.get("new") for field, change in changes.items()}
+        diff = build_revision(before, after) or {"values": {}, "patches": {}}
+        revisions.append({
+            "report_id": report_id,
+            "revision": number,
+            "edited_by": entry.get("edited_by"),
+            "edited_by_name": entry.get("edited_by_name"),
+            "edited_at": entry.get("edited_at"),
+            **diff,
+        })
+    return revisions
@@ -0,0 +1,903 @@
+# 🗃️ Repository-Schicht für die Kern-Entitäten
+# Handler sprechen mit Repositories statt direkt mit Motor. DATABASE_TYPE wählt
+# die Implementierung:
+#   mongodb                  -> die Motor-Collections selbst (kein Overhead)
+#   sqlite/mysql/postgresql  -> SqlRepository (SQLAlchemy async), Dokumente als
+#                               JSON mit indizierten Spalten für häufige Filter
+# Die Schnittstelle ist die Teilmenge der Collection-API, die die Handler nutzen
+# (find/find_one/count_documents/insert/update/find_one_and_update/delete) mit
+# Mongo-Filtern und Update-Operatoren; bulk_write nimmt die pymongo-Requests
+# (InsertOne, UpdateOne, ...). aggregate und Change Streams gibt es nur mit MongoDB.
+
+import asyncio
+import json
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import db_transactions
+
+DATABASE_TYPE = os.getenv("DATABASE_TYPE", "mongodb").lower()
+
+SQL_BACKENDS = ("sqlite", "mysql", "postgresql", "postgres")
+
+# Entitäten mit Repository und ihre indizierten Spalten (Feld -> Typ)
+_REPORT_COLUMNS = {"author_id": "str", "incident_id": "str", "status": "str", "created_at": "datetime", "updated_at": "datetime"}
+ENTITY_COLUMNS: Dict[str, Dict[str, str]] = {
+    "users": {"email": "str", "username": "str", "role": "str", "status": "str", "last_check_in": "datetime"},
+    "incidents": {"status": "str", "priority": "str", "assigned_to": "str", "created_at": "datetime", "updated_at": "datetime"},
+    "messages": {"channel": "str", "sender_id": "str", "recipient_id": "str", "timestamp": "datetime"},
+    "reports": _REPORT_COLUMNS,
+    # Kalt-Archiv und Revisionen gehören zu den Berichten
+    "reports_archive": _REPORT_COLUMNS,
+    "report_revisions": {"report_id": "str", "revision": "int"},
+    "persons": {"status": "str", "is_active": "bool", "created_at": "datetime", "updated_at": "datetime"},
+    "teams": {"name": "str", "status": "str"},
+    "vacations": {"user_id": "str", "status": "str", "created_at": "datetime"},
+    "checkins": {"user_id": "str", "timestamp": "datetime"},
+    "checkin_rollups": {"user_id": "str", "day": "str", "month": "str"},
+    # Übrige Collections, damit die ganze API auch ohne MongoDB läuft
+    "shifts": {"team_id": "str", "district_id": "str", "start_time": "datetime", "end_time": "datetime"},
+    "locations": {"user_id": "str", "timestamp": "datetime"},
+    "districts": {"name": "str"},
+    "notifications": {"recipient_id": "str", "created_at": "datetime"},
+    "emergency_broadcasts": {"timestamp": "datetime"},
+    "app_config": {},
+}
+# Zeilen pro Batch beim Iterieren eines Cursors (async for)
+STREAM_BATCH_SIZE = int(os.getenv("SQL_STREAM_BATCH_SIZE", "500"))
+UNIQUE_COLUMNS = {"users": ("email",), "reports": ("incident_id",)}
+
+_MISSING = object()
+
+
+# ================================================
+# MONGO-SEMANTIK IN PYTHON (Filter, Updates, Projektion, Sortierung)
+# ================================================
+
+def _get(doc: Dict[str, Any], path: str):
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return _MISSING
+        value = value.get(part, _MISSING)
+    return value
+
+
+def _set(doc: Dict[str, Any], path: str, value: Any):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc: Dict[str, Any], path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def _type_rank(value: Any) -> int:
+    # Reihenfolge wie bei MongoDB: null < Zahlen < Strings < Objekte < Arrays < bool < Datum
+    if value is None or value is _MISSING:
+        return 0
+    if isinstance(value, bool):
+        return 5
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    if isinstance(value, datetime):
+        return 6
+    return 7
+
+
+def _compare(value: Any, operator: str, expected: Any) -> bool:
+    candidates = value if isinstance(value, list) else [value]
+    for candidate in candidates:
+        # Vergleiche nur innerhalb desselben Typs (wie MongoDB)
+        if candidate is _MISSING or candidate is None or _type_rank(candidate) != _type_rank(expected):
+            continue
+        if operator == "$gt" and candidate > expected:
+            return True
+        if operator == "$gte" and candidate >= expected:
+            return True
+        if operator == "$lt" and candidate < expected:
+            return True
+        if operator == "$lte" and candidate <= expected:
+            return True
+    return False
+
+
+def _regex(value: Any, pattern: Any, options: str = "") -> bool:
+    if not isinstance(pattern, re.Pattern):
+        pattern = re.compile(pattern, re.IGNORECASE if "i" in options else 0)
+    candidates = value if isinstance(value, list) else [value]
+    return any(isinstance(candidate, str) and pattern.search(candidate) for candidate in candidates)
+
+
+def _is_operator_dict(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Mongo-Filter (Teilmenge) gegen ein Dokument prüfen"""
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key == "$nor":
+            if any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(condition, re.Pattern):
+            if not _regex(value, condition):
+                return False
+        elif _is_operator_dict(condition):
+            for operator, expected in condition.items():
+                if operator == "$options":
+                    continue
+                if not _match_operator(value, operator, expected, condition.get("$options", "")):
+                    return False
+        elif not _equals(value, condition):
+            return False
+    return True
+
+
+def _match_operator(value: Any, operator: str, expected: Any, options: str) -> bool:
+    if operator == "$eq":
+        return _equals(value, expected)
+    if operator == "$ne":
+        return not _equals(value, expected)
+    if operator == "$in":
+        return any(_equals(value, item) for item in expected)
+    if operator == "$nin":
+        return not any(_equals(value, item) for item in expected)
+    if operator == "$exists":
+        return (value is not _MISSING) == bool(expected)
+    if operator in ("$gt", "$gte", "$lt", "$lte"):
+        return _compare(value, operator, expected)
+    if operator == "$regex":
+        return _regex(value, expected, options)
+    if operator == "$type":
+        return _type_matches(value, expected)
+    if operator == "$not":
+        return not matches({"v": value} if value is not _MISSING else {}, {"v": expected})
+    raise ValueError(f"Query-Operator {operator} wird von diesem Backend nicht unterstützt")
+
+
+def _type_matches(value: Any, expected: Any) -> bool:
+    names = {"string": str, "date": datetime, "bool": bool, "object": dict, "array": list, "null": type(None)}
+    if value is _MISSING or expected not in names:
+        return False
+    return isinstance(value, names[expected])
+
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False):
+    """Mongo-Update-Operatoren (Teilmenge) auf ein Dokument anwenden"""
+    for operator, fields in update.items():
+        if not operator.startswith("$"):
+            raise ValueError("Ersatz-Dokumente werden nicht unterstützt - Update-Operatoren verwenden")
+        for path, argument in fields.items():
+            current = _get(doc, path)
+            if operator == "$set":
+                _set(doc, path, argument)
+            elif operator == "$setOnInsert":
+                if inserting:
+                    _set(doc, path, argument)
+            elif operator == "$unset":
+                _unset(doc, path)
+            elif operator == "$inc":
+                _set(doc, path, (0 if current in (_MISSING, None) else current) + argument)
+            elif operator == "$min":
+                if current in (_MISSING, None) or argument < current:
+                    _set(doc, path, argument)
+            elif operator == "$max":
+                if current in (_MISSING, None) or argument > current:
+                    _set(doc, path, argument)
+            elif operator in ("$push", "$addToSet"):
+                items = argument["$each"] if isinstance(argument, dict) and "$each" in argument else [argument]
+                target = [] if current in (_MISSING, None) else list(current)
+                for item in items:
+                    if operator == "$push" or item not in target:
+                        target.append(item)
+                _set(doc, path, target)
+            elif operator == "$pull":
+                if isinstance(current, list):
+                    _set(doc, path, [item for item in current if item != argument])
+            else:
+                raise ValueError(f"Update-Operator {operator} wird von diesem Backend nicht unterstützt")
+
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return dict(doc)
+    include = [field for field, flag in projection.items() if flag and field != "_id"]
+    if include:
+        result = {}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        for field in include:
+            value = _get(doc, field)
+            if value is not _MISSING:
+                _set(result, field, value)
+        return result
+    result = dict(doc)
+    for field, flag in projection.items():
+        if not flag:
+            _unset(result, field)
+    return result
+
+
+def _sort_key(field: str):
+    def key(doc):
+        value = _get(doc, field)
+        return (_type_rank(value), value if value is not _MISSING and value is not None else 0)
+    return key
+
+
+def sort_documents(docs: List[Dict[str, Any]], sort: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    for field, direction in reversed(sort):
+        docs.sort(key=_sort_key(field), reverse=direction < 0)
+    return docs
+
+
+def _normalize_sort(key_or_list, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    return [(field, value) for field, value in key_or_list]
+
+
+# ================================================
+# JSON-SPEICHERFORMAT
+# ================================================
+
+def _encode(value: Any):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _decode_hook(obj: Dict[str, Any]):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def dumps_document(doc: Dict[str, Any]) -> str:
+    return orjson.dumps(doc, default=_encode, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS).decode()
+
+
+def loads_document(data: str) -> Dict[str, Any]:
+    return json.loads(data, object_hook=_decode_hook)
+
+
+def column_value(kind: str, value: Any):
+    """Wert für eine Filter-Spalte - None, wenn der Typ nicht passt (Filter läuft dann in Python)"""
+    if isinstance(value, Enum):
+        value = value.value
+    if kind == "str":
+        return value if isinstance(value, str) else None
+    if kind == "datetime":
+        return value if isinstance(value, datetime) else None
+    if kind == "bool":
+        return value if isinstance(value, bool) else None
+    if kind == "int":
+        return value if isinstance(value, int) and not isinstance(value, bool) else None
+    return None
+
+
+def document_row(columns: Dict[str, str], doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Tabellenzeile (id, data, Filter-Spalten) eines Dokuments"""
+    stored = {key: value for key, value in doc.items() if key != "_id"}
+    values = {"id": stored.get("id") if isinstance(stored.get("id"), str) else None, "data": dumps_document(stored)}
+    for field, kind in columns.items():
+        values[field] = column_value(kind, stored.get(field))
+    return values
+
+
+# ================================================
+# ERGEBNIS-OBJEKTE (wie pymongo)
+# ================================================
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+
+class BulkWriteResult:
+    def __init__(self, counts: Dict[str, int], upserted_ids: Dict[int, Any]):
+        self.inserted_count = counts["nInserted"]
+        self.matched_count = counts["nMatched"]
+        self.modified_count = counts["nModified"]
+        self.deleted_count = counts["nRemoved"]
+        self.upserted_count = counts["nUpserted"]
+        self.upserted_ids = upserted_ids
+        self.acknowledged = True
+
+
+# ================================================
+# SQL-BACKEND
+# ================================================
+
+@asynccontextmanager
+async def _writing(engine, write_lock: Optional[asyncio.Lock]):
+    """Schreib-Transaktion - bei SQLite ein Schreiber zur Zeit, sonst gehen $inc-Updates verloren"""
+    if write_lock is None:
+        async with engine.begin() as conn:
+            yield conn
+        return
+    async with write_lock:
+        async with engine.begin() as conn:
+            yield conn
+
+
+class SqlCursor:
+    """Cursor mit sort/skip/limit/to_list und async for wie bei Motor"""
+
+    def __init__(self, repository: "SqlRepository", query: Optional[Dict[str, Any]],
+                 projection: Optional[Dict[str, Any]], session=None):
+        self._repository = repository
+        self._query = query or {}
+        self._projection = projection
+        self._session = session
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit: Optional[int] = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count or None
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        limit = self._limit
+        if length is not None:
+            limit = length if limit is None else min(limit, length)
+        docs = await self._repository._find(self._query, self._sort, self._skip, limit, self._session)
+        return [project(doc, self._projection) for doc in docs]
+
+    async def __aiter__(self):
+        # In Batches wie bei Motor - Exporte und Rebuilds bleiben bei konstantem Speicher
+        async for doc in self._repository._stream(self._query, self._sort, self._skip, self._limit, self._session):
+            yield project(doc, self._projection)
+
+
+class SqlRepository:
+    """Dokument-Tabelle: pk, id, JSON-Daten und indizierte Spalten für häufige Filter
+
+    Filterbedingungen auf indizierten Spalten laufen in SQL, der Rest wird auf
+    den Kandidaten in Python geprüft.
+    """
+
+    def __init__(self, name: str, table, columns: Dict[str, str], engine, write_lock: Optional[asyncio.Lock]):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.engine = engine
+        self._write_lock = write_lock
+        self._for_update = engine.dialect.name != "sqlite"
+
+    # --- Zeilen <-> Dokumente -------------------------------------------------
+
+    def _column_value(self, kind: str, value: Any):
+        return column_value(kind, value)
+
+    def _row_values(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        return document_row(self.columns, doc)
+
+    @staticmethod
+    def _document(row) -> Dict[str, Any]:
+        doc = loads_document(row.data)
+        doc["_id"] = row.pk
+        return doc
+
+    # --- Filter in SQL übersetzen ---------------------------------------------
+
+    def _pushable(self, field: str, value: Any) -> bool:
+        kind = "str" if field == "id" else self.columns.get(field)
+        if kind is None or value is None:
+            return False
+        return self._column_value(kind, value) is not None
+
+    def _split(self, query: Dict[str, Any]):
+        """(SQL-Bedingungen, Rest-Filter für Python)"""
+        conditions = []
+        residual = {}
+        for field, condition in query.items():
+            column = self.table.c.get(field) if (field == "id" or field in self.columns) else None
+            if column is None:
+                residual[field] = condition
+            elif _is_operator_dict(condition):
+                pushed = []
+                for operator, value in condition.items():
+                    if operator == "$in" and all(self._pushable(field, item) for item in value):
+                        pushed.append(column.in_([self._column_value(self.columns.get(field, "str"), item) for item in value]))
+                    elif operator in ("$gt", "$gte", "$lt", "$lte", "$eq") and self._pushable(field, value):
+                        value = self._column_value(self.columns.get(field, "str"), value)
+                        pushed.append({"$gt": column > value, "$gte": column >= value, "$lt": column < value,
+                                       "$lte": column <= value, "$eq": column == value}[operator])
+                    else:
+                        pushed = None
+                        break
+                if pushed is None:
+                    residual[field] = condition
+                else:
+                    conditions.extend(pushed)
+            elif self._pushable(field, condition):
+                conditions.append(column == self._column_value(self.columns.get(field, "str"), condition))
+            else:
+                residual[field] = condition
+        return conditions, residual
+
+    def _sortable(self, sort: List[Tuple[str, int]]) -> bool:
+        return all(field == "id" or field in self.columns for field, _ in sort)
+
+    # --- Verbindungen ----------------------------------------------------------
+
+    @asynccontextmanager
+    async def _read(self, session):
+        if session is not None:
+            yield session
+        else:
+            async with self.engine.connect() as conn:
+                yield conn
+
+    @asynccontextmanager
+    async def _write(self, session):
+        if session is not None:
+            yield session
+        else:
+            async with _writing(self.engine, self._write_lock) as conn:
+                yield conn
+
+    async def _select(self, conn, query: Dict[str, Any], sort: List[Tuple[str, int]] = (),
+                      skip: int = 0, limit: Optional[int] = None, for_update: bool = False) -> List[Dict[str, Any]]:
+        from sqlalchemy import select
+
+        conditions, residual = self._split(query)
+        statement = select(self.table.c.pk, self.table.c.data).where(*conditions)
+        in_sql = not residual and self._sortable(sort)
+        if in_sql:
+            for field, direction in sort:
+                column = self.table.c[field]
+                statement = statement.order_by(column.desc() if direction < 0 else column.asc())
+            if skip:
+                statement = statement.offset(skip)
+            if limit is not None:
+                statement = statement.limit(limit)
+        if for_update and self._for_update:
+            statement = statement.with_for_update()
+        docs = [self._document(row) for row in (await conn.execute(statement)).all()]
+        if in_sql:
+            return docs
+        docs = [doc for doc in docs if matches(doc, residual)]
+        if sort:
+            sort_documents(docs, sort)
+        return docs[skip:skip + limit] if limit is not None else docs[skip:]
+
+    async def _find(self, query, sort, skip, limit, session) -> List[Dict[str, Any]]:
+        async with self._read(session) as conn:
+            return await self._select(conn, query, sort, skip, limit)
+
+    async def _stream(self, query, sort, skip, limit, session, batch_size: int = STREAM_BATCH_SIZE):
+        """Wie _find, aber über einen serverseitigen Cursor in Batches von batch_size Zeilen"""
+        from sqlalchemy import select
+
+        if not self._sortable(sort):
+            # Sortierung nach Feldern ohne eigene Spalte geht nur im Speicher
+            for doc in await self._find(query, sort, skip, limit, session):
+                yield doc
+            return
+        conditions, residual = self._split(query)
+        statement = select(self.table.c.pk, self.table.c.data).where(*conditions)
+        for field, direction in sort:
+            column = self.table.c[field]
+            statement = statement.order_by(column.desc() if direction < 0 else column.asc())
+        if not residual:
+            if skip:
+                statement = statement.offset(skip)
+            if limit is not None:
+                statement = statement.limit(limit)
+        # Rest-Filter in Python: skip/limit zählen erst die passenden Dokumente
+        skipped = returned = 0
+        async with self._read(session) as conn:
+            result = await conn.stream(statement.execution_options(yield_per=batch_size))
+            async for partition in result.partitions(batch_size):
+                for row in partition:
+                    doc = self._document(row)
+                    if residual:
+                        if not matches(doc, residual):
+                            continue
+                        if skipped < skip:
+                            skipped += 1
+                            continue
+                        if limit is not None and returned >= limit:
+                            await result.close()
+                            return
+                    returned += 1
+                    yield doc
+
+    # --- Collection-API ---------------------------------------------------------
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+             session=None, **kwargs) -> SqlCursor:
+        return SqlCursor(self, filter, projection, session)
+
+    async def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+                       session=None, **kwargs) -> Optional[Dict[str, Any]]:
+        docs = await self._find(filter or {}, [], 0, 1, session)
+        return project(docs[0], projection) if docs else None
+
+    async def count_documents(self, filter: Optional[Dict[str, Any]] = None, session=None, **kwargs) -> int:
+        from sqlalchemy import func, select
+
+        conditions, residual = self._split(filter or {})
+        async with self._read(session) as conn:
+            if not residual:
+                statement = select(func.count()).select_from(self.table).where(*conditions)
+                return (await conn.execute(statement)).scalar_one()
+            return len(await self._select(conn, filter or {}))
+
+    async def insert_one(self, document: Dict[str, Any], session=None, **kwargs) -> InsertOneResult:
+        from sqlalchemy.exc import IntegrityError
+
+        try:
+            async with self._write(session) as conn:
+                result = await conn.execute(self.table.insert().values(**self._row_values(document)))
+        except IntegrityError as e:
+            raise DuplicateKeyError(f"{self.name}: {e.orig}", 11000)
+        # Wie Motor: das eingefügte Dokument erhält seinen Schlüssel
+        document["_id"] = result.inserted_primary_key[0]
+        return InsertOneResult(document["_id"])
+
+    async def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True,
+                          session=None, **kwargs) -> InsertManyResult:
+        from sqlalchemy.exc import IntegrityError
+
+        documents = list(documents)
+        rows = [self._row_values(doc) for doc in documents]
+        if not rows:
+            return InsertManyResult([])
+        async with self._write(session) as conn:
+            try:
+                # Schneller Weg: ein executemany in einem Savepoint
+                async with conn.begin_nested():
+                    await conn.execute(self.table.insert(), rows)
+                return InsertManyResult([doc.get("id") for doc in documents])
+            except IntegrityError:
+                pass
+            # Einzeln einfügen und Fehler pro Zeile sammeln (wie ordered=False bei MongoDB)
+            errors = []
+            inserted = []
+            for index, row in enumerate(rows):
+                try:
+                    async with conn.begin_nested():
+                        await conn.execute(self.table.insert().values(**row))
+                    inserted.append(documents[index].get("id"))
+                except IntegrityError as e:
+                    errors.append({"index": index, "code": 11000, "errmsg": str(e.orig), "op": documents[index]})
+                    if ordered:
+                        break
+        raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted), "writeConcernErrors": [],
+                              "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []})
+
+    async def _update(self, filter: Dict[str, Any], update: Dict[str, Any], multi: bool, upsert: bool,
+                      session) -> Tuple[UpdateResult, List[Tuple[Dict[str, Any], Dict[str, Any]]]]:
+        """Passende Dokumente ändern - liefert (Ergebnis, [(vorher, nachher)])"""
+        from sqlalchemy.exc import IntegrityError
+
+        changed = []
+        try:
+            async with self._write(session) as conn:
+                docs = await self._select(conn, filter, limit=None if multi else 1, for_update=True)
+                modified = 0
+                for doc in docs:
+                    before = loads_document(dumps_document(doc))
+                    apply_update(doc, update)
+                    changed.append((before, doc))
+                    if doc != before:
+                        modified += 1
+                        await conn.execute(
+                            self.table.update().where(self.table.c.pk == doc["_id"]).values(**self._row_values(doc))
+                        )
+                if docs or not upsert:
+                    return UpdateResult(len(docs), modified), changed
+                # Upsert: Gleichheitsbedingungen des Filters bilden das neue Dokument
+                doc = {field: value for field, value in filter.items()
+                       if not field.startswith("$") and not _is_operator_dict(value)}
+                apply_update(doc, update, inserting=True)
+                result = await conn.execute(self.table.insert().values(**self._row_values(doc)))
+                doc["_id"] = result.inserted_primary_key[0]
+                changed.append((None, doc))
+                return UpdateResult(0, 0, doc["_id"]), changed
+        except IntegrityError as e:
+            raise DuplicateKeyError(f"{self.name}: {e.orig}", 11000)
+
+    async def update_one(self, filter, update, upsert: bool = False, session=None, **kwargs) -> UpdateResult:
+        result, _ = await self._update(filter, update, False, upsert, session)
+        return result
+
+    async def update_many(self, filter, update, upsert: bool = False, session=None, **kwargs) -> UpdateResult:
+        result, _ = await self._update(filter, update, True, upsert, session)
+        return result
+
+    async def find_one_and_update(self, filter, update, projection=None, return_document: bool = False,
+                                  upsert: bool = False, session=None, **kwargs) -> Optional[Dict[str, Any]]:
+        """return_document: ReturnDocument.BEFORE (False, Standard) oder ReturnDocument.AFTER (True)"""
+        _, changed = await self._update(filter, update, False, upsert, session)
+        if not changed:
+            return None
+        before, after = changed[0]
+        doc = after if return_document else before
+        return project(doc, projection) if doc is not None else None
+
+    async def replace_one(self, filter, replacement: Dict[str, Any], upsert: bool = False,
+                          session=None, **kwargs) -> UpdateResult:
+        from sqlalchemy.exc import IntegrityError
+
+        try:
+            async with self._write(session) as conn:
+                docs = await self._select(conn, filter, limit=1, for_update=True)
+                if docs:
+                    await conn.execute(
+                        self.table.update().where(self.table.c.pk == docs[0]["_id"]).values(**self._row_values(replacement))
+                    )
+                    return UpdateResult(1, 1)
+                if not upsert:
+                    return UpdateResult(0, 0)
+                result = await conn.execute(self.table.insert().values(**self._row_values(replacement)))
+                return UpdateResult(0, 0, result.inserted_primary_key[0])
+        except IntegrityError as e:
+            raise DuplicateKeyError(f"{self.name}: {e.orig}", 11000)
+
+    async def bulk_write(self, requests: Iterable[Any], ordered: bool = True, session=None, **kwargs) -> BulkWriteResult:
+        """pymongo-Requests der Reihe nach ausführen - Duplikat-Fehler gesammelt wie bei MongoDB"""
+        from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
+        counts = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0}
+        upserted: Dict[int, Any] = {}
+        errors = []
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    await self.insert_one(request._doc, session=session)
+                    counts["nInserted"] += 1
+                    continue
+                if isinstance(request, (DeleteOne, DeleteMany)):
+                    deleted = await self._delete(request._filter, isinstance(request, DeleteMany), session)
+                    counts["nRemoved"] += deleted.deleted_count
+                    continue
+                if isinstance(request, ReplaceOne):
+                    result = await self.replace_one(request._filter, request._doc, upsert=request._upsert, session=session)
+                elif isinstance(request, (UpdateOne, UpdateMany)):
+                    result, _ = await self._update(request._filter, request._doc, isinstance(request, UpdateMany),
+                                                   request._upsert, session)
+                else:
+                    raise TypeError(f"Unsupported bulk request: {request!r}")
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": request})
+                if ordered:
+                    break
+                continue
+            counts["nMatched"] += result.matched_count
+            counts["nModified"] += result.modified_count
+            if result.upserted_id is not None:
+                counts["nUpserted"] += 1
+                upserted[index] = result.upserted_id
+        if errors:
+            raise BulkWriteError({**counts, "writeErrors": errors, "writeConcernErrors": [],
+                                  "upserted": [{"index": index, "_id": _id} for index, _id in upserted.items()]})
+        return BulkWriteResult(counts, upserted)
+
+    async def _delete(self, filter: Dict[str, Any], multi: bool, session) -> DeleteResult:
+        async with self._write(session) as conn:
+            docs = await self._select(conn, filter, limit=None if multi else 1, for_update=True)
+            if docs:
+                await conn.execute(self.table.delete().where(self.table.c.pk.in_([doc["_id"] for doc in docs])))
+            return DeleteResult(len(docs))
+
+    async def delete_one(self, filter, session=None, **kwargs) -> DeleteResult:
+        return await self._delete(filter, False, session)
+
+    async def delete_many(self, filter, session=None, **kwargs) -> DeleteResult:
+        return await self._delete(filter, True, session)
+
+    async def create_index(self, *args, **kwargs):
+        """Indizes entstehen mit dem Tabellenschema (create_schema)"""
+        return None
+
+
+def build_tables(metadata):
+    """Eine Dokument-Tabelle pro Entität mit indizierten Filter-Spalten"""
+    from sqlalchemy import Boolean, Column, DateTime, Integer, String, Table, Text
+    from sqlalchemy.dialects.mysql import LONGTEXT
+
+    types = {"str": lambda: String(255), "datetime": lambda: DateTime(), "bool": lambda: Boolean(), "int": lambda: Integer()}
+    tables = {}
+    for name, columns in ENTITY_COLUMNS.items():
+        unique = UNIQUE_COLUMNS.get(name, ())
+        tables[name] = Table(
+            name, metadata,
+            Column("pk", Integer, primary_key=True, autoincrement=True),
+            Column("id", String(64), index=True),
+            Column("data", Text().with_variant(LONGTEXT(), "mysql"), nullable=False),
+            *[Column(field, types[kind](), index=True, unique=field in unique) for field, kind in columns.items()]
+        )
+    return tables
+
+
+# ================================================
+# REPOSITORY-CONTAINER
+# ================================================
+
+class Repositories:
+    """Repositories aller Kern-Entitäten (repos.users, repos["reports_archive"], ...)"""
+
+    def __init__(self, backend: str, repositories: Dict[str, Any], mongo_db=None, mongo_client=None, engine=None,
+                 metadata=None, write_lock: Optional[asyncio.Lock] = None):
+        self.backend = backend
+        self._repositories = repositories
+        self._mongo_db = mongo_db
+        self._mongo_client = mongo_client
+        self.engine = engine
+        self._metadata = metadata
+        self._write_lock = write_lock
+        self._read_only: Dict[str, "Repositories"] = {}
+        for name, repository in repositories.items():
+            setattr(self, name, repository)
+
+    @property
+    def is_mongo(self) -> bool:
+        return self.backend == "mongodb"
+
+    def __getitem__(self, name: str):
+        if name not in self._repositories and self.is_mongo:
+            return self._mongo_db[name]
+        return self._repositories[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._repositories
+
+    def read_only(self, policy: str = "lists") -> "Repositories":
+        """Repositories für reine Lesezugriffe - bei MongoDB mit der Read Preference der Policy"""
+        if not self.is_mongo or policy == "primary":
+            return self
+        if policy not in self._read_only:
+            import mongo_client
+            read_db = mongo_client.read_only_database(self._mongo_db, policy)
+            self._read_only[policy] = Repositories(self.backend, {name: read_db[name] for name in self._repositories},
+                                                   mongo_db=read_db, mongo_client=self._mongo_client)
+        return self._read_only[policy]
+
+    async def collection_names(self) -> List[str]:
+        if self.is_mongo:
+            return await self._mongo_db.list_collection_names()
+        return list(self._repositories)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Session/Verbindung für mehrere Schreibzugriffe am Stück (session=... an die Repositories)"""
+        if self.is_mongo:
+            async with db_transactions.maybe_transaction(self._mongo_client) as session:
+                yield session
+        else:
+            async with _writing(self.engine, self._write_lock) as conn:
+                yield conn
+
+    async def create_schema(self):
+        if self.engine is not None:
+            async with self.engine.begin() as conn:
+                await conn.run_sync(self._metadata.create_all)
+
+    async def health(self, timeout: float = 2.0) -> Dict[str, Any]:
+        """Erreichbarkeit der Datenbank (ping bzw. SELECT 1) mit Latenz"""
+        if not self.is_mongo:
+            from database_config import check_database_health
+            return {"backend": self.backend, **await check_database_health(self.engine, timeout)}
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._mongo_db.command("ping"), timeout)
+            result = {"status": "ok"}
+        except asyncio.TimeoutError:
+            result = {"status": "timeout", "error": f"no response within {timeout}s"}
+        except Exception as e:
+            result = {"status": "error", "error": type(e).__name__}
+        return {"backend": self.backend, **result, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    def metrics(self) -> Dict[str, Any]:
+        if self.is_mongo:
+            import mongo_client
+            return {"backend": self.backend, **mongo_client.monitor.snapshot()}
+        from database_config import get_engine_metrics
+        metrics = get_engine_metrics(self.engine)
+        snapshot = metrics.snapshot(self.engine.sync_engine.pool) if metrics else {}
+        return {"backend": self.backend, **snapshot}
+
+    async def close(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+
+
+def create_repositories(database_type: str = DATABASE_TYPE, mongo_db=None, mongo_client=None) -> Repositories:
+    database_type = database_type.lower()
+    if database_type in ("mongodb", "mongo"):
+        return Repositories("mongodb", {name: mongo_db[name] for name in ENTITY_COLUMNS},
+                            mongo_db=mongo_db, mongo_client=mongo_client)
+    if database_type not in SQL_BACKENDS:
+        raise ValueError(f"Unsupported database type: {database_type}")
+
+    from sqlalchemy import MetaData
+    from database_config import create_database_engine
+
+    engine = create_database_engine(database_type)
+    metadata = MetaData()
+    tables = build_tables(metadata)
+    # Zeilensperren (SELECT ... FOR UPDATE) gibt es bei SQLite nicht
+    write_lock = asyncio.Lock() if engine.dialect.name == "sqlite" else None
+    repositories = {
+        name: SqlRepository(name, tables[name], ENTITY_COLUMNS[name], engine, write_lock)
+        for name in ENTITY_COLUMNS
+    }
+    return Repositories(database_type, repositories, engine=engine, metadata=metadata, write_lock=write_lock)
@@ -0,0 +1,104 @@
+# 🗃️ Response-Cache mit versionsbasierten ETags
+# Für häufig gepollte, selten geänderte GET-Endpunkte
+
+import hashlib
+import time
+from typing import Dict, Optional, Tuple
+
+# Schlüssel: (Route, Rolle, Query-String)
+CacheKey = Tuple[str, str, str]
+
+
+class CachedResponse:
+    """Fertig serialisierte Antwort inkl. ETag"""
+
+    __slots__ = ("etag", "body", "headers", "media_type", "version", "expires_at")
+
+    def __init__(self, etag, body, headers, media_type, version, expires_at):
+        self.etag = etag
+        self.body = body
+        self.headers = headers
+        self.media_type = media_type
+        self.version = version
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Antworten je (Route, Rolle, Query) - invalidiert über Ressourcen-Versionen
+
+    Schreibende Handler rufen bump() für die betroffene Ressource auf.
+    Die TTL begrenzt zusätzlich die Veraltung bei mehreren Workern.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._versions: Dict[str, int] = {}
+        self._entries: Dict[CacheKey, CachedResponse] = {}
+
+    def version(self, resource: str) -> int:
+        return self._versions.get(resource, 0)
+
+    def bump(self, *resources: str):
+        """Ressourcen als geändert markieren (alle zugehörigen Einträge werden ungültig)"""
+        for resource in resources:
+            self._versions[resource] = self._versions.get(resource, 0) + 1
+
+    def bump_all(self):
+        for resource in list(self._versions):
+            self._versions[resource] += 1
+        self._entries.clear()
+
+    def lookup(self, key: CacheKey, resource: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.version != self.version(resource) or entry.expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def store(self, key: CacheKey, version: int, ttl: float, body: bytes,
+              headers: Dict[str, str], media_type: Optional[str]) -> CachedResponse:
+        """Antwort ablegen - version muss VOR dem Handler-Aufruf gelesen worden sein"""
+        if len(self._entries) >= self.max_entries:
+            # Ältesten Eintrag verwerfen (dicts behalten die Einfügereihenfolge)
+            self._entries.pop(next(iter(self._entries)))
+        # Inhalts-Hash hält den ETag über TTL-Ablauf, Neustarts und Worker hinweg stabil
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        etag = f'W/"{version}-{digest}"'
+        entry = CachedResponse(etag, body, headers, media_type, version, time.monotonic() + ttl)
+        self._entries[key] = entry
+        return entry
+
+
+class UserRoles:
+    """Zuletzt bekannte Rolle je Benutzer (None = gelöscht), gepflegt von Schreib-Handlern und der Token-Prüfung
+
+    Cache-Treffer vertrauen der Rolle im Token (7 Tage gültig) - weicht sie hiervon ab,
+    wird der Cache umgangen und der Handler prüft den Benutzer in der Datenbank.
+    Pro Worker-Prozess; höchstens ein Eintrag je Benutzer.
+    """
+
+    def __init__(self):
+        self._roles: Dict[str, Optional[str]] = {}
+
+    def record(self, user_id: str, role: Optional[str]):
+        self._roles[user_id] = role
+
+    def stale(self, user_id: Optional[str], token_role: str) -> bool:
+        if user_id is None:
+            return True
+        return user_id in self._roles and self._roles[user_id] != token_role
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match gegen ETag prüfen (Liste oder *)"""
+    if not if_none_match:
+        return False
+    # Schwacher Vergleich (RFC 7232): W/-Präfix wird ignoriert
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
@@ -0,0 +1,208 @@
+# 🗜️ Kompression dynamischer Antworten (Listen, Berichte, Exporte)
+# Kodierung per Accept-Encoding (zstd, Brotli, Gzip), kleine Antworten bleiben
+# unkomprimiert. Große Bodies werden im Thread-Pool komprimiert, damit der Event-Loop
+# frei bleibt; gestreamte Exporte werden Chunk für Chunk komprimiert.
+# Kosten/Nutzen je Verfahren und Stufe: bench_compression.py
+
+import asyncio
+import gzip
+import os
+import zlib
+from functools import partial
+from typing import Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from static_assets import is_compressible, negotiate_encoding
+
+try:
+    import brotli
+except ImportError:  # Brotli optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstd optional
+    zstandard = None
+
+# Unterhalb dieser Größe kostet die Kompression mehr als sie spart
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# Ab dieser Größe im Thread-Pool komprimieren (kleine Bodies sind im Event-Loop schneller)
+COMPRESSION_THREAD_MIN_BYTES = int(os.getenv("COMPRESSION_THREAD_MIN_BYTES", str(64 * 1024)))
+# Gestreamte Antworten bis zu dieser Größe puffern und am Stück komprimieren, danach inkrementell
+COMPRESSION_BUFFER_BYTES = int(os.getenv("COMPRESSION_BUFFER_BYTES", str(256 * 1024)))
+# Niedrige Stufen: dynamische Antworten werden bei jedem Abruf neu komprimiert
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# zstd 1 ist laut bench_compression.py schneller und kleiner als 3
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "1"))
+# Bevorzugte Reihenfolge bei gleicher Gewichtung im Accept-Encoding
+COMPRESSION_ENCODINGS = [e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if e.strip()]
+
+_MODULES = {"zstd": lambda: zstandard, "br": lambda: brotli, "gzip": lambda: gzip}
+
+
+def available_encodings(preferred: Iterable[str] = COMPRESSION_ENCODINGS) -> Tuple[str, ...]:
+    return tuple(encoding for encoding in preferred if encoding in _MODULES and _MODULES[encoding]() is not None)
+
+
+def compress(encoding: str, data: bytes, level: Optional[int] = None) -> bytes:
+    if encoding == "zstd":
+        # ZstdCompressor ist nicht thread-sicher - pro Aufruf ein eigener
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL if level is None else level).compress(data)
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY if level is None else level)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL if level is None else level, mtime=0)
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+class StreamCompressor:
+    """Inkrementelle Kompression für gestreamte Antworten"""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == "gzip":
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            raise ValueError(f"Unknown encoding: {encoding}")
+        self.encoding = encoding
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+async def _run(function, data: bytes, thread_min_size: int) -> bytes:
+    if len(data) >= thread_min_size:
+        return await asyncio.to_thread(function, data)
+    return function(data)
+
+
+class CompressionMiddleware:
+    """ASGI-Middleware: komprimiert Antworten ab minimum_size mit der ausgehandelten Kodierung
+
+    Nicht angefasst werden HEAD, 204/304, bereits kodierte Antworten (vorkomprimierte
+    statische Dateien), nicht komprimierbare Typen und Cache-Control: no-transform.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_BYTES,
+                 thread_min_size: int = COMPRESSION_THREAD_MIN_BYTES,
+                 buffer_size: int = COMPRESSION_BUFFER_BYTES,
+                 encodings: Iterable[str] = COMPRESSION_ENCODINGS):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_min_size = thread_min_size
+        self.buffer_size = buffer_size
+        self.encodings = available_encodings(encodings)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self.minimum_size, self.thread_min_size, self.buffer_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int, thread_min_size: int, buffer_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.thread_min_size = thread_min_size
+        self.buffer_size = buffer_size
+        self.start: Optional[Message] = None
+        self.headers: Optional[MutableHeaders] = None
+        self.buffer = []
+        self.buffered = 0
+        self.stream: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    def _eligible(self) -> bool:
+        status = self.start["status"]
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in self.headers or "no-transform" in self.headers.get("cache-control", ""):
+            return False
+        return is_compressible(self.headers.get("content-type", ""))
+
+    def _encoded_headers(self, length: Optional[int]):
+        self.headers["Content-Encoding"] = self.encoding
+        if length is None:
+            del self.headers["Content-Length"]
+        else:
+            self.headers["Content-Length"] = str(length)
+        # Der komprimierte Body ist nicht byte-gleich - nur noch schwacher ETag (304 bleibt möglich)
+        etag = self.headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            self.headers["ETag"] = f"W/{etag}"
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.headers = MutableHeaders(raw=message["headers"])
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is not None:
+            chunk = await _run(self.stream.compress, body, self.thread_min_size) if body else b""
+            if not more_body:
+                chunk += self.stream.finish()
+            if chunk or not more_body:
+                await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        if not self.buffer and not self._eligible():
+            self.passthrough = True
+            await self._send(self.start)
+            await self._send(message)
+            return
+
+        # Auch Antworten durch @app.middleware("http") kommen in mehreren Chunks - bis
+        # buffer_size sammeln, damit Mindestgröße und Content-Length für JSON-Listen greifen
+        self.buffer.append(body)
+        self.buffered += len(body)
+        if more_body and self.buffered < self.buffer_size:
+            return
+        body = b"".join(self.buffer)
+        self.buffer = []
+        self.headers.add_vary_header("Accept-Encoding")
+
+        if not more_body:
+            # Vollständiger Body - nur komprimieren, wenn es sich lohnt
+            self.passthrough = True
+            if len(body) >= self.minimum_size:
+                encoded = await _run(partial(compress, self.encoding), body, self.thread_min_size)
+                if len(encoded) < len(body):
+                    self._encoded_headers(len(encoded))
+                    body = encoded
+            await self._send(self.start)
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        # Lange Streams (Exporte): Länge unbekannt, Chunk für Chunk komprimieren
+        self.stream = StreamCompressor(self.encoding)
+        self._encoded_headers(None)
+        await self._send(self.start)
+        chunk = await _run(self.stream.compress, body, self.thread_min_size)
+        if chunk:
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": True})
@@ -0,0 +1,409 @@
+# 🗓️ Dienstplan-Engine: Schichten und genehmigter Urlaub im Speicher
+# Intervall-Index pro Team, Bezirk und Benutzer - beantwortet "wer ist zur
+# Zeit T im Bezirk D im Dienst" und "welche Teams sind in den nächsten
+# Stunden unterbesetzt" ohne Datenbankabfrage.
+
+import bisect
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from exports import parse_date
+
+# Mindestbesetzung pro Schicht, falls das Team kein eigenes min_staff hat
+ROSTER_MIN_STAFF = int(os.getenv("ROSTER_MIN_STAFF", "2"))
+# Abstand der Komplett-Neuladung (Änderungen anderer Worker) in Sekunden
+ROSTER_REFRESH_INTERVAL = int(os.getenv("ROSTER_REFRESH_INTERVAL", "60"))
+# Wie weit genehmigter Urlaub zurück geladen wird (Abdeckungs-Übersicht rückblickend)
+ROSTER_VACATION_HISTORY_DAYS = int(os.getenv("ROSTER_VACATION_HISTORY_DAYS", "366"))
+
+Interval = Tuple[datetime, datetime, str]  # (Beginn, Ende, id) - Ende exklusiv
+
+
+class IntervalIndex:
+    """Nach Beginn sortierte Intervalle + längste Dauer
+
+    Alle Intervalle, die T enthalten, beginnen in [T - längste Dauer, T] -
+    Abfragen kosten O(log n + Treffer) über zwei Binärsuchen.
+    """
+
+    def __init__(self):
+        self._starts: List[datetime] = []
+        self._intervals: List[Interval] = []
+        # Wird beim Entfernen nicht verkleinert (bleibt korrekt, nur etwas großzügiger)
+        self._max_length = timedelta(0)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def add(self, start: datetime, end: datetime, key: str):
+        position = bisect.bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self._intervals.insert(position, (start, end, key))
+        self._max_length = max(self._max_length, end - start)
+
+    def remove(self, start: datetime, key: str) -> bool:
+        position = bisect.bisect_left(self._starts, start)
+        while position < len(self._starts) and self._starts[position] == start:
+            if self._intervals[position][2] == key:
+                del self._starts[position]
+                del self._intervals[position]
+                return True
+            position += 1
+        return False
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Interval]:
+        """Intervalle, die [start, end) schneiden"""
+        low = bisect.bisect_left(self._starts, start - self._max_length)
+        high = bisect.bisect_left(self._starts, end)
+        return [interval for interval in self._intervals[low:high] if interval[1] > start]
+
+    def at(self, moment: datetime) -> List[Interval]:
+        """Intervalle, die den Zeitpunkt enthalten"""
+        low = bisect.bisect_left(self._starts, moment - self._max_length)
+        high = bisect.bisect_right(self._starts, moment)
+        return [interval for interval in self._intervals[low:high] if interval[1] > moment]
+
+
+def merge_spans(spans: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """Überlappende Zeiträume einer Person zusammenfassen (sonst doppelt gezählt)"""
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _as_datetime(value: Any, end: bool = False) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    parsed = parse_date(value)
+    # Reine Datumsangabe als Ende: der ganze Tag zählt noch dazu
+    if parsed is not None and end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def parse_vacation_dates(start_date: str, end_date: str) -> Tuple[datetime, datetime]:
+    """Antragsdaten in [Beginn, Ende) umwandeln - ValueError bei ungültigen Daten"""
+    start = _as_datetime(start_date)
+    end = _as_datetime(end_date, end=True)
+    if start is None or end is None:
+        raise ValueError("start_date and end_date are required")
+    if end <= start:
+        raise ValueError("end_date must not be before start_date")
+    return start, end
+
+
+def vacation_interval(vacation: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+    """Urlaub als [Beginn, Ende) - None bei fehlenden oder ungültigen Daten"""
+    # Neue Anträge tragen das geparste Intervall mit, Altdaten nur die Strings
+    if isinstance(vacation.get("start_at"), datetime) and isinstance(vacation.get("end_at"), datetime):
+        return vacation["start_at"], vacation["end_at"]
+    try:
+        start = _as_datetime(vacation.get("start_date"))
+        end = _as_datetime(vacation.get("end_date"), end=True)
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if start is None or end is None or end <= start:
+        return None
+    return start, end
+
+
+class Roster:
+    def __init__(self):
+        self.shifts: Dict[str, Dict[str, Any]] = {}
+        self.by_team: Dict[str, IntervalIndex] = defaultdict(IntervalIndex)
+        self.by_district: Dict[str, IntervalIndex] = defaultdict(IntervalIndex)
+        self.vacations: Dict[str, Tuple[str, datetime, datetime]] = {}  # id -> (user_id, Beginn, Ende)
+        self.vacations_by_user: Dict[str, IntervalIndex] = defaultdict(IntervalIndex)
+        self.vacations_by_team: Dict[str, IntervalIndex] = defaultdict(IntervalIndex)
+        self.teams: Dict[str, Dict[str, Any]] = {}
+        self.user_teams: Dict[str, Set[str]] = defaultdict(set)
+        self.user_names: Dict[str, str] = {}
+
+    # ---------- Pflege ----------
+
+    def add_shift(self, shift: Dict[str, Any]):
+        self.remove_shift(shift["id"])
+        self.shifts[shift["id"]] = shift
+        self.by_team[shift["team_id"]].add(shift["start_time"], shift["end_time"], shift["id"])
+        self.by_district[shift["district_id"]].add(shift["start_time"], shift["end_time"], shift["id"])
+
+    def remove_shift(self, shift_id: str):
+        shift = self.shifts.pop(shift_id, None)
+        if shift is None:
+            return
+        self.by_team[shift["team_id"]].remove(shift["start_time"], shift_id)
+        self.by_district[shift["district_id"]].remove(shift["start_time"], shift_id)
+
+    def set_vacation(self, vacation: Dict[str, Any]):
+        """Nur genehmigter Urlaub zählt - andere Stati entfernen den Eintrag"""
+        self.remove_vacation(vacation["id"])
+        if vacation.get("status") != "approved":
+            return
+        interval = vacation_interval(vacation)
+        if interval is None:
+            return
+        start, end = interval
+        user_id = vacation["user_id"]
+        self.vacations[vacation["id"]] = (user_id, start, end)
+        self.vacations_by_user[user_id].add(start, end, vacation["id"])
+        for team_id in self.user_teams.get(user_id, ()):
+            self.vacations_by_team[team_id].add(start, end, vacation["id"])
+
+    def remove_vacation(self, vacation_id: str):
+        entry = self.vacations.pop(vacation_id, None)
+        if entry is not None:
+            user_id, start, _ = entry
+            self.vacations_by_user[user_id].remove(start, vacation_id)
+            for team_id in self.user_teams.get(user_id, ()):
+                self.vacations_by_team[team_id].remove(start, vacation_id)
+
+    def set_team(self, team: Dict[str, Any]):
+        team_id = team["id"]
+        previous = self.teams.get(team_id)
+        if previous:
+            for member in previous["members"]:
+                self.user_teams[member].discard(team_id)
+        members = list(team.get("members") or [])
+        self.teams[team_id] = {
+            "name": team.get("name"),
+            "members": members,
+            "min_staff": team.get("min_staff") or ROSTER_MIN_STAFF,
+        }
+        for member in members:
+            self.user_teams[member].add(team_id)
+        # Urlaubs-Index des Teams passend zur neuen Besetzung neu aufbauen
+        index = IntervalIndex()
+        for vacation_id, (user_id, start, end) in self.vacations.items():
+            if team_id in self.user_teams.get(user_id, ()):
+                index.add(start, end, vacation_id)
+        self.vacations_by_team[team_id] = index
+
+    def set_user_name(self, user_id: str, username: str):
+        self.user_names[user_id] = username
+
+    # ---------- Abfragen ----------
+
+    def on_vacation(self, user_id: str, start: datetime, end: datetime) -> bool:
+        index = self.vacations_by_user.get(user_id)
+        return bool(index and index.overlapping(start, end))
+
+    def available_members(self, team_id: str, start: datetime, end: datetime) -> List[str]:
+        team = self.teams.get(team_id)
+        if team is None:
+            return []
+        return [member for member in team["members"] if not self.on_vacation(member, start, end)]
+
+    def shifts_between(self, start: datetime, end: datetime, team_id: Optional[str] = None,
+                       district_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        if team_id:
+            indexes: Iterable[IntervalIndex] = [self.by_team.get(team_id) or IntervalIndex()]
+        elif district_id:
+            indexes = [self.by_district.get(district_id) or IntervalIndex()]
+        else:
+            indexes = self.by_district.values()
+        shifts = [self.shifts[key] for index in indexes for _, _, key in index.overlapping(start, end)]
+        if team_id and district_id:
+            shifts = [shift for shift in shifts if shift["district_id"] == district_id]
+        return sorted(shifts, key=lambda shift: shift["start_time"])
+
+    def on_duty(self, moment: datetime, district_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Beamte im Dienst zum Zeitpunkt (Schicht des Teams läuft, kein Urlaub)"""
+        indexes = [self.by_district.get(district_id) or IntervalIndex()] if district_id else self.by_district.values()
+        on_duty = []
+        seen: Set[str] = set()
+        end = moment + timedelta(microseconds=1)
+        for index in indexes:
+            for _, _, shift_id in index.at(moment):
+                shift = self.shifts[shift_id]
+                for user_id in self.available_members(shift["team_id"], moment, end):
+                    if user_id in seen:
+                        continue
+                    seen.add(user_id)
+                    on_duty.append({
+                        "user_id": user_id,
+                        "username": self.user_names.get(user_id),
+                        "team_id": shift["team_id"],
+                        "team_name": self.teams.get(shift["team_id"], {}).get("name"),
+                        "district_id": shift["district_id"],
+                        "shift_id": shift_id,
+                        "shift_end": shift["end_time"],
+                    })
+        return on_duty
+
+    def understaffed(self, now: datetime, hours: float = 8) -> List[Dict[str, Any]]:
+        """Schichten im Zeitfenster, deren Team weniger verfügbare Mitglieder als min_staff hat"""
+        horizon = now + timedelta(hours=hours)
+        results = []
+        for team_id, index in self.by_team.items():
+            team = self.teams.get(team_id, {"name": None, "members": [], "min_staff": ROSTER_MIN_STAFF})
+            for start, end, shift_id in index.overlapping(now, horizon):
+                window_start, window_end = max(start, now), min(end, horizon)
+                available = self.available_members(team_id, window_start, window_end)
+                if len(available) >= team["min_staff"]:
+                    continue
+                shift = self.shifts[shift_id]
+                results.append({
+                    "team_id": team_id,
+                    "team_name": team["name"],
+                    "district_id": shift["district_id"],
+                    "shift_id": shift_id,
+                    "start_time": start,
+                    "end_time": end,
+                    "available": len(available),
+                    "min_staff": team["min_staff"],
+                    "missing": team["min_staff"] - len(available),
+                    "on_vacation": [member for member in team["members"] if member not in available],
+                })
+        return sorted(results, key=lambda item: (item["start_time"], -item["missing"]))
+
+    # ---------- Urlaubsplanung ----------
+
+    def _absences(self, team_id: str, start: datetime, end: datetime,
+                  extra: Optional[Tuple[str, datetime, datetime]] = None) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """Abwesenheiten je Mitglied im Fenster [start, end), zusammengefasst und zugeschnitten"""
+        spans: Dict[str, List[Tuple[datetime, datetime]]] = defaultdict(list)
+        index = self.vacations_by_team.get(team_id)
+        for vacation_start, vacation_end, vacation_id in (index.overlapping(start, end) if index else []):
+            user_id = self.vacations[vacation_id][0]
+            spans[user_id].append((max(vacation_start, start), min(vacation_end, end)))
+        if extra is not None:
+            user_id, extra_start, extra_end = extra
+            if extra_start < end and extra_end > start:
+                spans[user_id].append((max(extra_start, start), min(extra_end, end)))
+        return {user_id: merge_spans(user_spans) for user_id, user_spans in spans.items()}
+
+    def team_strength(self, team_id: str, start: datetime, end: datetime,
+                      extra: Optional[Tuple[str, datetime, datetime]] = None) -> Dict[str, Any]:
+        """Sweep-Line über Urlaubs-Beginn/-Ende: verbleibende Teamstärke im Zeitraum
+
+        Mit extra läuft die Teamstärke ohne den Antrag mit: caused_by_request markiert
+        Zeiträume, die erst durch diesen Antrag unter min_staff fallen.
+        """
+        team = self.teams[team_id]
+        size = len(team["members"])
+        absences = self._absences(team_id, start, end, extra)
+        baseline = self._absences(team_id, start, end) if extra is not None else absences
+
+        # (Zeitpunkt, Delta mit Antrag, Delta ohne Antrag)
+        events = []
+        for spans in absences.values():
+            for span_start, span_end in spans:
+                events.append((span_start, 1, 0))
+                events.append((span_end, -1, 0))
+        for spans in baseline.values():
+            for span_start, span_end in spans:
+                events.append((span_start, 0, 1))
+                events.append((span_end, 0, -1))
+        # Bei gleichem Zeitpunkt zuerst Enden verarbeiten (Ende ist exklusiv)
+        events.sort(key=lambda event: (event[0], event[1] + event[2]))
+
+        absent = absent_before = max_absent = 0
+        periods: List[Dict[str, Any]] = []
+
+        def close_period(period_start: datetime, period_end: datetime):
+            if period_end <= period_start or size - absent >= team["min_staff"]:
+                return
+            caused = size - absent_before >= team["min_staff"]
+            if (periods and periods[-1]["end"] == period_start and periods[-1]["available"] == size - absent
+                    and periods[-1]["caused_by_request"] == caused):
+                periods[-1]["end"] = period_end
+            else:
+                periods.append({"start": period_start, "end": period_end, "available": size - absent,
+                                "caused_by_request": caused})
+
+        cursor = start
+        for moment, delta, delta_before in events:
+            close_period(cursor, moment)
+            cursor = max(cursor, moment)
+            absent += delta
+            absent_before += delta_before
+            max_absent = max(max_absent, absent)
+        close_period(cursor, end)
+
+        return {
+            "team_id": team_id,
+            "team_name": team["name"],
+            "team_size": size,
+            "min_staff": team["min_staff"],
+            "min_available": size - max_absent,
+            "understaffed": bool(periods),
+            # Nur diese Unterbesetzung blockiert eine Genehmigung - bestehende ist lediglich ein Hinweis
+            "caused_by_request": any(period["caused_by_request"] for period in periods),
+            "understaffed_periods": periods,
+            "absent_members": [
+                {"user_id": user_id, "username": self.user_names.get(user_id)}
+                for user_id in absences if extra is None or user_id != extra[0]
+            ],
+        }
+
+    def vacation_conflicts(self, user_id: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Teamstärke je Team des Antragstellers, falls der Urlaub genehmigt würde"""
+        return [
+            self.team_strength(team_id, start, end, extra=(user_id, start, end))
+            for team_id in sorted(self.user_teams.get(user_id, ()))
+            if team_id in self.teams
+        ]
+
+    def daily_coverage(self, team_id: str, first_day: date, last_day: date) -> List[Dict[str, Any]]:
+        """Verfügbare Mitglieder pro Tag - ein Durchlauf über ein Differenz-Array"""
+        team = self.teams[team_id]
+        size = len(team["members"])
+        days = (last_day - first_day).days + 1
+        window_start = datetime.combine(first_day, datetime.min.time())
+        window_end = window_start + timedelta(days=days)
+
+        diff = [0] * (days + 1)
+        for spans in self._absences(team_id, window_start, window_end).values():
+            for span_start, span_end in spans:
+                # Ein angebrochener Urlaubstag zählt als abwesend
+                first = (span_start - window_start).days
+                last = (span_end - timedelta(microseconds=1) - window_start).days
+                diff[first] += 1
+                diff[last + 1] -= 1
+
+        coverage = []
+        absent = 0
+        for offset in range(days):
+            absent += diff[offset]
+            coverage.append({
+                "date": (first_day + timedelta(days=offset)).isoformat(),
+                "team_size": size,
+                "on_vacation": absent,
+                "available": size - absent,
+                "understaffed": size - absent < team["min_staff"],
+            })
+        return coverage
+
+
+def vacation_window_query(since: datetime) -> Dict[str, Any]:
+    """Genehmigter Urlaub, der nach since endet - Altdaten ohne end_at über den Datums-String"""
+    return {"status": "approved", "$or": [
+        {"end_at": {"$gte": since}},
+        {"end_at": None, "end_date": {"$gte": since.date().isoformat()}},
+    ]}
+
+
+async def load_roster(db) -> Roster:
+    """Komplett aus MongoDB aufbauen (Schichten ab gestern, Urlaub der letzten ROSTER_VACATION_HISTORY_DAYS)"""
+    roster = Roster()
+    now = datetime.utcnow()
+    since = now - timedelta(days=1)
+    async for team in db.teams.find({}, {"_id": 0, "id": 1, "name": 1, "members": 1, "min_staff": 1}):
+        if team.get("id"):
+            roster.set_team(team)
+    member_ids = {member for team in roster.teams.values() for member in team["members"]}
+    async for user in db.users.find({"id": {"$in": list(member_ids)}}, {"_id": 0, "id": 1, "username": 1}):
+        roster.set_user_name(user["id"], user.get("username"))
+    async for shift in db.shifts.find({"end_time": {"$gt": since}}, {"_id": 0}):
+        roster.add_shift(shift)
+    # Die Abdeckungs-Übersicht darf zurückblicken - aber nicht über die ganze Historie
+    vacation_since = now - timedelta(days=ROSTER_VACATION_HISTORY_DAYS)
+    async for vacation in db.vacations.find(vacation_window_query(vacation_since), {"_id": 0}):
+        roster.set_vacation(vacation)
+    return roster
@@ -0,0 +1,319 @@
+# 🔎 Eingebetteter Volltext-Index für Personen, Vorfälle und Berichte
+# Invertierter Index im Speicher mit Präfix- und Fehlertoleranz-Suche,
+# Umlaut-Faltung für deutsche Namen und Relevanz-Ranking (IDF x Feldgewicht)
+
+import bisect
+import math
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+DocKey = Tuple[str, str]  # (Typ, id)
+
+# Feldgewichte je Dokumenttyp
+FIELD_WEIGHTS = {
+    "persons": {
+        "case_number": 4.0,
+        "last_name": 3.0,
+        "first_name": 3.0,
+        "last_seen_location": 1.5,
+        "description": 1.0,
+    },
+    "incidents": {
+        "title": 3.0,
+        "address": 2.0,
+        "description": 1.0,
+    },
+    "reports": {
+        "title": 3.0,
+        "content": 1.0,
+    },
+}
+
+# Gewichtung nach Art des Treffers
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.5
+FUZZY_MATCH = 0.4
+
+MAX_PREFIX_EXPANSIONS = 64
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+
+# Häufige deutsche Füllwörter werden nicht indiziert
+STOPWORDS = frozenset("""
+    der die das den dem des ein eine einer einem einen und oder aber in im
+    ins an am auf aus bei mit nach von vom zu zum zur fur uber unter vor ist
+    sind war wurde wurden hat haben als auch es sie er wir ich nicht noch so
+""".split())
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+_DIGRAPHS = (("ae", "a"), ("oe", "o"), ("ue", "u"))
+
+
+def fold(text: str) -> str:
+    """Kleinschreibung + Umlaut-Faltung: Müller, Mueller und Muller ergeben 'muller'"""
+    text = text.lower().replace("ß", "ss")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    for digraph, vowel in _DIGRAPHS:
+        text = text.replace(digraph, vowel)
+    return text
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [token for token in _TOKEN_RE.findall(fold(str(text))) if token not in STOPWORDS]
+
+
+def _deletes(token: str) -> Set[str]:
+    """Alle Varianten mit genau einem gelöschten Zeichen (Symmetric-Delete)"""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment) mit frühem Abbruch"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def max_distance(token: str) -> int:
+    if len(token) < MIN_FUZZY_LENGTH:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+class SearchIndex:
+    """Invertierter Index: Token -> {Dokument: Gewicht}"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[DocKey, float]] = {}
+        self.doc_tokens: Dict[DocKey, Set[str]] = {}
+        self.doc_meta: Dict[DocKey, Dict[str, str]] = {}
+        self._vocabulary: List[str] = []
+        self._delete_map: Dict[str, Set[str]] = {}
+        # Beim Massenimport wird das Vokabular erst am Ende sortiert
+        self._bulk = False
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    # ---------- Pflege ----------
+
+    def add(self, kind: str, doc: Dict, meta: Optional[Dict[str, str]] = None):
+        """Dokument (neu) indizieren - ersetzt einen vorhandenen Eintrag"""
+        key = (kind, doc["id"])
+        self.remove(kind, doc["id"])
+
+        weights: Dict[str, float] = {}
+        for field, field_weight in FIELD_WEIGHTS[kind].items():
+            for token, count in Counter(tokenize(doc.get(field))).items():
+                weights[token] = weights.get(token, 0.0) + field_weight * (1.0 + math.log(count))
+        if not weights:
+            return
+
+        for token, weight in weights.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                self._add_vocabulary(token)
+            postings[key] = weight
+        self.doc_tokens[key] = set(weights)
+        if meta:
+            self.doc_meta[key] = meta
+
+    def remove(self, kind: str, doc_id: str):
+        key = (kind, doc_id)
+        tokens = self.doc_tokens.pop(key, None)
+        self.doc_meta.pop(key, None)
+        if not tokens:
+            return
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self.postings[token]
+                self._remove_vocabulary(token)
+
+    def begin_bulk(self):
+        self._bulk = True
+
+    def end_bulk(self):
+        self._bulk = False
+        self._vocabulary.sort()
+
+    def _add_vocabulary(self, token: str):
+        if self._bulk:
+            self._vocabulary.append(token)
+        else:
+            bisect.insort(self._vocabulary, token)
+        if len(token) >= MIN_FUZZY_LENGTH:
+            for variant in _deletes(token):
+                self._delete_map.setdefault(variant, set()).add(token)
+
+    def _remove_vocabulary(self, token: str):
+        if self._bulk:
+            self._vocabulary.remove(token)
+        else:
+            position = bisect.bisect_left(self._vocabulary, token)
+            if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                del self._vocabulary[position]
+        if len(token) >= MIN_FUZZY_LENGTH:
+            for variant in _deletes(token):
+                tokens = self._delete_map.get(variant)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._delete_map[variant]
+
+    # ---------- Suche ----------
+
+    def _expand(self, query_token: str) -> Dict[str, float]:
+        """Index-Tokens, die zu einem Suchbegriff passen, mit Treffer-Gewicht"""
+        matches = {}
+        if query_token in self.postings:
+            matches[query_token] = EXACT_MATCH
+
+        if len(query_token) >= MIN_PREFIX_LENGTH:
+            start = bisect.bisect_left(self._vocabulary, query_token)
+            for token in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not token.startswith(query_token):
+                    break
+                matches.setdefault(token, PREFIX_MATCH)
+
+        limit = max_distance(query_token)
+        if limit:
+            candidates = set(self._delete_map.get(query_token, ()))
+            for variant in _deletes(query_token):
+                if variant in self.postings:
+                    candidates.add(variant)
+                candidates.update(self._delete_map.get(variant, ()))
+            for token in candidates:
+                if token not in matches and _edit_distance(query_token, token, limit) <= limit:
+                    matches[token] = FUZZY_MATCH
+        return matches
+
+    def search(self, query: str, kinds: Iterable[str], limit: int = 20,
+               allow: Optional[Callable[[DocKey, Dict[str, str]], bool]] = None) -> List[Tuple[DocKey, float]]:
+        """Treffer nach Relevanz - alle Suchbegriffe müssen passen (sonst ODER als Fallback)"""
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return []
+        kinds = set(kinds)
+        total_docs = max(len(self.doc_tokens), 1)
+
+        per_term: List[Dict[DocKey, float]] = []
+        for query_token in query_tokens:
+            term_scores: Dict[DocKey, float] = {}
+            for token, match_weight in self._expand(query_token).items():
+                postings = self.postings[token]
+                idf = math.log(1.0 + total_docs / len(postings))
+                for key, weight in postings.items():
+                    if key[0] not in kinds:
+                        continue
+                    score = idf * weight * match_weight
+                    if score > term_scores.get(key, 0.0):
+                        term_scores[key] = score
+            per_term.append(term_scores)
+
+        candidates = set.intersection(*(set(scores) for scores in per_term))
+        if not candidates:
+            candidates = set().union(*(set(scores) for scores in per_term))
+
+        ranked = []
+        for key in candidates:
+            if allow is not None and not allow(key, self.doc_meta.get(key, {})):
+                continue
+            ranked.append((key, sum(scores.get(key, 0.0) for scores in per_term)))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+
+# ================================================
+# SYNCHRONISATION MIT MONGODB
+# ================================================
+
+# Quelle je Dokumenttyp: Collection, Filter für indizierbare Dokumente, Meta-Felder
+SEARCH_SOURCES = {
+    "persons": {"collection": "persons", "filter": {"is_active": True}, "meta": ()},
+    "incidents": {"collection": "incidents", "filter": {}, "meta": ()},
+    "reports": {"collection": "reports", "archive": "reports_archive", "filter": {}, "meta": ("author_id",)},
+}
+
+
+def source_collections(source: Dict[str, Any]) -> List[str]:
+    """Collections einer Quelle - archivierte Berichte bleiben suchbar"""
+    return [source["collection"]] + ([source["archive"]] if "archive" in source else [])
+
+
+def source_projection(kind: str) -> Dict[str, int]:
+    projection = {field: 1 for field in FIELD_WEIGHTS[kind]}
+    projection.update({field: 1 for field in SEARCH_SOURCES[kind]["meta"]})
+    projection.update({"_id": 0, "id": 1, "updated_at": 1, "is_active": 1})
+    return projection
+
+
+def index_document(index: SearchIndex, kind: str, doc: Dict[str, Any]):
+    """Dokument indizieren oder entfernen, falls es nicht (mehr) suchbar ist"""
+    source = SEARCH_SOURCES[kind]
+    if any(doc.get(field) != value for field, value in source["filter"].items()):
+        index.remove(kind, doc["id"])
+        return
+    meta = {field: doc.get(field) for field in source["meta"]}
+    index.add(kind, doc, meta or None)
+
+
+async def sync_index(index: SearchIndex, db, since: Optional[Dict[str, datetime]] = None) -> Dict[str, datetime]:
+    """Komplett laden (since=None) oder nur seit dem letzten Stand geänderte Dokumente nachziehen
+
+    Ein Komplett-Load sollte in einen frischen Index laufen, der danach ausgetauscht wird.
+    """
+    high_water = dict(since or {})
+    if since is None:
+        index.begin_bulk()
+    try:
+        for kind, source in SEARCH_SOURCES.items():
+            await _sync_source(index, db, kind, source, high_water)
+    finally:
+        if since is None:
+            index.end_bulk()
+    return high_water
+
+
+async def _sync_source(index: SearchIndex, db, kind: str, source: Dict[str, Any], high_water: Dict[str, datetime]):
+    query: Dict[str, Any] = {}
+    if kind in high_water:
+        query["updated_at"] = {"$gt": high_water[kind]}
+    else:
+        query.update(source["filter"])
+    latest = high_water.get(kind)
+    for collection in source_collections(source):
+        cursor = db[collection].find(query, source_projection(kind), batch_size=1000)
+        async for doc in cursor:
+            if not doc.get("id"):
+                continue
+            index_document(index, kind, doc)
+            updated_at = doc.get("updated_at")
+            if isinstance(updated_at, datetime) and (latest is None or updated_at > latest):
+                latest = updated_at
+    high_water[kind] = latest or datetime.utcnow()
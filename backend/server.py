@@ -1,23 +1,45 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from bson import ObjectId
 import socketio
 import os
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable
 import uuid
-from datetime import datetime, timedelta
+from datetime import MAXYEAR, MINYEAR, datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+import calendar
 import hashlib
 import secrets
+import wire_format
+from fast_json import MongoJSONResponse, NO_ID, model_projection, model_defaults, with_defaults
+from response_cache import ResponseCache, UserRoles, etag_matches
+import app_config_store
+import report_revisions
+import search_index
+import person_duplicates
+import bulk_import
+import report_archive
+import roster
+import checkin_watch
+import checkin_rollups
+import repositories
+import mongo_client
+import static_assets
+import response_compression
+from lazy import Lazy
+from exports import EXPORT_DATASETS, EXPORT_MEDIA_TYPES, build_query, parse_date, stream_export
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -26,17 +48,19 @@ load_dotenv(ROOT_DIR / '.env')
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/stadtwache_db")
 DB_NAME = os.getenv("DB_NAME", "stadtwache_db")
 
-# Handle both local and cloud MongoDB URLs
-if MONGO_URL.startswith("mongodb://localhost") or MONGO_URL.startswith("mongodb://127.0.0.1"):
-    # Local development
-    client = AsyncIOMotorClient(MONGO_URL)
-    db = client[DB_NAME]
-    print(f"🔗 Connected to local MongoDB: {MONGO_URL}")
-else:
-    # Production/Cloud MongoDB
-    client = AsyncIOMotorClient(MONGO_URL)
-    db = client[DB_NAME]  
-    print(f"🔗 Connected to cloud MongoDB: {MONGO_URL[:20]}...")
+# Pool, Timeouts, Kompression und Monitoring aus MONGO_* (siehe mongo_client.py) - lokal wie in der Cloud
+# Clients entstehen erst im Lifespan-Startup bzw. beim ersten Zugriff (mongodb+srv löst DNS auf)
+client = Lazy(lambda: mongo_client.create_client(MONGO_URL), "mongo client")
+db = Lazy(lambda: client[DB_NAME], "mongo database")
+
+# Repository-Schicht: Handler lesen und schreiben über repos.<collection>
+# DATABASE_TYPE=mongodb (Standard) oder sqlite/mysql/postgresql (SQLAlchemy async)
+repos = Lazy(lambda: repositories.create_repositories(repositories.DATABASE_TYPE, db, client), "repositories")
+
+def require_mongo():
+    """Für Funktionen, die nur mit MongoDB verfügbar sind (Aggregation, Change Streams, Archiv)"""
+    if not repos.is_mongo:
+        raise HTTPException(status_code=501, detail=f"Not available with DATABASE_TYPE={repos.backend}")
 
 # Test connection
 async def test_db_connection():
@@ -81,13 +105,89 @@ sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
 online_users = {}  # {user_id: {"last_seen": datetime, "socket_id": str, "username": str}}
 user_sockets = {}  # {socket_id: user_id}
 
+# Kompaktes Wire-Format (pro Client beim Connect ausgehandelt)
+wire_registry = wire_format.WireFormatRegistry()
+
+async def emit_event(event: str, data: dict, room: Optional[str] = None, encoder=None):
+    """Emit an event as JSON to standard clients and in the negotiated compact format to the rest"""
+    compact_sids = wire_registry.compact_sids()
+    if not compact_sids or encoder is None:
+        await sio.emit(event, data, room=room)
+        return
+
+    await sio.emit(event, data, room=room, skip_sid=compact_sids)
+    if room is not None:
+        compact_sids = [sid for sid in compact_sids if room in sio.rooms(sid)]
+    for payload, sids in encoder(data, compact_sids):
+        for sid in sids:
+            await sio.emit(event, payload, to=sid)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start: Frontend einbinden, Repositories und Hintergrund-Tasks - Stop: Tasks und Verbindungen schließen"""
+    if not getattr(app.state, "frontend_mounted", False):
+        mount_frontend()
+        app.state.frontend_mounted = True
+    await load_app_config_snapshot()
+    try:
+        yield
+    finally:
+        await shutdown_db_client()
+
 # Create FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 # Wrap FastAPI app with Socket.IO
 socket_app = socketio.ASGIApp(sio, app)
 
+# Response-Cache für häufig gepollte Endpunkte
+# Route -> (Ressource, deren Version der Handler bumpt, TTL in Sekunden)
+response_cache = ResponseCache()
+# Gelöschte/umgestufte Benutzer dürfen keine gecachten Antworten mehr bekommen (etag_cache_middleware)
+user_roles = UserRoles()
+CACHED_ROUTES = {
+    "/api/app/config": ("app_config", 300),
+    "/api/districts": ("districts", 3600),  # statische Liste
+    "/api/teams": ("teams", 3600),  # statische Liste
+    "/api/persons/stats/overview": ("persons", 60),
+    "/api/users/by-status": ("users", 30),  # is_online hängt von der Zeit ab
+}
+
+# Read-Routing: Route -> Read-Policy (mongo_client.READ_POLICIES), alle anderen lesen vom Primary
+# Auth, Einzeldokumente, Chat und Live-Positionen bleiben bewusst auf dem Primary
+READ_ROUTES = {
+    # Dashboards und Auswertungen
+    "/api/admin/stats": "analytics",
+    "/api/admin/attendance": "analytics",
+    "/api/admin/team-status": "analytics",
+    "/api/admin/analytics/attendance": "analytics",
+    "/api/admin/analytics/attendance/{user_id}": "analytics",
+    "/api/persons/stats/overview": "analytics",
+    "/api/admin/export/{dataset}": "analytics",
+    # Listen
+    "/api/reports": "lists",
+    "/api/reports/folders": "lists",
+    "/api/reports/folders/{year}/{month}": "lists",
+    "/api/persons": "lists",
+    "/api/incidents": "lists",
+    "/api/users": "lists",
+    "/api/checkins": "lists",
+    "/api/vacations": "lists",
+    "/api/admin/vacations": "lists",
+    "/api/admin/districts": "lists",
+    "/api/admin/teams": "lists",
+}
+recent_writers = mongo_client.RecentWriters()
+
+def route_reads(request: Request) -> repositories.Repositories:
+    """Repositories nach READ_ROUTES - nach eigenen Schreibzugriffen bis zur max. Staleness vom Primary"""
+    route = request.scope.get("route")
+    policy = READ_ROUTES.get(getattr(route, "path", None))
+    if policy is None or recent_writers.recent(request.headers.get("authorization")):
+        return repos
+    return repos.read_only(policy)
+
 # User roles
 class UserRole:
     ADMIN = "admin"          # Eigentümer
@@ -224,6 +324,9 @@ class Person(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
 
+class PersonWithDuplicates(Person):
+    possible_duplicates: List[Dict[str, Any]] = []
+
 class PersonCreate(BaseModel):
     first_name: str
     last_name: str
@@ -293,6 +396,7 @@ class Team(BaseModel):
 class VacationApproval(BaseModel):
     action: str  # "approve" or "reject"
     reason: Optional[str] = None
+    force: bool = False  # trotz Unterbesetzung genehmigen
 
 class DistrictCreate(BaseModel):
     name: str
@@ -338,6 +442,14 @@ class ShiftCreate(BaseModel):
     start_time: str
     end_time: str
 
+# Projektionen/Defaults für den schnellen Antwortpfad (trusted DB reads)
+INCIDENT_PROJECTION = model_projection(Incident)
+INCIDENT_DEFAULTS = model_defaults(Incident)
+PERSON_PROJECTION = model_projection(Person)
+PERSON_DEFAULTS = model_defaults(Person)
+MESSAGE_PROJECTION = model_projection(Message)
+MESSAGE_DEFAULTS = model_defaults(Message)
+
 # Security functions
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -387,29 +499,37 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     
     # First, try to find by ID (if the identifier looks like a UUID)
     if user_identifier and '-' in user_identifier and len(user_identifier) == 36:
-        user = await db.users.find_one({"id": user_identifier})
+        user = await repos.users.find_one({"id": user_identifier})
     
     # If not found by ID, try by email
     if user is None:
-        user = await db.users.find_one({"email": user_identifier})
+        user = await repos.users.find_one({"email": user_identifier})
     
     # If still not found and we have a separate user_id, try that
     if user is None and user_id:
-        user = await db.users.find_one({"id": user_id})
+        user = await repos.users.find_one({"id": user_id})
     
     if user is None:
+        if user_id:
+            user_roles.record(user_id, None)
         raise credentials_exception
     
+    if payload.get("role", "user") != user.get("role", "user"):
+        user_roles.record(user["id"], user.get("role", "user"))
+    
     return User(**user)
 
 # Socket.IO events
 @sio.event
-async def connect(sid, environ):
-    print(f"🔗 Client {sid} connected")
+async def connect(sid, environ, auth=None):
+    wire, diff = wire_format.negotiate(environ, auth)
+    wire_registry.register(sid, wire, diff)
+    print(f"🔗 Client {sid} connected ({wire}{', diff' if diff else ''})")
 
 @sio.event
 async def disconnect(sid):
     print(f"🔌 Client {sid} disconnected")
+    wire_registry.unregister(sid)
     # Remove from user_sockets mapping
     if sid in user_sockets:
         user_id = user_sockets[sid]
@@ -469,20 +589,20 @@ async def send_message(sid, data):
             # Private message
             message_data["recipient_id"] = recipient_id
             # Save to database
-            await db.messages.insert_one(message_data)
+            await repos.messages.insert_one(message_data)
             
             # Send to private room
             users = sorted([sender_id, recipient_id])
             room_name = f"private_{users[0]}_{users[1]}"
-            await sio.emit('new_message', message_data, room=room_name)
+            await emit_event('new_message', message_data, room=room_name, encoder=wire_registry.encode_message)
             
             # Send notification to recipient's personal room
-            await sio.emit('new_message', message_data, room=f"user_{recipient_id}")
+            await emit_event('new_message', message_data, room=f"user_{recipient_id}", encoder=wire_registry.encode_message)
         else:
             # Channel message
-            await db.messages.insert_one(message_data)
+            await repos.messages.insert_one(message_data)
             # Send to channel room
-            await sio.emit('new_message', message_data, room=f"channel_{channel}")
+            await emit_event('new_message', message_data, room=f"channel_{channel}", encoder=wire_registry.encode_message)
             
         print(f"📩 Message sent: {content[:50]}...")
         
@@ -503,24 +623,14 @@ async def location_update(sid, data):
         "location": data.get('location'),
         "timestamp": datetime.utcnow()
     }
-    await db.locations.insert_one(location_data)
+    await repos.locations.insert_one(location_data)
     
     # Broadcast to all connected clients
-    await sio.emit('location_updated', location_data)
+    await emit_event('location_updated', location_data, encoder=wire_registry.encode_location)
 
-# API Routes
-@api_router.post("/auth/register", response_model=User)
-async def register_user(user_data: UserCreate):
-    # Check if user already exists
-    existing_user = await db.users.find_one({"email": user_data.email})
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Hash password
-    hashed_password = get_password_hash(user_data.password)
-    
-    # Create user object with all required fields
-    user_dict = {
+def build_user_document(user_data: UserCreate, hashed_password: str, now: datetime) -> dict:
+    """New user document - shared by registration and the bulk user import"""
+    return {
         "id": str(uuid.uuid4()),
         "email": user_data.email,
         "username": user_data.username,
@@ -532,13 +642,28 @@ async def register_user(user_data: UserCreate):
         "rank": user_data.rank,
         "status": "Im Dienst",
         "is_active": True,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow(),
+        "created_at": now,
+        "updated_at": now,
         "hashed_password": hashed_password  # Store hashed password
     }
+
+# API Routes
+@api_router.post("/auth/register", response_model=User)
+async def register_user(user_data: UserCreate):
+    # Check if user already exists
+    existing_user = await repos.users.find_one({"email": user_data.email})
+    if existing_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    
+    # Hash password
+    hashed_password = get_password_hash(user_data.password)
+    
+    # Create user object with all required fields
+    user_dict = build_user_document(user_data, hashed_password, datetime.utcnow())
     
     # Insert user into database
-    await db.users.insert_one(user_dict)
+    await repos.users.insert_one(user_dict)
+    response_cache.bump("users")
     
     # Return user without password
     user_dict.pop('hashed_password')
@@ -546,7 +671,7 @@ async def register_user(user_data: UserCreate):
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_data: UserLogin):
-    user = await db.users.find_one({"email": user_data.email})
+    user = await repos.users.find_one({"email": user_data.email})
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
@@ -579,7 +704,7 @@ async def update_profile(user_updates: UserUpdate, current_user: User = Depends(
     update_data['updated_at'] = datetime.utcnow()
     
     # Update user in database
-    result = await db.users.update_one(
+    result = await repos.users.update_one(
         {"id": current_user.id}, 
         {"$set": update_data}
     )
@@ -587,8 +712,12 @@ async def update_profile(user_updates: UserUpdate, current_user: User = Depends(
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    response_cache.bump("users")
+    
     # Get updated user
-    updated_user = await db.users.find_one({"id": current_user.id})
+    updated_user = await repos.users.find_one({"id": current_user.id})
+    user_roles.record(current_user.id, updated_user.get("role", "user"))
+    watch_check_ins(updated_user, update_data)
     return User(**updated_user)
 
 @api_router.put("/incidents/{incident_id}/assign", response_model=Incident)
@@ -605,13 +734,14 @@ async def assign_incident(incident_id: str, current_user: User = Depends(get_cur
         'updated_at': datetime.utcnow()
     }
     
-    result = await db.incidents.update_one({"id": incident_id}, {"$set": updates})
+    result = await repos.incidents.update_one({"id": incident_id}, {"$set": updates})
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    incident = await db.incidents.find_one({"id": incident_id})
+    incident = await repos.incidents.find_one({"id": incident_id})
     incident_obj = Incident(**incident)
+    index_for_search("incidents", incident)
     
     # Notify about incident assignment
     await sio.emit('incident_assigned', {
@@ -625,7 +755,7 @@ async def assign_incident(incident_id: str, current_user: User = Depends(get_cur
 @api_router.get("/users/by-status")
 async def get_users_by_status(current_user: User = Depends(get_current_user)):
     """Get users grouped by their work status with online information"""
-    users = await db.users.find().to_list(100)
+    users = await repos.users.find().to_list(100)
     now = datetime.utcnow()
     offline_threshold = timedelta(minutes=2)
     
@@ -664,7 +794,7 @@ async def get_users_by_status(current_user: User = Depends(get_current_user)):
 @api_router.delete("/messages/{message_id}")
 async def delete_message(message_id: str, current_user: User = Depends(get_current_user)):
     # Find the message first
-    message = await db.messages.find_one({"id": message_id})
+    message = await repos.messages.find_one({"id": message_id})
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     
@@ -674,7 +804,7 @@ async def delete_message(message_id: str, current_user: User = Depends(get_curre
     #     raise HTTPException(status_code=403, detail="Not authorized to delete this message")
     
     # Delete the message
-    result = await db.messages.delete_one({"id": message_id})
+    result = await repos.messages.delete_one({"id": message_id})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Message not found")
@@ -697,7 +827,12 @@ class Report(BaseModel):
     status: str = "draft"  # draft, submitted, reviewed
     last_edited_by: Optional[str] = None  # ID of last editor
     last_edited_by_name: Optional[str] = None  # Name of last editor
-    edit_history: List[Dict[str, Any]] = []  # Track edit history
+    edit_history: List[Dict[str, Any]] = []  # Veraltet - Historie liegt in report_revisions
+    revision_count: int = 0
+
+# edit_history wird nie mehr mit ausgeliefert (Historie über /reports/{id}/revisions)
+REPORT_PROJECTION = model_projection(Report, exclude=("edit_history",))
+REPORT_DEFAULTS = model_defaults(Report)
 
 class ReportCreate(BaseModel):
     title: str
@@ -714,62 +849,22 @@ async def create_report(report_data: ReportCreate, current_user: User = Depends(
     report_dict['updated_at'] = datetime.utcnow()
     
     report_obj = Report(**report_dict)
-    result = await db.reports.insert_one(report_obj.dict())
+    result = await repos.reports.insert_one(report_obj.dict(exclude={"edit_history"}))
     if not result.inserted_id:
         raise HTTPException(status_code=500, detail="Failed to create report")
+    index_for_search("reports", report_obj.dict())
     
     return report_obj
 
-@api_router.put("/reports/{report_id}", response_model=Report)
-async def update_report(
-    report_id: str, 
-    report_data: ReportCreate, 
-    current_user: User = Depends(get_current_user)
-):
-    """Update an existing report including status changes"""
-    try:
-        # Find the existing report
-        existing_report = await db.reports.find_one({"id": report_id})
-        
-        if not existing_report:
-            raise HTTPException(status_code=404, detail="Report not found")
-        
-        # Check if user has permission to update this report
-        if existing_report.get("author_id") != current_user.id and current_user.role != 'admin':
-            raise HTTPException(status_code=403, detail="Permission denied")
-        
-        # Prepare update data
-        update_data = report_data.dict()
-        update_data['updated_at'] = datetime.utcnow()
-        
-        # Update the report
-        result = await db.reports.update_one(
-            {"id": report_id},
-            {"$set": update_data}
-        )
-        
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Report not found")
-        
-        # Get the updated report
-        updated_report = await db.reports.find_one({"id": report_id})
-        if '_id' in updated_report:
-            del updated_report['_id']
-        
-        logger.info(f"Report updated: {report_id} by {current_user.username} - Status: {update_data.get('status', 'unchanged')}")
-        return Report(**updated_report)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating report: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-
 @api_router.delete("/reports/{report_id}")
 async def delete_report(report_id: str, current_user: User = Depends(get_current_user)):
     """Delete a report"""
-    # Find the report
-    report = await db.reports.find_one({"id": report_id})
+    # Find the report (hot collection or cold archive)
+    collection = repos.reports
+    report = await collection.find_one({"id": report_id}, {"_id": 0, "author_id": 1})
+    if not report:
+        collection = repos[report_archive.ARCHIVE_COLLECTION]
+        report = await collection.find_one({"id": report_id}, {"_id": 0, "author_id": 1})
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
@@ -778,23 +873,24 @@ async def delete_report(report_id: str, current_user: User = Depends(get_current
         raise HTTPException(status_code=403, detail="Not authorized to delete this report")
     
     # Delete the report
-    result = await db.reports.delete_one({"id": report_id})
+    result = await collection.delete_one({"id": report_id})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Report not found")
+    if collection is not repos.reports:
+        await report_archive.mark_changed(repos)
+        report_tiers.invalidate()
+    
+    await repos.report_revisions.delete_many({"report_id": report_id})
+    fulltext_index.remove("reports", report_id)
     
     return {"status": "success", "message": "Report deleted"}
 
 @api_router.get("/reports", response_model=List[Report])
-async def get_reports(current_user: User = Depends(get_current_user)):
-    if current_user.role == UserRole.ADMIN:
-        # Admin can see all reports
-        reports = await db.reports.find().sort("created_at", -1).to_list(100)
-    else:
-        # Users can only see their own reports
-        reports = await db.reports.find({"author_id": current_user.id}).sort("created_at", -1).to_list(100)
-    
-    return [Report(**serialize_mongo_data(report)) for report in reports]
+async def get_reports(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
+    # Admin can see all reports, users only their own - archived reports fill up the list
+    reports = await report_archive.find_page(reads, report_tiers, report_scope(current_user), REPORT_PROJECTION, 0, 100)
+    return MongoJSONResponse(with_defaults(reports, REPORT_DEFAULTS))
 
 @api_router.put("/users/{user_id}")
 async def update_user(user_id: str, updates: UserUpdate, current_user: User = Depends(get_current_user)):
@@ -805,12 +901,17 @@ async def update_user(user_id: str, updates: UserUpdate, current_user: User = De
     update_data = {k: v for k, v in updates.dict().items() if v is not None}
     update_data['updated_at'] = datetime.utcnow()
     
-    result = await db.users.update_one({"id": user_id}, {"$set": update_data})
+    updated_user = await repos.users.find_one_and_update(
+        {"id": user_id}, {"$set": update_data}, return_document=ReturnDocument.AFTER
+    )
     
-    if result.matched_count == 0:
+    if updated_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    updated_user = await db.users.find_one({"id": user_id})
+    response_cache.bump("users")
+    user_roles.record(user_id, updated_user.get("role", "user"))
+    watch_check_ins(updated_user, update_data)
+    updated_user = await repos.users.find_one({"id": user_id})
     return serialize_mongo_data(updated_user)
 
 @api_router.delete("/users/{user_id}")
@@ -822,11 +923,14 @@ async def delete_user(user_id: str, current_user: User = Depends(get_current_use
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
-    result = await db.users.delete_one({"id": user_id})
+    result = await repos.users.delete_one({"id": user_id})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    response_cache.bump("users")
+    user_roles.record(user_id, None)
+    check_in_watch.untrack(user_id)
     return {"status": "success", "message": "User deleted"}
 
 @api_router.delete("/incidents/{incident_id}")
@@ -835,13 +939,32 @@ async def delete_incident(incident_id: str, current_user: User = Depends(get_cur
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    result = await db.incidents.delete_one({"id": incident_id})
+    result = await repos.incidents.delete_one({"id": incident_id})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Incident not found")
     
+    wire_registry.forget_incident(incident_id)
+    fulltext_index.remove("incidents", incident_id)
     return {"status": "success", "message": "Incident deleted"}
 
+def build_archive_report(incident: dict, current_user: User) -> dict:
+    """Archive report for a completed incident (images are transferred)"""
+    now = datetime.utcnow()
+    return {
+        "id": str(uuid.uuid4()),
+        "title": f"Archiv: {incident['title']}",
+        "content": f"Vorfall abgeschlossen:\n\nTitel: {incident['title']}\nBeschreibung: {incident['description']}\nOrt: {incident['address']}\nPriorität: {incident['priority']}\n\nAbgeschlossen von: {current_user.username}\nDatum: {now.strftime('%d.%m.%Y %H:%M')}",
+        "author_id": current_user.id,
+        "author_name": current_user.username,
+        "shift_date": now.strftime('%Y-%m-%d'),
+        "status": "archived",
+        "incident_id": incident["id"],
+        "images": incident.get('images', []),  # Transfer images from incident to report
+        "created_at": now,
+        "updated_at": now
+    }
+
 @api_router.put("/incidents/{incident_id}/complete", response_model=dict)
 async def complete_incident(incident_id: str, current_user: User = Depends(get_current_user)):
     # Allow all authenticated users to complete incidents (removed admin restriction)
@@ -849,34 +972,39 @@ async def complete_incident(incident_id: str, current_user: User = Depends(get_c
     # if current_user.role not in [UserRole.POLICE, UserRole.ADMIN]:
     #     raise HTTPException(status_code=403, detail="Not authorized")
     
+    # Idempotent über incident_id: ein Retry liefert den bereits erzeugten Archiv-Bericht
+    archive_report = await repos.reports.find_one({"incident_id": incident_id}, {"_id": 0, "id": 1})
+    if archive_report:
+        # Ein abgebrochener Lauf kann den Vorfall noch hinterlassen haben
+        await repos.incidents.delete_one({"id": incident_id})
+        wire_registry.forget_incident(incident_id)
+        fulltext_index.remove("incidents", incident_id)
+        return {"status": "success", "message": "Incident already completed", "archive_id": archive_report['id'], "already_completed": True}
+    
     # Get incident details first
-    incident = await db.incidents.find_one({"id": incident_id})
+    incident = await repos.incidents.find_one({"id": incident_id})
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
     # Create archive report with images
-    archive_report = {
-        "id": str(uuid.uuid4()),
-        "title": f"Archiv: {incident['title']}",
-        "content": f"Vorfall abgeschlossen:\n\nTitel: {incident['title']}\nBeschreibung: {incident['description']}\nOrt: {incident['address']}\nPriorität: {incident['priority']}\n\nAbgeschlossen von: {current_user.username}\nDatum: {datetime.utcnow().strftime('%d.%m.%Y %H:%M')}",
-        "author_id": current_user.id,
-        "author_name": current_user.username,
-        "shift_date": datetime.utcnow().strftime('%Y-%m-%d'),
-        "status": "archived",
-        "incident_id": incident_id,
-        "images": incident.get('images', []),  # Transfer images from incident to report
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    }
+    archive_report = build_archive_report(incident, current_user)
     
-    # Save to archive
-    await db.reports.insert_one(archive_report)
-    
-    # Delete the incident from active incidents
-    result = await db.incidents.delete_one({"id": incident_id})
-    
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Incident not found")
+    # Archivieren und Löschen gemeinsam (Transaktion auf Replica Sets) - der
+    # Unique-Index auf reports.incident_id verhindert doppelte Archive bei parallelen Retries
+    try:
+        async with repos.transaction() as session:
+            await repos.reports.insert_one(archive_report, session=session)
+            await repos.incidents.delete_one({"id": incident_id}, session=session)
+    except DuplicateKeyError:
+        existing = await repos.reports.find_one({"incident_id": incident_id}, {"_id": 0, "id": 1})
+        await repos.incidents.delete_one({"id": incident_id})
+        wire_registry.forget_incident(incident_id)
+        fulltext_index.remove("incidents", incident_id)
+        return {"status": "success", "message": "Incident already completed", "archive_id": existing['id'], "already_completed": True}
+    
+    wire_registry.forget_incident(incident_id)
+    fulltext_index.remove("incidents", incident_id)
+    index_for_search("reports", archive_report)
     
     # Notify about incident completion
     await sio.emit('incident_completed', {
@@ -885,51 +1013,230 @@ async def complete_incident(incident_id: str, current_user: User = Depends(get_c
         'archived_as': archive_report['id']
     })
     
-    return {"status": "success", "message": "Incident completed and archived", "archive_id": archive_report['id']}
+    return {"status": "success", "message": "Incident completed and archived", "archive_id": archive_report['id'], "already_completed": False}
 
-@api_router.get("/reports/folders")
-async def get_report_folders(current_user: User = Depends(get_current_user)):
-    """Get all report folders and their contents"""
+def is_duplicate_key_only(error: BulkWriteError) -> bool:
+    """Nur Unique-Index-Verletzungen (11000) - keine anderen Schreib- oder Write-Concern-Fehler"""
+    write_errors = error.details.get("writeErrors", [])
+    return bool(write_errors) and not error.details.get("writeConcernErrors") and all(
+        write_error.get("code") == 11000 for write_error in write_errors
+    )
+
+# Sammel-Aktionen für Vorfälle (z.B. nach Großlagen)
+INCIDENT_BATCH_LIMIT = 500
+
+class IncidentBatchAction(BaseModel):
+    action: str  # assign, close, archive
+    incident_ids: List[str]
+    assigned_to: Optional[str] = None  # user_id, default: current user
+
+@api_router.post("/incidents/batch", response_model=dict)
+async def batch_incidents(batch: IncidentBatchAction, current_user: User = Depends(get_current_user)):
+    """Assign, close or archive several incidents in one request"""
+    if batch.action not in ("assign", "close", "archive"):
+        raise HTTPException(status_code=400, detail="Action must be 'assign', 'close' or 'archive'")
+    incident_ids = list(dict.fromkeys(batch.incident_ids))
+    if not incident_ids:
+        raise HTTPException(status_code=400, detail="No incident ids given")
+    if len(incident_ids) > INCIDENT_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {INCIDENT_BATCH_LIMIT} incidents per request")
+    
+    now = datetime.utcnow()
+    if batch.action == "assign":
+        assignee = current_user
+        if batch.assigned_to and batch.assigned_to != current_user.id:
+            assignee_doc = await repos.users.find_one({"id": batch.assigned_to})
+            if not assignee_doc:
+                raise HTTPException(status_code=404, detail="User not found")
+            assignee = User(**assignee_doc)
+        updates = {
+            'assigned_to': assignee.id,
+            'assigned_to_name': assignee.username,
+            'assigned_at': now,
+            'status': 'in_progress',
+            'updated_at': now
+        }
+    elif batch.action == "close":
+        updates = {'status': 'closed', 'updated_at': now}
+    
+    # Ein zweiter Durchlauf nur, wenn eine parallele Abschließung die Mongo-Transaktion abgebrochen hat
+    for attempt in range(2):
+        archived = {}
+        try:
+            async with repos.transaction() as session:
+                incidents = await repos.incidents.find({"id": {"$in": incident_ids}}, session=session).to_list(None)
+                found_ids = [incident["id"] for incident in incidents]
+                
+                if incidents and batch.action == "archive":
+                    # Bereits archivierte Vorfälle (z.B. abgebrochener Lauf) nicht doppelt archivieren
+                    already_archived = {
+                        report["incident_id"] for report in
+                        await repos.reports.find({"incident_id": {"$in": found_ids}}, {"_id": 0, "incident_id": 1}, session=session).to_list(None)
+                    }
+                    reports = [build_archive_report(incident, current_user) for incident in incidents if incident["id"] not in already_archived]
+                    if reports:
+                        try:
+                            await repos.reports.insert_many(reports, ordered=False, session=session)
+                        except BulkWriteError as e:
+                            # Seit der Abfrage parallel abgeschlossen (Unique-Index) - gilt als bereits archiviert.
+                            # Eine Mongo-Transaktion bricht der Server dabei ab, dann komplett wiederholen.
+                            errors = e.details.get("writeErrors", [])
+                            if not is_duplicate_key_only(e) or (repos.is_mongo and session is not None):
+                                raise
+                            duplicates = {error["index"] for error in errors}
+                            reports = [report for index, report in enumerate(reports) if index not in duplicates]
+                    await repos.incidents.delete_many({"id": {"$in": found_ids}}, session=session)
+                    archived = {report["incident_id"]: report for report in reports}
+                elif incidents:
+                    await repos.incidents.update_many({"id": {"$in": found_ids}}, {"$set": updates}, session=session)
+            break
+        except BulkWriteError as e:
+            if attempt or not is_duplicate_key_only(e):
+                raise
+    
+    for incident in incidents:
+        if batch.action == "archive":
+            wire_registry.forget_incident(incident["id"])
+            fulltext_index.remove("incidents", incident["id"])
+            if incident["id"] in archived:
+                index_for_search("reports", archived[incident["id"]])
+        else:
+            incident.update(updates)
+            index_for_search("incidents", incident)
+    
+    # Ein gesammeltes Event statt eines Events pro Vorfall
+    event = {
+        'action': batch.action,
+        'incident_ids': found_ids,
+        'by': current_user.username,
+    }
+    if batch.action == "assign":
+        event['assigned_to'] = updates['assigned_to_name']
+    if batch.action == "archive":
+        event['archived_as'] = {incident_id: report["id"] for incident_id, report in archived.items()}
+    if found_ids:
+        await sio.emit('incidents_batch_updated', event)
+    
+    return {
+        "status": "success",
+        "action": batch.action,
+        "updated": found_ids,
+        "not_found": [incident_id for incident_id in incident_ids if incident_id not in found_ids],
+        "archived_as": event.get('archived_as', {})
+    }
+
+# Berichts-Archiv: Ordner Berichte/<Jahr>/<Monat>
+REPORT_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "author_name": 1, "shift_date": 1, "created_at": 1, "status": 1
+}
+
+# Kalt-Archiv: Grenze und Ordner-Cache dieses Workers
+report_tiers = report_archive.ReportArchive()
+
+def report_scope(current_user: User) -> dict:
+    """Admins see all reports, users only their own"""
     if current_user.role == UserRole.ADMIN:
-        # Admin can see all reports
-        reports = await db.reports.find().sort("created_at", -1).to_list(1000)
-    else:
-        # Users can only see their own reports
-        reports = await db.reports.find({"author_id": current_user.id}).sort("created_at", -1).to_list(1000)
+        return {}
+    return {"author_id": current_user.id}
+
+@api_router.get("/reports/folders")
+async def get_report_folders(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
+    """Get the report folder index (paths and counts, newest first)"""
+    # created_at kann bei Altdaten ein ISO-String sein - $toDate deckt beides ab
+    created = {"$toDate": "$created_at"}
+    pipeline = [
+        {"$match": report_scope(current_user)},
+        {"$group": {
+            "_id": {"year": {"$year": created}, "month": {"$month": created}},
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"_id.year": -1, "_id.month": -1}}
+    ]
     
-    # Organize reports by folders (year/month)
-    folders = {}
-    for report in reports:
-        created_date = report['created_at']
-        if isinstance(created_date, str):
-            from datetime import datetime
-            created_date = datetime.fromisoformat(created_date.replace('Z', '+00:00'))
-        
-        year = str(created_date.year)
-        month = created_date.strftime('%B')  # Full month name
-        
-        folder_path = f"Berichte/{year}/{month}"
-        
-        if folder_path not in folders:
-            folders[folder_path] = []
-        
-        folders[folder_path].append({
-            "id": report["id"],
-            "title": report["title"],
-            "content": report["content"],
-            "author_name": report["author_name"],
-            "shift_date": report["shift_date"],
-            "created_at": report["created_at"],
-            "status": report.get("status", "submitted")
+    counts = {}
+    if repos.is_mongo:
+        groups = await reads.reports.aggregate(pipeline).to_list(None)
+        groups += await report_tiers.folder_counts(db, report_scope(current_user), pipeline)
+        for group in groups:
+            key = (group["_id"]["year"], group["_id"]["month"])
+            counts[key] = counts.get(key, 0) + group["count"]
+    else:
+        # SQL-Backend: nach Monat in Python gruppieren
+        async for report in reads.reports.find(report_scope(current_user), {"_id": 0, "created_at": 1}):
+            created_at = report.get("created_at")
+            if isinstance(created_at, str):
+                created_at = parse_date(created_at)
+            if created_at:
+                key = (created_at.year, created_at.month)
+                counts[key] = counts.get(key, 0) + 1
+    
+    folders = []
+    for (year, month), count in sorted(counts.items(), reverse=True):
+        folders.append({
+            "path": f"Berichte/{year}/{calendar.month_name[month]}",
+            "year": year,
+            "month": month,
+            "count": count
         })
     
     return folders
 
+@api_router.get("/reports/folders/{year}/{month}")
+async def get_report_folder_contents(
+    year: int,
+    month: str,
+    page: int = 1,
+    page_size: int = 50,
+    reads: repositories.Repositories = Depends(route_reads),
+    current_user: User = Depends(get_current_user)
+):
+    """Get one page of report summaries for a folder (month as number or name)"""
+    if month.isdigit():
+        month_number = int(month)
+    else:
+        month_names = [name.lower() for name in calendar.month_name]
+        month_number = month_names.index(month.lower()) if month.lower() in month_names else 0
+    if not 1 <= month_number <= 12:
+        raise HTTPException(status_code=400, detail="Invalid month")
+    if not MINYEAR <= year <= MAXYEAR:
+        raise HTTPException(status_code=400, detail="Invalid year")
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 200)
+    
+    period_start = datetime(year, month_number, 1)
+    if month_number < 12:
+        period_end = datetime(year, month_number + 1, 1)
+    else:
+        period_end = datetime(year + 1, 1, 1) if year < MAXYEAR else datetime.max
+    query = {
+        **report_scope(current_user),
+        "$or": [
+            {"created_at": {"$gte": period_start, "$lt": period_end}},
+            # Altdaten mit ISO-String
+            {"created_at": {"$gte": period_start.strftime("%Y-%m"), "$lt": period_end.strftime("%Y-%m")}}
+        ]
+    }
+    
+    reports, total = await report_archive.find_page(
+        reads, report_tiers, query, REPORT_SUMMARY_PROJECTION,
+        (page - 1) * page_size, page_size, period_start=period_start, with_total=True
+    )
+    for report in reports:
+        report.setdefault("status", "submitted")
+    
+    return MongoJSONResponse({
+        "path": f"Berichte/{year}/{calendar.month_name[month_number]}",
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "reports": reports
+    })
+
 @api_router.put("/reports/{report_id}", response_model=Report)
 async def update_report(report_id: str, updated_data: ReportCreate, current_user: User = Depends(get_current_user)):
-    """Update an existing report"""
+    """Update an existing report and record a revision in report_revisions"""
     # Find the report
-    report = await db.reports.find_one({"id": report_id})
+    report = await report_archive.find_one(repos, {"id": report_id}, {"_id": 0, "author_id": 1})
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
@@ -937,17 +1244,9 @@ async def update_report(report_id: str, updated_data: ReportCreate, current_user
     if report["author_id"] != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized to edit this report")
     
-    # Create edit history entry
-    edit_history_entry = {
-        "edited_by": current_user.id,
-        "edited_by_name": current_user.username,
-        "edited_at": datetime.utcnow(),
-        "changes": {
-            "title": {"old": report.get("title"), "new": updated_data.title},
-            "content": {"old": report.get("content"), "new": updated_data.content},
-            "shift_date": {"old": report.get("shift_date"), "new": updated_data.shift_date}
-        }
-    }
+    # Bearbeitete Berichte kommen aus dem Archiv zurück in die heiße Collection
+    if await report_archive.restore(repos, report_id):
+        report_tiers.invalidate()
     
     # Update the report
     update_fields = {
@@ -959,23 +1258,88 @@ async def update_report(report_id: str, updated_data: ReportCreate, current_user
         "last_edited_by_name": current_user.username
     }
     
-    result = await db.reports.update_one(
-        {"id": report_id}, 
-        {
-            "$set": update_fields,
-            "$push": {"edit_history": edit_history_entry}
-        }
+    # Atomar: vorherigen Stand lesen und Revisionszähler erhöhen
+    before = await repos.reports.find_one_and_update(
+        {"id": report_id},
+        {"$set": update_fields, "$inc": {"revision_count": 1}, "$unset": {"edit_history": ""}},
+        projection={"_id": 0, "images": 0},
+        return_document=ReturnDocument.BEFORE
     )
-    
-    if result.matched_count == 0:
+    if before is None:
         raise HTTPException(status_code=404, detail="Report not found")
     
+    revision_number = before.get("revision_count", 0) + 1
+    
+    # Alte eingebettete Historie einmalig auslagern
+    if before.get("edit_history"):
+        legacy = report_revisions.legacy_revisions(report_id, before["edit_history"])
+        for entry in legacy:
+            entry["revision"] -= len(legacy)
+        await repos.report_revisions.insert_many(legacy)
+    
+    diff = report_revisions.build_revision(before, update_fields)
+    if diff is not None:
+        await repos.report_revisions.insert_one({
+            "report_id": report_id,
+            "revision": revision_number,
+            "edited_by": current_user.id,
+            "edited_by_name": current_user.username,
+            "edited_at": update_fields["updated_at"],
+            **diff
+        })
+        # Historie begrenzen: älteste Revisionen verwerfen
+        await repos.report_revisions.delete_many({
+            "report_id": report_id,
+            "revision": {"$lte": revision_number - report_revisions.REPORT_REVISION_LIMIT}
+        })
+    
+    logger.info(f"Report updated: {report_id} by {current_user.username} (revision {revision_number})")
+    
     # Get updated report
-    updated_report = await db.reports.find_one({"id": report_id})
-    return Report(**updated_report)
+    updated_report = await repos.reports.find_one({"id": report_id}, REPORT_PROJECTION)
+    index_for_search("reports", updated_report)
+    return MongoJSONResponse(with_defaults([updated_report], REPORT_DEFAULTS)[0])
+
+@api_router.get("/reports/{report_id}/revisions")
+async def get_report_revisions(report_id: str, limit: int = 20, current_user: User = Depends(get_current_user)):
+    """Get the edit history of a report (newest first, stored as compact diffs)"""
+    report = await report_archive.find_one(repos, {"id": report_id}, {"_id": 0, "author_id": 1})
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if report["author_id"] != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized to view this report")
+    
+    limit = min(max(limit, 1), report_revisions.REPORT_REVISION_LIMIT)
+    revisions = await repos.report_revisions.find({"report_id": report_id}, NO_ID) \
+        .sort("revision", -1).limit(limit).to_list(limit)
+    return MongoJSONResponse(revisions)
+
+@api_router.get("/reports/{report_id}/revisions/{revision}")
+async def get_report_revision(report_id: str, revision: int, current_user: User = Depends(get_current_user)):
+    """Reconstruct title/content/shift_date as they were before the given revision"""
+    report = await report_archive.find_one(repos, {"id": report_id}, {"_id": 0, "author_id": 1, "title": 1, "content": 1, "shift_date": 1})
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if report["author_id"] != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized to view this report")
+    
+    revisions = await repos.report_revisions.find(
+        {"report_id": report_id, "revision": {"$gte": revision}}, NO_ID
+    ).sort("revision", -1).to_list(report_revisions.REPORT_REVISION_LIMIT + 1)
+    if not revisions or revisions[-1]["revision"] != revision:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    
+    state = report_revisions.reconstruct(report, revisions)
+    return MongoJSONResponse({
+        "report_id": report_id,
+        "revision": revision,
+        "edited_by_name": revisions[-1].get("edited_by_name"),
+        "edited_at": revisions[-1].get("edited_at"),
+        **state
+    })
 
 # Person Database Endpoints
-@api_router.post("/persons", response_model=Person)
+@api_router.post("/persons", response_model=PersonWithDuplicates)
 async def create_person(person_data: PersonCreate, current_user: User = Depends(get_current_user)):
     """Erstelle eine neue Person in der Datenbank"""
     # Allow all authenticated users to create person entries (removed admin restriction)
@@ -988,32 +1352,44 @@ async def create_person(person_data: PersonCreate, current_user: User = Depends(
     person_dict['created_by_name'] = current_user.username
     person_obj = Person(**person_dict)
     
-    await db.persons.insert_one(person_obj.dict())
+    # Wahrscheinliche Dubletten vor dem Insert über den Blocking-Index ermitteln
+    duplicates = await person_duplicates.find_duplicates(repos.persons, person_dict)
+    await repos.persons.insert_one({
+        **person_obj.dict(),
+        "dedupe_keys": person_duplicates.blocking_keys(person_dict)
+    })
+    response_cache.bump("persons")
     
     # Notify all users about new person entry
+    index_for_search("persons", person_obj.dict())
     await sio.emit('new_person', person_obj.dict())
     
-    return person_obj
+    return PersonWithDuplicates(**person_obj.dict(), possible_duplicates=duplicates)
+
+@api_router.post("/persons/duplicates")
+async def check_person_duplicates(person_data: PersonCreate, current_user: User = Depends(get_current_user)):
+    """Wahrscheinliche Dubletten prüfen, ohne die Person anzulegen"""
+    return await person_duplicates.find_duplicates(repos.persons, person_data.dict())
 
 @api_router.get("/persons", response_model=List[Person])
-async def get_persons(status: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_persons(status: Optional[str] = None, reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     """Lade alle Personen oder nach Status gefiltert"""
     query = {"is_active": True}
     if status:
         query["status"] = status
     
-    persons = await db.persons.find(query).sort("created_at", -1).to_list(100)
-    return [Person(**person) for person in persons]
+    persons = await reads.persons.find(query, PERSON_PROJECTION).sort("created_at", -1).to_list(100)
+    return MongoJSONResponse(with_defaults(persons, PERSON_DEFAULTS))
 
 @api_router.get("/persons/{person_id}", response_model=Person)
 async def get_person(person_id: str, current_user: User = Depends(get_current_user)):
     """Lade eine spezifische Person"""
-    person = await db.persons.find_one({"id": person_id})
+    person = await repos.persons.find_one({"id": person_id}, PERSON_PROJECTION)
     if not person:
         raise HTTPException(status_code=404, detail="Person not found")
-    return Person(**person)
+    return MongoJSONResponse(with_defaults([person], PERSON_DEFAULTS)[0])
 
-@api_router.put("/persons/{person_id}", response_model=Person)
+@api_router.put("/persons/{person_id}", response_model=PersonWithDuplicates)
 async def update_person(person_id: str, updates: PersonUpdate, current_user: User = Depends(get_current_user)):
     """Aktualisiere Person-Daten"""
     # Allow all authenticated users to update person entries (removed admin restriction)
@@ -1024,18 +1400,26 @@ async def update_person(person_id: str, updates: PersonUpdate, current_user: Use
     update_data = {k: v for k, v in updates.dict().items() if v is not None}
     update_data['updated_at'] = datetime.utcnow()
     
-    result = await db.persons.update_one({"id": person_id}, {"$set": update_data})
+    result = await repos.persons.update_one({"id": person_id}, {"$set": update_data})
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Person not found")
     
-    person = await db.persons.find_one({"id": person_id})
+    response_cache.bump("persons")
+    person = await repos.persons.find_one({"id": person_id})
     person_obj = Person(**person)
     
+    # Blocking-Keys nachziehen, falls sich Name, Geburtsdatum, Alter oder Aktenzeichen geändert haben
+    dedupe_keys = person_duplicates.blocking_keys(person)
+    if dedupe_keys != person.get("dedupe_keys"):
+        await repos.persons.update_one({"id": person_id}, {"$set": {"dedupe_keys": dedupe_keys}})
+    duplicates = await person_duplicates.find_duplicates(repos.persons, person, exclude_id=person_id)
+    
     # Notify about person update
+    index_for_search("persons", person)
     await sio.emit('person_updated', person_obj.dict())
     
-    return person_obj
+    return PersonWithDuplicates(**person_obj.dict(), possible_duplicates=duplicates)
 
 @api_router.delete("/persons/{person_id}")
 async def delete_person(person_id: str, current_user: User = Depends(get_current_user)):
@@ -1043,7 +1427,7 @@ async def delete_person(person_id: str, current_user: User = Depends(get_current
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    result = await db.persons.update_one(
+    result = await repos.persons.update_one(
         {"id": person_id}, 
         {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
     )
@@ -1051,15 +1435,17 @@ async def delete_person(person_id: str, current_user: User = Depends(get_current
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Person not found")
     
+    response_cache.bump("persons")
+    fulltext_index.remove("persons", person_id)
     return {"status": "success", "message": "Person archived"}
 
 @api_router.get("/persons/stats/overview")
-async def get_person_stats(current_user: User = Depends(get_current_user)):
+async def get_person_stats(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     """Statistiken über Personen-Datenbank"""
-    total_persons = await db.persons.count_documents({"is_active": True})
-    missing_persons = await db.persons.count_documents({"is_active": True, "status": "vermisst"})
-    wanted_persons = await db.persons.count_documents({"is_active": True, "status": "gesucht"})
-    found_persons = await db.persons.count_documents({"is_active": True, "status": "gefunden"})
+    total_persons = await reads.persons.count_documents({"is_active": True})
+    missing_persons = await reads.persons.count_documents({"is_active": True, "status": "vermisst"})
+    wanted_persons = await reads.persons.count_documents({"is_active": True, "status": "gesucht"})
+    found_persons = await reads.persons.count_documents({"is_active": True, "status": "gefunden"})
     
     return {
         "total_persons": total_persons,
@@ -1097,7 +1483,7 @@ async def broadcast_emergency_alert(
         }
         
         # Store in database
-        result = await db.emergency_broadcasts.insert_one(broadcast_dict)
+        result = await repos.emergency_broadcasts.insert_one(broadcast_dict)
         
         if not result.inserted_id:
             raise HTTPException(status_code=500, detail="Failed to create emergency broadcast")
@@ -1144,7 +1530,7 @@ async def get_emergency_broadcasts(current_user: User = Depends(get_current_user
     try:
         # Get recent emergency broadcasts (last 24 hours)
         yesterday = datetime.utcnow() - timedelta(days=1)
-        cursor = db.emergency_broadcasts.find(
+        cursor = repos.emergency_broadcasts.find(
             {"timestamp": {"$gte": yesterday}}
         ).sort("timestamp", -1).limit(50)
         
@@ -1193,20 +1579,21 @@ async def create_incident(incident_data: IncidentCreate, current_user: User = De
             "lng": 7.2954
         }
     
-    await db.incidents.insert_one(incident_dict)
+    await repos.incidents.insert_one(incident_dict)
+    index_for_search("incidents", incident_dict)
     return Incident(**incident_dict)
 
 @api_router.get("/incidents", response_model=List[Incident])
-async def get_incidents(current_user: User = Depends(get_current_user)):
-    incidents = await db.incidents.find().sort("created_at", -1).to_list(100)
-    return [Incident(**incident) for incident in incidents]
+async def get_incidents(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
+    incidents = await reads.incidents.find({}, INCIDENT_PROJECTION).sort("created_at", -1).to_list(100)
+    return MongoJSONResponse(with_defaults(incidents, INCIDENT_DEFAULTS))
 
 @api_router.get("/incidents/{incident_id}", response_model=Incident)
 async def get_incident(incident_id: str, current_user: User = Depends(get_current_user)):
-    incident = await db.incidents.find_one({"id": incident_id})
+    incident = await repos.incidents.find_one({"id": incident_id}, INCIDENT_PROJECTION)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
-    return Incident(**incident)
+    return MongoJSONResponse(with_defaults([incident], INCIDENT_DEFAULTS)[0])
 
 @api_router.put("/incidents/{incident_id}", response_model=Incident)
 async def update_incident(incident_id: str, updates: Dict[str, Any], current_user: User = Depends(get_current_user)):
@@ -1216,16 +1603,17 @@ async def update_incident(incident_id: str, updates: Dict[str, Any], current_use
     #     raise HTTPException(status_code=403, detail="Not authorized")
     
     updates['updated_at'] = datetime.utcnow()
-    result = await db.incidents.update_one({"id": incident_id}, {"$set": updates})
+    result = await repos.incidents.update_one({"id": incident_id}, {"$set": updates})
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    incident = await db.incidents.find_one({"id": incident_id})
+    incident = await repos.incidents.find_one({"id": incident_id})
     incident_obj = Incident(**incident)
+    index_for_search("incidents", incident)
     
     # Notify about incident update
-    await sio.emit('incident_updated', incident_obj.dict())
+    await emit_event('incident_updated', incident_obj.dict(), encoder=wire_registry.encode_incident)
     
     return incident_obj
 
@@ -1233,8 +1621,8 @@ async def update_incident(incident_id: str, updates: Dict[str, Any], current_use
 async def get_messages(channel: str = "general", current_user: User = Depends(get_current_user)):
     """Get messages from specified channel"""
     try:
-        messages = await db.messages.find({"channel": channel}).sort("timestamp", 1).limit(100).to_list(100)
-        return serialize_mongo_data(messages)
+        messages = await repos.messages.find({"channel": channel}, NO_ID).sort("timestamp", 1).limit(100).to_list(100)
+        return MongoJSONResponse(messages)
     except Exception as e:
         print(f"❌ Fehler beim Laden der Nachrichten: {str(e)}")
         return []
@@ -1251,8 +1639,8 @@ async def get_private_messages(unread_only: bool = False, current_user: User = D
     if unread_only:
         query["is_read"] = {"$ne": True}
     
-    messages = await db.messages.find(query).sort("timestamp", -1).limit(50).to_list(50)
-    return [Message(**message) for message in messages]
+    messages = await repos.messages.find(query, MESSAGE_PROJECTION).sort("timestamp", -1).limit(50).to_list(50)
+    return MongoJSONResponse(with_defaults(messages, MESSAGE_DEFAULTS))
 
 @api_router.post("/messages", response_model=Message)
 async def send_message(message_data: MessageCreate, current_user: User = Depends(get_current_user)):
@@ -1263,10 +1651,10 @@ async def send_message(message_data: MessageCreate, current_user: User = Depends
     message_dict['created_at'] = datetime.utcnow()  # Add created_at for compatibility
     message_obj = Message(**message_dict)
     
-    await db.messages.insert_one(message_obj.dict())
+    await repos.messages.insert_one(message_obj.dict())
     
     # Emit to socket room
-    await sio.emit('new_message', message_obj.dict(), room=message_data.channel)
+    await emit_event('new_message', message_obj.dict(), room=message_data.channel, encoder=wire_registry.encode_message)
     
     return message_obj
 
@@ -1295,7 +1683,7 @@ async def create_notification(
             "timestamp": datetime.utcnow()
         }
         
-        await db.notifications.insert_one(notification_dict)
+        await repos.notifications.insert_one(notification_dict)
         return {"success": True, "message": "Notification created"}
         
     except Exception as e:
@@ -1306,7 +1694,7 @@ async def get_live_locations(current_user: User = Depends(get_current_user)):
     """Get live officer locations"""
     try:
         # Mock officer locations for demo - in production this would come from GPS tracking
-        officers = await db.users.find({"status": "Im Dienst"}).to_list(100)
+        officers = await repos.users.find({"status": "Im Dienst"}).to_list(100)
         
         live_locations = []
         for i, officer in enumerate(officers):
@@ -1332,12 +1720,12 @@ async def get_live_locations(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Failed to get live locations: {str(e)}")
 
 @api_router.get("/users")
-async def get_users(current_user: User = Depends(get_current_user)):
+async def get_users(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users = await db.users.find().to_list(100)
-    return serialize_mongo_data(users)
+    users = await reads.users.find({}, NO_ID).to_list(100)
+    return MongoJSONResponse(users)
 
 @api_router.get("/locations/live")
 async def get_live_locations(current_user: User = Depends(get_current_user)):
@@ -1353,7 +1741,13 @@ async def get_live_locations(current_user: User = Depends(get_current_user)):
         }}
     ]
     
-    locations = await db.locations.aggregate(pipeline).to_list(100)
+    if repos.is_mongo:
+        locations = await repos.locations.aggregate(pipeline).to_list(100)
+    else:
+        latest = {}
+        async for location in repos.locations.find(pipeline[0]["$match"]).sort("timestamp", -1):
+            latest.setdefault(location.get("user_id"), {"_id": location.get("user_id"), "latest_location": location})
+        locations = list(latest.values())[:100]
     
     # Convert ObjectId to string for JSON serialization
     result = []
@@ -1368,23 +1762,111 @@ async def get_live_locations(current_user: User = Depends(get_current_user)):
 @api_router.post("/locations/update")
 async def update_location(location_data: LocationUpdate, current_user: User = Depends(get_current_user)):
     location_data.user_id = current_user.id
-    await db.locations.insert_one(location_data.dict())
+    await repos.locations.insert_one(location_data.dict())
     
     # Emit location update
-    await sio.emit('location_updated', location_data.dict())
+    await emit_event('location_updated', location_data.dict(), encoder=wire_registry.encode_location)
     
     return {"status": "success"}
 
+# Volltextsuche über Personen, Vorfälle und Berichte
+SEARCH_SYNC_INTERVAL = int(os.getenv("SEARCH_SYNC_INTERVAL", "30"))  # Sekunden
+SEARCH_RESULT_PROJECTIONS = {
+    "persons": {"_id": 0, "id": 1, "first_name": 1, "last_name": 1, "case_number": 1, "status": 1,
+                "birth_date": 1, "last_seen_location": 1},
+    "incidents": {"_id": 0, "id": 1, "title": 1, "address": 1, "status": 1, "priority": 1, "created_at": 1},
+    "reports": {"_id": 0, "id": 1, "title": 1, "author_name": 1, "shift_date": 1, "status": 1, "created_at": 1},
+}
+fulltext_index = search_index.SearchIndex()
+
+def index_for_search(kind: str, doc: Optional[dict]):
+    """Keep the local search index in sync with a write (other workers catch up via polling)"""
+    if doc and doc.get("id"):
+        search_index.index_document(fulltext_index, kind, doc)
+
+async def run_search_sync():
+    """Build the search index once, then pull changed documents periodically"""
+    global fulltext_index
+    high_water = None
+    while True:
+        try:
+            if high_water is None:
+                # Frischen Index aufbauen und erst danach austauschen
+                fresh_index = search_index.SearchIndex()
+                high_water = await search_index.sync_index(fresh_index, repos)
+                fulltext_index = fresh_index
+                print(f"🔎 Suchindex geladen: {len(fulltext_index)} Dokumente")
+            else:
+                high_water = await search_index.sync_index(fulltext_index, repos, high_water)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Suchindex-Synchronisation fehlgeschlagen: {e}")
+        await asyncio.sleep(SEARCH_SYNC_INTERVAL)
+
+async def run_report_archiving():
+    """Periodically move old reports into the cold archive"""
+    while True:
+        try:
+            moved = await report_archive.archive_old_reports(db)
+            await report_tiers.load(db)
+            if moved:
+                report_tiers.invalidate()
+                print(f"🧊 {moved} Berichte ins Archiv verschoben")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Berichts-Archivierung fehlgeschlagen: {e}")
+        await asyncio.sleep(report_archive.REPORT_ARCHIVE_INTERVAL)
+
+@api_router.get("/search")
+async def search(
+    q: str,
+    types: str = "persons,incidents,reports",
+    limit: int = 20,
+    current_user: User = Depends(get_current_user)
+):
+    """Volltextsuche mit Präfix-/Fehlertoleranz und Umlaut-Faltung, nach Relevanz sortiert"""
+    kinds = [kind for kind in types.split(",") if kind in search_index.SEARCH_SOURCES]
+    if not kinds:
+        raise HTTPException(status_code=400, detail="No valid search types given")
+    limit = min(max(limit, 1), 100)
+    
+    def allow(key, meta):
+        # Berichte: Nicht-Admins sehen nur eigene
+        return key[0] != "reports" or current_user.role == UserRole.ADMIN or meta.get("author_id") == current_user.id
+    
+    hits = fulltext_index.search(q, kinds, limit=limit, allow=allow)
+    
+    # Aktuelle Daten nachladen - in anderen Workern gelöschte Dokumente fallen dabei heraus
+    ids_by_kind = {}
+    for (kind, doc_id), _ in hits:
+        ids_by_kind.setdefault(kind, []).append(doc_id)
+    docs = {}
+    for kind, ids in ids_by_kind.items():
+        source = search_index.SEARCH_SOURCES[kind]
+        query = {"id": {"$in": ids}, **source["filter"]}
+        # Archivierte Berichte liegen in der Archiv-Collection
+        for collection in search_index.source_collections(source):
+            async for doc in repos[collection].find(query, SEARCH_RESULT_PROJECTIONS[kind]):
+                docs[(kind, doc["id"])] = doc
+    
+    results = [
+        {"type": key[0], "score": round(score, 3), **docs[key]}
+        for key, score in hits if key in docs
+    ]
+    return MongoJSONResponse({"query": q, "total": len(results), "results": results})
+
 # Admin routes
 @api_router.get("/admin/stats")
-async def get_admin_stats(current_user: User = Depends(get_current_user)):
+async def get_admin_stats(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    total_users = await db.users.count_documents({})
-    total_incidents = await db.incidents.count_documents({})
-    open_incidents = await db.incidents.count_documents({"status": "open"})
-    total_messages = await db.messages.count_documents({})
+    total_users = await reads.users.count_documents({})
+    total_incidents = await reads.incidents.count_documents({})
+    open_incidents = await reads.incidents.count_documents({"status": "open"})
+    total_messages = await reads.messages.count_documents({})
     
     return {
         "total_users": total_users,
@@ -1393,6 +1875,129 @@ async def get_admin_stats(current_user: User = Depends(get_current_user)):
         "total_messages": total_messages
     }
 
+@api_router.get("/admin/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "ndjson",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    reads: repositories.Repositories = Depends(route_reads),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream reports, archived incidents, check-ins or vacations as NDJSON/CSV (Admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    export = EXPORT_DATASETS.get(dataset)
+    if export is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {dataset}")
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'csv'")
+    
+    try:
+        start_date = parse_date(start)
+        end_date = parse_date(end, end_of_day=True)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
+    
+    query = build_query(export, start_date, end_date)
+    filename = f"stadtwache_{dataset}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
+    
+    return StreamingResponse(
+        stream_export([reads[name] for name in export.collections], export, query, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.post("/admin/import/persons")
+async def import_persons(request: Request, format: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """Import persons from a streamed CSV/NDJSON body (Admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    import_format = bulk_import.detect_format(request.headers.get("content-type"), format)
+    if import_format not in bulk_import.IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'csv'")
+    
+    async def prepare(chunk, result):
+        docs = []
+        for row, person_data in chunk:
+            person_dict = person_data.dict()
+            person_dict['created_by'] = current_user.id
+            person_dict['created_by_name'] = current_user.username
+            person_doc = Person(**person_dict).dict()
+            person_doc["dedupe_keys"] = person_duplicates.blocking_keys(person_doc)
+            docs.append((row, person_doc))
+        return docs
+    
+    async def on_inserted(docs):
+        for doc in docs:
+            index_for_search("persons", doc)
+    
+    rows = bulk_import.iter_rows(request.stream(), import_format)
+    result = await bulk_import.run_import(rows, PersonCreate, prepare, repos.persons, on_inserted)
+    
+    if result.imported:
+        response_cache.bump("persons")
+        await sio.emit('persons_imported', {"count": result.imported})
+    print(f"📥 Personen-Import: {result.imported}/{result.total} importiert, {result.failed} Fehler")
+    return result.dict()
+
+@api_router.post("/admin/import/users")
+async def import_users(request: Request, format: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """Import users from a streamed CSV/NDJSON body (Admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    import_format = bulk_import.detect_format(request.headers.get("content-type"), format)
+    if import_format not in bulk_import.IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'csv'")
+    
+    seen_emails = set()
+    
+    async def prepare(chunk, result):
+        # E-Mail-Dubletten innerhalb der Datei und gegenüber der Datenbank vorab aussortieren
+        emails = [user_data.email for _, user_data in chunk]
+        existing = {
+            doc["email"] for doc in
+            await repos.users.find({"email": {"$in": emails}}, {"_id": 0, "email": 1}).to_list(None)
+        }
+        accepted = []
+        for row, user_data in chunk:
+            if user_data.email in existing or user_data.email in seen_emails:
+                result.add_error(row, "Email already registered")
+                continue
+            seen_emails.add(user_data.email)
+            accepted.append((row, user_data))
+        
+        hashes = await bulk_import.hash_passwords([user_data.password for _, user_data in accepted], get_password_hash)
+        now = datetime.utcnow()
+        docs = []
+        for (row, user_data), hashed_password in zip(accepted, hashes):
+            docs.append((row, build_user_document(user_data, hashed_password, now)))
+        return docs
+    
+    rows = bulk_import.iter_rows(request.stream(), import_format)
+    result = await bulk_import.run_import(rows, UserCreate, prepare, repos.users)
+    
+    if result.imported:
+        response_cache.bump("users")
+    print(f"📥 Benutzer-Import: {result.imported}/{result.total} importiert, {result.failed} Fehler")
+    return result.dict()
+
+@api_router.post("/admin/reports/archive", dependencies=[Depends(require_mongo)])
+async def archive_reports_now(current_user: User = Depends(get_current_user)):
+    """Run the report archiving job immediately (Admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    moved = await report_archive.archive_old_reports(db)
+    await report_tiers.load(db)
+    report_tiers.invalidate()
+    return {
+        "status": "success",
+        "moved": moved,
+        "archived_before": report_tiers.watermark,
+        "archive_after_days": report_archive.REPORT_ARCHIVE_AFTER_DAYS
+    }
+
 # Online Status Management
 @api_router.post("/users/online-status")
 async def set_online_status(current_user: User = Depends(get_current_user)):
@@ -1479,7 +2084,7 @@ async def logout_user(current_user: User = Depends(get_current_user)):
 async def create_first_user(user_data: UserCreate):
     """Create the first admin user - only works if no users exist"""
     # Check if any users already exist
-    existing_users = await db.users.count_documents({})
+    existing_users = await repos.users.count_documents({})
     if existing_users > 0:
         raise HTTPException(status_code=400, detail="Users already exist. Use normal registration.")
     
@@ -1495,7 +2100,8 @@ async def create_first_user(user_data: UserCreate):
     user_dict["is_active"] = True
     user_dict["status"] = "Im Dienst"
     
-    await db.users.insert_one(user_dict)
+    await repos.users.insert_one(user_dict)
+    response_cache.bump("users")
     
     # Return user without password
     user_dict.pop("hashed_password", None)
@@ -1516,13 +2122,16 @@ async def reset_database():
         total_documents_deleted = 0
         collection_names = []
         
-        for collection_name in await db.list_collection_names():
-            collection = db[collection_name]
+        for collection_name in await repos.collection_names():
+            collection = repos[collection_name]
             result = await collection.delete_many({})
             collections_cleared += 1
             total_documents_deleted += result.deleted_count
             collection_names.append(collection_name)
         
+        response_cache.bump_all()
+        app_config.clear()
+        report_tiers.set_watermark(None)
         return {
             "message": "Database completely reset!",
             "collections_cleared": collections_cleared,
@@ -1533,25 +2142,44 @@ async def reset_database():
         raise HTTPException(status_code=500, detail=f"Reset failed: {str(e)}")
 
 # App Configuration Endpoints
+# Prozessweiter Snapshot - wird beim Start geladen und bei Updates write-through aktualisiert
+app_config = app_config_store.AppConfigStore()
+
+async def reload_app_config():
+    """Refresh the snapshot after another worker published a configuration change"""
+    await app_config.reload(repos)
+    response_cache.bump("app_config")
+
 @api_router.get("/app/config", response_model=AppConfiguration)
-async def get_app_configuration():
+async def get_app_configuration(request: Request):
     """Get current app configuration"""
-    config = await db.app_config.find_one()
-    if not config:
+    if not app_config.loaded and await app_config.reload(repos) is None:
         # Create default configuration
         default_config = AppConfiguration()
-        await db.app_config.insert_one(default_config.dict())
-        return default_config
-    
-    # Convert MongoDB _id to our id field
-    if "_id" in config:
-        del config["_id"]
-    
-    return AppConfiguration(**config)
+        await repos.app_config.insert_one(default_config.dict())
+        app_config.set(default_config.dict())
+        response_cache.bump("app_config")
+    
+    return app_config.public(str(request.base_url))
+
+@api_router.get("/app/icon/{icon_file}")
+async def get_app_icon(icon_file: str):
+    """App-Icon als cachebares Static Asset (Content-Hash im Dateinamen)"""
+    if not app_config.loaded:
+        await app_config.reload(repos)
+    if icon_file != app_config.icon_file:
+        raise HTTPException(status_code=404, detail="Icon not found")
+    
+    return Response(
+        content=app_config.icon,
+        media_type=app_config.icon_media_type,
+        headers={"Cache-Control": app_config_store.ICON_CACHE_CONTROL}
+    )
 
 @api_router.put("/admin/app/config", response_model=AppConfiguration)
 async def update_app_configuration(
     config_update: AppConfigurationUpdate,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """Update app configuration (Admin only)"""
@@ -1560,28 +2188,39 @@ async def update_app_configuration(
         raise HTTPException(status_code=403, detail="Only admins can update app configuration")
     
     # Get current config
-    current_config = await db.app_config.find_one()
+    current_config = await repos.app_config.find_one()
     if not current_config:
         # Create default if none exists
         current_config = AppConfiguration().dict()
-        await db.app_config.insert_one(current_config)
+        await repos.app_config.insert_one(current_config)
     
     # Update only provided fields
     update_data = {k: v for k, v in config_update.dict().items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
     
+    # Unveränderte Icon-URL aus dem Client nicht als Icon speichern
+    if app_config.is_icon_url(update_data.get("app_icon")):
+        update_data.pop("app_icon")
+    
     # Update in database
-    await db.app_config.update_one(
+    await repos.app_config.update_one(
         {"id": current_config["id"]},
         {"$set": update_data}
     )
     
     # Get updated config
-    updated_config = await db.app_config.find_one({"id": current_config["id"]})
-    if "_id" in updated_config:
-        del updated_config["_id"]
+    updated_config = await repos.app_config.find_one({"id": current_config["id"]})
+    
+    # Write-through: Snapshot aktualisieren und andere Worker benachrichtigen
+    app_config.set(updated_config)
+    response_cache.bump("app_config")
+    try:
+        if repos.is_mongo:
+            await app_config_store.publish_change(db, current_config["id"])
+    except Exception as e:
+        logger.error(f"App config change notification failed: {str(e)}")
     
-    return AppConfiguration(**updated_config)
+    return app_config.public(str(request.base_url))
 
 @api_router.put("/admin/users/{user_id}/assign")
 async def assign_user_district_team(
@@ -1604,12 +2243,13 @@ async def assign_user_district_team(
     
     update_data['updated_at'] = datetime.utcnow()
     
-    result = await db.users.update_one({"id": user_id}, {"$set": update_data})
+    result = await repos.users.update_one({"id": user_id}, {"$set": update_data})
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
-    updated_user = await db.users.find_one({"id": user_id})
+    response_cache.bump("users")
+    updated_user = await repos.users.find_one({"id": user_id})
     return serialize_mongo_data(updated_user)
 
 # Get all districts
@@ -1649,29 +2289,6 @@ async def get_teams(current_user: User = Depends(get_current_user)):
 async def root():
     return {"message": "Stadtwache API", "version": "1.0.0"}
 
-# Statische Dateien für Frontend
-static_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../frontend/dist"))
-expo_static_path = os.path.join(static_path, "_expo")
-assets_path = os.path.join(static_path, "assets")
-fonts_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../frontend/node_modules/@expo/vector-icons/build/vendor/react-native-vector-icons/Fonts"))
-
-if os.path.exists(expo_static_path):
-    # Mount _expo directory to /_expo path
-    app.mount("/_expo", StaticFiles(directory=expo_static_path), name="expo_static")
-    print(f"✅ Expo static files mounted from: {expo_static_path}")
-
-if os.path.exists(assets_path):
-    # Mount assets directory to /assets path  
-    app.mount("/assets", StaticFiles(directory=assets_path), name="assets")
-    print(f"✅ Assets mounted from: {assets_path}")
-
-if os.path.exists(fonts_path):
-    # Mount fonts for icons
-    app.mount("/assets/node_modules/@expo/vector-icons/build/vendor/react-native-vector-icons/Fonts", StaticFiles(directory=fonts_path), name="fonts")
-    print(f"✅ Icon fonts mounted from: {fonts_path}")
-
-# Root route wird weiter unten definiert
-
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -1681,6 +2298,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def etag_cache_middleware(request: Request, call_next):
+    """Serve repeat polls of read-mostly endpoints from the response cache (304 on If-None-Match)"""
+    route = CACHED_ROUTES.get(request.url.path)
+    if route is None or request.method != "GET":
+        return await call_next(request)
+    resource, ttl = route
+
+    # Rolle direkt aus dem signierten Token - ohne DB-Zugriff
+    role = "anonymous"
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return await call_next(request)
+        role = payload.get("role", "user")
+        # Gelöschter oder umgestufter Benutzer: ohne Cache, der Handler prüft gegen die Datenbank
+        if user_roles.stale(payload.get("user_id"), role):
+            return await call_next(request)
+
+    # Host gehört zum Schlüssel, da Antworten absolute URLs enthalten können (App-Icon)
+    key = (request.url.netloc + request.url.path, role, request.url.query)
+    entry = response_cache.lookup(key, resource)
+    if entry is None:
+        # Version vor dem Handler lesen: parallele Writes machen den Eintrag sofort ungültig
+        version = response_cache.version(resource)
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+        entry = response_cache.store(key, version, ttl, body, headers, response.media_type)
+
+    cache_headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=cache_headers)
+    return Response(content=entry.body, status_code=200, headers={**entry.headers, **cache_headers}, media_type=entry.media_type)
+
+@app.middleware("http")
+async def read_your_writes_middleware(request: Request, call_next):
+    """Nach einem Schreibzugriff liest derselbe Client eine Zeit lang vom Primary (route_reads)"""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        recent_writers.mark(request.headers.get("authorization"))
+    return response
+
+# Kompression (zstd/Brotli/Gzip) ganz außen - komprimiert auch Antworten aus dem ETag-Cache
+app.add_middleware(response_compression.CompressionMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -1688,47 +2355,125 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Verpasste Check-Ins: Fristen pro Beamten im Dienst (Priority-Queue)
+check_in_watch = checkin_watch.CheckInWatch()
+
+def watch_check_ins(user: Optional[dict], changes: dict):
+    """Start/stop deadline tracking when status or check-in interval change"""
+    if not user or not ({"status", "check_in_interval"} & changes.keys()):
+        return
+    if user.get("status", "Im Dienst") not in checkin_watch.ON_DUTY_STATUSES:
+        check_in_watch.untrack(user["id"])
+        return
+    # Dienstbeginn ohne Check-In: Frist ab jetzt
+    last_check_in = user.get("last_check_in")
+    if check_in_watch.deadline(user["id"]) is None:
+        last_check_in = datetime.utcnow()
+    check_in_watch.track(user["id"], user.get("username"), last_check_in, user.get("check_in_interval"))
+
+async def escalate_missed_check_in(user_id: str, entry: dict):
+    """Count a missed check-in once across all workers and notify"""
+    deadline = entry["deadline"]
+    projection = {"_id": 0, "id": 1, "username": 1, "status": 1, "last_check_in": 1,
+                  "check_in_interval": 1, "missed_check_ins": 1, "patrol_team": 1, "assigned_district": 1}
+    # Nur zählen, wenn seit der Frist kein Check-In kam und kein anderer Worker die Frist schon gezählt hat
+    user = await repos.users.find_one_and_update(
+        checkin_watch.missed_filter(user_id, entry),
+        {"$inc": {"missed_check_ins": 1}, "$set": {"missed_check_in_deadline": deadline}},
+        projection=projection,
+        return_document=ReturnDocument.AFTER
+    )
+    if user is None:
+        current = await repos.users.find_one({"id": user_id}, projection)
+        if not current or current.get("status", "Im Dienst") not in checkin_watch.ON_DUTY_STATUSES:
+            check_in_watch.untrack(user_id)
+        elif current.get("last_check_in") and current["last_check_in"] > entry["last_check_in"]:
+            # Check-In lief über einen anderen Worker
+            check_in_watch.track(user_id, current.get("username"), current["last_check_in"], current.get("check_in_interval"))
+        else:
+            check_in_watch.reschedule_missed(user_id, entry)
+        return
+    
+    check_in_watch.reschedule_missed(user_id, entry)
+    response_cache.bump("users")
+    await checkin_rollups.record_missed(repos, user_id, user.get("username"), deadline)
+    overdue_minutes = int((datetime.utcnow() - deadline).total_seconds() // 60)
+    print(f"🚨 Check-In verpasst: {user.get('username')} ({user['missed_check_ins']}x, {overdue_minutes} min überfällig)")
+    await sio.emit('check_in_missed', {
+        'user_id': user_id,
+        'username': user.get('username'),
+        'missed_check_ins': user['missed_check_ins'],
+        'deadline': deadline.isoformat(),
+        'overdue_minutes': overdue_minutes,
+        'patrol_team': user.get('patrol_team'),
+        'assigned_district': user.get('assigned_district'),
+        'escalation_level': 'high' if user['missed_check_ins'] >= 2 else 'warning'
+    })
+
+async def run_check_in_watch():
+    try:
+        await checkin_watch.seed(check_in_watch, repos)
+        print(f"⏰ Check-In-Überwachung: {len(check_in_watch)} Beamte im Dienst")
+    except Exception as e:
+        print(f"⚠️ Check-In-Überwachung konnte nicht vorgeladen werden: {e}")
+    await check_in_watch.run(escalate_missed_check_in)
+
 # Schichtverwaltung API Endpoints - Einfache Funktionen
 @app.post("/api/checkin")
 async def check_in(current_user: User = Depends(get_current_user)):
     """Benutzer Check-In"""
     try:
+        now = checkin_watch.as_stored(datetime.utcnow())
         checkin_data = {
             "id": str(uuid.uuid4()),
             "user_id": current_user.id,
             "user_name": current_user.username,
-            "timestamp": datetime.utcnow(),
+            "timestamp": now,
             "status": "ok"
         }
         
-        await db.checkins.insert_one(checkin_data)
+        await repos.checkins.insert_one(checkin_data)
         
         # Update user's last check-in time and reset missed check-ins
-        await db.users.update_one(
+        await repos.users.update_one(
             {"id": current_user.id},
-            {"$set": {"last_check_in": datetime.utcnow(), "missed_check_ins": 0}}
+            {"$set": {"last_check_in": now, "missed_check_ins": 0}}
         )
         
+        # Tages-Rollup fortschreiben (erster/letzter Check-In, Anzahl, Lücken)
+        await checkin_rollups.record_check_in(
+            repos, current_user.id, current_user.username, now,
+            current_user.last_check_in, current_user.check_in_interval
+        )
+        
+        # Nächste Frist setzen (Check-In gilt als Dienstbeginn)
+        check_in_watch.track(current_user.id, current_user.username, now, current_user.check_in_interval)
+        
         return serialize_mongo_data(checkin_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/checkins")
-async def get_checkins(current_user: User = Depends(get_current_user)):
+async def get_checkins(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     """Lade Check-Ins"""
     try:
         if current_user.role == "admin":
-            checkins = await db.checkins.find().sort("timestamp", -1).to_list(100)
+            checkins = await reads.checkins.find({}, NO_ID).sort("timestamp", -1).to_list(100)
         else:
-            checkins = await db.checkins.find({"user_id": current_user.id}).sort("timestamp", -1).to_list(50)
+            checkins = await reads.checkins.find({"user_id": current_user.id}, NO_ID).sort("timestamp", -1).to_list(50)
         
-        return serialize_mongo_data(checkins)
+        return MongoJSONResponse(checkins)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/vacations")
 async def request_vacation(vacation_data: VacationCreate, current_user: User = Depends(get_current_user)):
     """Urlaubsantrag stellen"""
+    try:
+        start_at, end_at = roster.parse_vacation_dates(vacation_data.start_date, vacation_data.end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Ungültiger Zeitraum: {e}")
+    
     try:
         vacation_dict = {
             "id": str(uuid.uuid4()),
@@ -1736,6 +2481,9 @@ async def request_vacation(vacation_data: VacationCreate, current_user: User = D
             "user_name": current_user.username,
             "start_date": vacation_data.start_date,
             "end_date": vacation_data.end_date,
+            # Geparstes Intervall [start_at, end_at) für Konflikt- und Abdeckungsprüfung
+            "start_at": start_at,
+            "end_at": end_at,
             "reason": vacation_data.reason,
             "status": "pending",
             "created_at": datetime.utcnow()
@@ -1747,7 +2495,7 @@ async def request_vacation(vacation_data: VacationCreate, current_user: User = D
         print(f"   Status: pending")
         print(f"   ID: {vacation_dict['id']}")
         
-        await db.vacations.insert_one(vacation_dict)
+        await repos.vacations.insert_one(vacation_dict)
         
         print(f"✅ Urlaubsantrag erfolgreich in Datenbank gespeichert")
         
@@ -1757,15 +2505,15 @@ async def request_vacation(vacation_data: VacationCreate, current_user: User = D
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/vacations")
-async def get_vacations(current_user: User = Depends(get_current_user)):
+async def get_vacations(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     """Lade Urlaubsanträge"""
     try:
         if current_user.role == "admin":
-            vacations = await db.vacations.find().sort("created_at", -1).to_list(100)
+            vacations = await reads.vacations.find({}, NO_ID).sort("created_at", -1).to_list(100)
         else:
-            vacations = await db.vacations.find({"user_id": current_user.id}).sort("created_at", -1).to_list(100)
+            vacations = await reads.vacations.find({"user_id": current_user.id}, NO_ID).sort("created_at", -1).to_list(100)
         
-        return serialize_mongo_data(vacations)
+        return MongoJSONResponse(vacations)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1774,7 +2522,7 @@ async def delete_vacation(vacation_id: str, current_user: User = Depends(get_cur
     """Urlaubsantrag löschen (nur Eigentümer oder Admin)"""
     try:
         # Finde den Urlaubsantrag
-        vacation = await db.vacations.find_one({"id": vacation_id})
+        vacation = await repos.vacations.find_one({"id": vacation_id})
         if not vacation:
             raise HTTPException(status_code=404, detail="Urlaubsantrag nicht gefunden")
         
@@ -1783,11 +2531,12 @@ async def delete_vacation(vacation_id: str, current_user: User = Depends(get_cur
             raise HTTPException(status_code=403, detail="Keine Berechtigung zum Löschen")
         
         # Lösche den Urlaubsantrag
-        result = await db.vacations.delete_one({"id": vacation_id})
+        result = await repos.vacations.delete_one({"id": vacation_id})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Urlaubsantrag nicht gefunden")
         
+        change_roster(lambda target: target.remove_vacation(vacation_id))
         return {"success": True, "message": "Urlaubsantrag erfolgreich gelöscht"}
         
     except HTTPException:
@@ -1795,6 +2544,150 @@ async def delete_vacation(vacation_id: str, current_user: User = Depends(get_cur
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ================================================
+# DIENSTPLAN (Schichten)
+# ================================================
+
+# Dienstplan-Engine dieses Workers - wird bei Änderungen inkrementell gepflegt
+duty_roster = roster.Roster()
+# Lokale Änderungen während eines Neuladens - werden auf den frischen Dienstplan nachgespielt
+roster_changes: Optional[List[Callable[[roster.Roster], None]]] = None
+
+def change_roster(change: Callable[[roster.Roster], None]):
+    """Apply a local change to the roster (and to a reload that is still running)"""
+    change(duty_roster)
+    if roster_changes is not None:
+        roster_changes.append(change)
+
+async def run_roster_refresh():
+    """Reload the roster periodically to pick up changes made by other workers"""
+    global duty_roster, roster_changes
+    while True:
+        roster_changes = []
+        try:
+            fresh = await roster.load_roster(repos)
+            # Während des Ladens lokal angelegte/gelöschte Schichten nicht verlieren
+            for change in roster_changes:
+                change(fresh)
+            duty_roster = fresh
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Dienstplan konnte nicht geladen werden: {e}")
+        finally:
+            roster_changes = None
+        await asyncio.sleep(roster.ROSTER_REFRESH_INTERVAL)
+
+async def refresh_roster_team(team_id: Optional[str]):
+    """Reload one team (members and their names) into the roster"""
+    if not team_id:
+        return
+    team = await repos.teams.find_one({"id": team_id}, {"_id": 0, "id": 1, "name": 1, "members": 1, "min_staff": 1})
+    if team is None:
+        return
+    names = {
+        user["id"]: user.get("username")
+        async for user in repos.users.find({"id": {"$in": team.get("members") or []}}, {"_id": 0, "id": 1, "username": 1})
+    }
+
+    def change(target: roster.Roster):
+        target.set_team(team)
+        for user_id, username in names.items():
+            target.set_user_name(user_id, username)
+    change_roster(change)
+
+def parse_shift_time(value: Optional[str], field: str, required: bool = False) -> Optional[datetime]:
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {field}, expected ISO date/time")
+    if parsed is None and required:
+        raise HTTPException(status_code=400, detail=f"{field} is required")
+    return parsed
+
+@api_router.post("/shifts")
+async def create_shift(shift_data: ShiftCreate, current_user: User = Depends(get_current_user)):
+    """Schicht für ein Team in einem Bezirk anlegen (nur Admin)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    start_time = parse_shift_time(shift_data.start_time, "start_time", required=True)
+    end_time = parse_shift_time(shift_data.end_time, "end_time", required=True)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    if not await repos.teams.find_one({"id": shift_data.team_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Team not found")
+    
+    shift_dict = {
+        "id": str(uuid.uuid4()),
+        "team_id": shift_data.team_id,
+        "district_id": shift_data.district_id,
+        "start_time": start_time,
+        "end_time": end_time,
+        "created_by": current_user.id,
+        "created_at": datetime.utcnow()
+    }
+    await repos.shifts.insert_one(shift_dict)
+    shift_dict.pop("_id", None)
+    
+    if shift_data.team_id not in duty_roster.teams:
+        await refresh_roster_team(shift_data.team_id)
+    change_roster(lambda target: target.add_shift(shift_dict))
+    
+    print(f"🗓️ Schicht angelegt: Team {shift_data.team_id} in {shift_data.district_id} ({start_time} - {end_time})")
+    return MongoJSONResponse(shift_dict)
+
+@api_router.get("/shifts")
+async def get_shifts(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    team_id: Optional[str] = None,
+    district_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Schichten in einem Zeitraum (Standard: ab jetzt 7 Tage)"""
+    period_start = parse_shift_time(start, "start") or datetime.utcnow()
+    period_end = parse_shift_time(end, "end") or period_start + timedelta(days=7)
+    
+    query = {"start_time": {"$lt": period_end}, "end_time": {"$gt": period_start}}
+    if team_id:
+        query["team_id"] = team_id
+    if district_id:
+        query["district_id"] = district_id
+    shifts = await repos.shifts.find(query, NO_ID).sort("start_time", 1).to_list(500)
+    return MongoJSONResponse(shifts)
+
+@api_router.get("/shifts/on-duty")
+async def get_on_duty(
+    district_id: Optional[str] = None,
+    at: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Wer ist zum Zeitpunkt (Standard: jetzt) im Bezirk im Dienst - aus dem Dienstplan im Speicher"""
+    moment = parse_shift_time(at, "at") or datetime.utcnow()
+    on_duty = duty_roster.on_duty(moment, district_id)
+    return MongoJSONResponse({"at": moment, "district_id": district_id, "count": len(on_duty), "on_duty": on_duty})
+
+@api_router.get("/shifts/understaffed")
+async def get_understaffed_teams(hours: float = 8, current_user: User = Depends(get_current_user)):
+    """Schichten der nächsten Stunden, in denen ein Team unter Mindestbesetzung liegt"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    hours = min(max(hours, 0.5), 168)
+    now = datetime.utcnow()
+    return MongoJSONResponse({"from": now, "hours": hours, "understaffed": duty_roster.understaffed(now, hours)})
+
+@api_router.delete("/shifts/{shift_id}")
+async def delete_shift(shift_id: str, current_user: User = Depends(get_current_user)):
+    """Schicht löschen (nur Admin)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    result = await repos.shifts.delete_one({"id": shift_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Shift not found")
+    change_roster(lambda target: target.remove_shift(shift_id))
+    return {"status": "success", "message": "Shift deleted"}
+
 # Admin Management Endpoints
 
 # Urlaubsanträge Admin-Endpunkte
@@ -1806,10 +2699,22 @@ async def approve_vacation(vacation_id: str, approval_data: VacationApproval, cu
     
     try:
         # Vacation finden
-        vacation = await db.vacations.find_one({"id": vacation_id})
+        vacation = await repos.vacations.find_one({"id": vacation_id})
         if not vacation:
             raise HTTPException(status_code=404, detail="Vacation request not found")
         
+        # Teamstärke prüfen, bevor genehmigt wird
+        conflicts = []
+        if approval_data.action == "approve":
+            conflicts = vacation_team_conflicts(vacation)
+            # Nur blockieren, wenn erst dieser Antrag die Mindestbesetzung unterschreitet -
+            # ohnehin unterbesetzte Teams kommen als Hinweis in "conflicts" zurück
+            if any(conflict["caused_by_request"] for conflict in conflicts) and not approval_data.force:
+                raise HTTPException(status_code=409, detail=jsonable_encoder({
+                    "message": "Genehmigung würde Teams unter die Mindestbesetzung bringen",
+                    "conflicts": conflicts
+                }))
+        
         # Status aktualisieren
         update_data = {
             "status": "approved" if approval_data.action == "approve" else "rejected",
@@ -1831,7 +2736,7 @@ async def approve_vacation(vacation_id: str, approval_data: VacationApproval, cu
         print(f"   Zeitraum: {vacation.get('start_date')} bis {vacation.get('end_date')}")
         print(f"   Begründung: {approval_data.reason}")
         
-        result = await db.vacations.update_one(
+        result = await repos.vacations.update_one(
             {"id": vacation_id},
             {"$set": update_data}
         )
@@ -1845,25 +2750,79 @@ async def approve_vacation(vacation_id: str, approval_data: VacationApproval, cu
             raise HTTPException(status_code=404, detail="Vacation request not found")
         
         # Aktualisierte Vacation zurückgeben
-        updated_vacation = await db.vacations.find_one({"id": vacation_id})
-        return serialize_mongo_data(updated_vacation)
+        updated_vacation = await repos.vacations.find_one({"id": vacation_id})
+        change_roster(lambda target: target.set_vacation(updated_vacation))
+        return MongoJSONResponse({**serialize_mongo_data(updated_vacation), "conflicts": conflicts})
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def vacation_team_conflicts(vacation: dict) -> List[dict]:
+    """Remaining strength of the requester's teams if the vacation were approved"""
+    interval = roster.vacation_interval(vacation)
+    if interval is None:
+        return []
+    start, end = interval
+    # Bereits genehmigter Urlaub darf nicht doppelt zählen
+    duty_roster.remove_vacation(vacation["id"])
+    try:
+        return duty_roster.vacation_conflicts(vacation["user_id"], start, end)
+    finally:
+        if vacation.get("status") == "approved":
+            duty_roster.set_vacation(vacation)
+
+@app.get("/api/admin/vacations/coverage")
+async def get_vacation_coverage(
+    team_id: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Tägliche Teamstärke (Mitglieder abzüglich genehmigtem Urlaub) für einen Zeitraum"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if team_id not in duty_roster.teams:
+        await refresh_roster_team(team_id)
+        if team_id not in duty_roster.teams:
+            raise HTTPException(status_code=404, detail="Team not found")
+    
+    try:
+        first_day = (parse_date(start) or datetime.utcnow()).date()
+        last_day = parse_date(end).date() if end else first_day + timedelta(days=29)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
+    if last_day < first_day or (last_day - first_day).days > 366:
+        raise HTTPException(status_code=400, detail="Date range must be between 1 and 367 days")
+    
+    team = duty_roster.teams[team_id]
+    return {
+        "team_id": team_id,
+        "team_name": team["name"],
+        "min_staff": team["min_staff"],
+        "days": duty_roster.daily_coverage(team_id, first_day, last_day)
+    }
+
+@app.get("/api/admin/vacations/{vacation_id}/conflicts")
+async def get_vacation_conflicts(vacation_id: str, current_user: User = Depends(get_current_user)):
+    """Überschneidungen und verbleibende Teamstärke für einen Urlaubsantrag"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    vacation = await repos.vacations.find_one({"id": vacation_id}, {"_id": 0})
+    if not vacation:
+        raise HTTPException(status_code=404, detail="Vacation request not found")
+    return MongoJSONResponse({"vacation_id": vacation_id, "conflicts": vacation_team_conflicts(vacation)})
+
 @app.get("/api/admin/vacations")
-async def get_all_vacations(current_user: User = Depends(get_current_user)):
+async def get_all_vacations(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     """Alle Urlaubsanträge für Admin abrufen"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
     try:
-        vacations = await db.vacations.find().sort("created_at", -1).to_list(100)
-        # Clean up MongoDB ObjectId fields for JSON serialization
-        for vacation in vacations:
-            if "_id" in vacation:
-                del vacation["_id"]
-        return serialize_mongo_data(vacations)
+        vacations = await reads.vacations.find({}, NO_ID).sort("created_at", -1).to_list(100)
+        return MongoJSONResponse(vacations)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1877,16 +2836,16 @@ async def create_district(district_data: DistrictCreate, current_user: User = De
     district_dict['id'] = str(uuid.uuid4())
     district_dict['created_at'] = datetime.utcnow()
     
-    await db.districts.insert_one(district_dict)
+    await repos.districts.insert_one(district_dict)
     return district_dict
 
 @app.get("/api/admin/districts")
-async def get_districts(current_user: User = Depends(get_current_user)):
+async def get_districts(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     """Alle Bezirke abrufen"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    districts = await db.districts.find().to_list(100)
+    districts = await reads.districts.find().to_list(100)
     return districts
 
 @app.post("/api/admin/teams")
@@ -1901,17 +2860,18 @@ async def create_team(team_data: TeamCreate, current_user: User = Depends(get_cu
     team_dict['members'] = []
     team_dict['status'] = 'Einsatzbereit'
     
-    await db.teams.insert_one(team_dict)
+    await repos.teams.insert_one(team_dict)
+    change_roster(lambda target: target.set_team(team_dict))
     return team_dict
 
 @app.get("/api/admin/teams")
-async def get_teams(current_user: User = Depends(get_current_user)):
+async def get_teams(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     """Alle Teams abrufen"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    teams = await db.teams.find().to_list(100)
-    return serialize_mongo_data(teams)
+    teams = await reads.teams.find({}, NO_ID).to_list(100)
+    return MongoJSONResponse(teams)
 
 @app.put("/api/admin/assign-user")
 async def assign_user_to_team_district(assignment: TeamAssignment, current_user: User = Depends(get_current_user)):
@@ -1923,7 +2883,7 @@ async def assign_user_to_team_district(assignment: TeamAssignment, current_user:
     if assignment.team_id:
         update_data['patrol_team'] = assignment.team_id
         # User zu Team hinzufügen
-        await db.teams.update_one(
+        await repos.teams.update_one(
             {"id": assignment.team_id},
             {"$addToSet": {"members": assignment.user_id}}
         )
@@ -1932,7 +2892,7 @@ async def assign_user_to_team_district(assignment: TeamAssignment, current_user:
         update_data['assigned_district'] = assignment.district_id
     
     # Benutzer aktualisieren
-    result = await db.users.update_one(
+    result = await repos.users.update_one(
         {"id": assignment.user_id},
         {"$set": update_data}
     )
@@ -1940,31 +2900,76 @@ async def assign_user_to_team_district(assignment: TeamAssignment, current_user:
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    response_cache.bump("users")
+    await refresh_roster_team(assignment.team_id)
     return {"status": "success", "message": "User assigned successfully"}
 
+def parse_month(month: Optional[str]) -> str:
+    if not month:
+        return checkin_rollups.month_key(datetime.utcnow())
+    try:
+        return checkin_rollups.month_key(datetime.strptime(month, "%Y-%m"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid month, expected YYYY-MM")
+
+@app.get("/api/admin/analytics/attendance")
+async def get_monthly_attendance(month: Optional[str] = None, reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
+    """Monatliche Anwesenheit pro Benutzer aus den Check-In-Rollups"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    month = parse_month(month)
+    users = await checkin_rollups.monthly_attendance(reads, month)
+    return MongoJSONResponse({"month": month, "users": users})
+
+@app.get("/api/admin/analytics/attendance/{user_id}")
+async def get_user_attendance(user_id: str, month: Optional[str] = None, reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
+    """Tageswerte eines Benutzers (erster/letzter Check-In, Anzahl, Lücken) für einen Monat"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    month = parse_month(month)
+    summary = await checkin_rollups.monthly_attendance(reads, month, user_id)
+    days = await checkin_rollups.daily_attendance(reads, user_id, month)
+    return MongoJSONResponse({"month": month, "user_id": user_id, "summary": summary[0] if summary else None, "days": days})
+
+@app.post("/api/admin/analytics/rebuild")
+async def rebuild_checkin_rollups(since: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """Check-In-Rollups aus den Check-In-Dokumenten neu berechnen (Altdaten)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    try:
+        start = parse_date(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
+    if start:
+        # Immer ab Tagesbeginn, sonst fehlen frühere Check-Ins im Tages-Rollup
+        start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    processed = await checkin_rollups.rebuild(repos, start)
+    print(f"📊 Check-In-Rollups neu berechnet: {processed} Check-Ins")
+    return {"status": "success", "processed": processed}
+
 @app.get("/api/admin/attendance")
-async def get_attendance_list(current_user: User = Depends(get_current_user)):
+async def get_attendance_list(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     """Anwesenheitsliste für Admin abrufen"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
     try:
         # Alle Benutzer mit Status und Team-Info laden
-        users = await db.users.find().to_list(100)
+        users = await reads.users.find().to_list(100)
         attendance_list = []
         
         for user in users:
             # Team-Name abrufen falls zugewiesen
             team_name = "Nicht zugewiesen"
             if user.get("patrol_team"):
-                team = await db.teams.find_one({"id": user["patrol_team"]})
+                team = await reads.teams.find_one({"id": user["patrol_team"]})
                 if team:
                     team_name = team["name"]
             
             # Bezirks-Name abrufen falls zugewiesen  
             district_name = "Nicht zugewiesen"
             if user.get("assigned_district"):
-                district = await db.districts.find_one({"id": user["assigned_district"]})
+                district = await reads.districts.find_one({"id": user["assigned_district"]})
                 if district:
                     district_name = district["name"]
             
@@ -1986,13 +2991,13 @@ async def get_attendance_list(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/admin/team-status")
-async def get_team_status(current_user: User = Depends(get_current_user)):
+async def get_team_status(reads: repositories.Repositories = Depends(route_reads), current_user: User = Depends(get_current_user)):
     """Team-Status für Admin abrufen"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
     try:
-        teams = await db.teams.find().to_list(100)
+        teams = await reads.teams.find().to_list(100)
         team_status_list = []
         
         for team in teams:
@@ -2000,7 +3005,7 @@ async def get_team_status(current_user: User = Depends(get_current_user)):
             members = []
             if team.get("members"):
                 for member_id in team["members"]:
-                    user = await db.users.find_one({"id": member_id})
+                    user = await reads.users.find_one({"id": member_id})
                     if user:
                         members.append({
                             "id": user["id"],
@@ -2011,7 +3016,7 @@ async def get_team_status(current_user: User = Depends(get_current_user)):
             # Bezirks-Name abrufen
             district_name = "Nicht zugewiesen"
             if team.get("district_id"):
-                district = await db.districts.find_one({"id": team["district_id"]})
+                district = await reads.districts.find_one({"id": team["district_id"]})
                 if district:
                     district_name = district["name"]
             
@@ -2040,7 +3045,7 @@ async def update_team_status(team_id: str, status_data: dict, current_user: User
         if new_status not in ["Einsatzbereit", "Im Einsatz", "Pause", "Nicht verfügbar"]:
             raise HTTPException(status_code=400, detail="Invalid status")
         
-        result = await db.teams.update_one(
+        result = await repos.teams.update_one(
             {"id": team_id},
             {"$set": {"status": new_status}}
         )
@@ -2053,56 +3058,57 @@ async def update_team_status(team_id: str, status_data: dict, current_user: User
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ================================================
+# DATENBANK HEALTH & METRIKEN
+# ================================================
+
+@api_router.get("/health/db")
+async def database_health():
+    """Health-Probe für Load-Balancer - ohne Auth, nur Status und Latenz"""
+    health = await repos.health()
+    body = {"status": health["status"], "latency_ms": health["latency_ms"]}
+    if health["status"] != "ok":
+        return MongoJSONResponse(body, status_code=503)
+    return body
+
+@api_router.get("/admin/db/metrics")
+async def database_metrics(current_user: User = Depends(get_current_user)):
+    """Query-Latenzen, langsame Queries und Pool-Wartezeiten (Admin)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {**repos.metrics(), "health": await repos.health()}
+
 # Include router - MUST be after all endpoint definitions
 app.include_router(api_router)
 
-# Mount static files from frontend build
+# Web-Build (frontend/dist) aus einem Manifest, das im Lifespan-Startup entsteht (static_assets.py)
 FRONTEND_BUILD_DIR = Path(__file__).parent.parent / "frontend" / "dist"
-FRONTEND_STATIC_DIR = Path(__file__).parent.parent / "frontend" / "dist" / "_expo"
-
-if FRONTEND_BUILD_DIR.exists():
-    # Mount static assets
-    if FRONTEND_STATIC_DIR.exists():
-        app.mount("/_expo", StaticFiles(directory=str(FRONTEND_STATIC_DIR)), name="static")
-    
-    # Mount assets
-    assets_dir = FRONTEND_BUILD_DIR / "assets"
-    if assets_dir.exists():
-        app.mount("/assets", StaticFiles(directory=str(assets_dir)), name="assets")
-    
-    # Serve index.html for root
-    @app.get("/")
-    async def serve_index():
-        index_path = FRONTEND_BUILD_DIR / "index.html"
-        if index_path.exists():
-            return FileResponse(str(index_path))
-        return {"message": "Frontend not available"}
-    
-    # Serve frontend for all non-API routes
-    @app.get("/{full_path:path}")
-    async def serve_frontend(full_path: str):
-        """Serve the frontend application for all non-API routes"""
-        # Skip API routes
-        if full_path.startswith("api/"):
-            raise HTTPException(status_code=404, detail="API endpoint not found")
-        
-        # Check for specific files first
-        if full_path:
-            file_path = FRONTEND_BUILD_DIR / full_path
-            if file_path.is_file():
-                return FileResponse(str(file_path))
-        
-        # Serve index.html for SPA routes
-        index_path = FRONTEND_BUILD_DIR / "index.html"
-        if index_path.exists():
-            return FileResponse(str(index_path))
-        
-        # Fallback
-        return FileResponse(str(FRONTEND_BUILD_DIR / "index.html"))
-else:
-    @app.get("/")
-    async def root_no_frontend():
+ICON_FONTS_DIR = Path(__file__).parent.parent / "frontend" / "node_modules" / "@expo" / "vector-icons" / "build" / "vendor" / "react-native-vector-icons" / "Fonts"
+ICON_FONTS_PREFIX = "/assets/node_modules/@expo/vector-icons/build/vendor/react-native-vector-icons/Fonts"
+frontend_assets = static_assets.StaticAssets()
+
+async def serve_frontend(full_path: str, request: Request):
+    """Dateien aus dem Manifest - unbekannte Pfade bekommen index.html (SPA-Routing)"""
+    if full_path.startswith("api/"):
+        raise HTTPException(status_code=404, detail="API endpoint not found")
+    asset = frontend_assets.get("/" + full_path)
+    if asset is None:
+        # Fehlende Bundles und Assets nicht mit HTML beantworten
+        if full_path.startswith(("_expo/", "assets/")):
+            raise HTTPException(status_code=404, detail="Not found")
+        asset = frontend_assets.index
+    if asset is None:
         return {"message": "Frontend not built. Run 'npx expo export --platform web' first."}
+    return frontend_assets.response(asset, request)
+
+def mount_frontend():
+    """Manifest laden und den Catch-all nach allen API-Routen registrieren"""
+    count = frontend_assets.add_directory(FRONTEND_BUILD_DIR)
+    count += frontend_assets.add_directory(ICON_FONTS_DIR, ICON_FONTS_PREFIX)
+    app.add_api_route("/{full_path:path}", serve_frontend, methods=["GET", "HEAD"], include_in_schema=False)
+    if count:
+        print(f"✅ Frontend-Manifest: {count} Dateien ({FRONTEND_BUILD_DIR})")
+        app.state.static_precompress = asyncio.create_task(frontend_assets.precompress())
 
 # Health check endpoint
 @app.get("/api/health")
@@ -2130,7 +3136,8 @@ async def create_team(team_data: dict, current_user: User = Depends(get_current_
         }
         
         # Insert team
-        await db.teams.insert_one(team_dict)
+        await repos.teams.insert_one(team_dict)
+        await refresh_roster_team(team_dict["id"])
         
         print(f"✅ Team '{team_dict['name']}' erstellt von {current_user.username}")
         
@@ -2145,15 +3152,87 @@ async def create_team(team_data: dict, current_user: User = Depends(get_current_
 async def get_teams(current_user: User = Depends(get_current_user)):
     """Get all teams"""
     try:
-        teams = await db.teams.find().to_list(100)
+        teams = await repos.teams.find().to_list(100)
         return serialize_mongo_data(teams)
     except Exception as e:
         print(f"❌ Fehler beim Laden der Teams: {str(e)}")
         return []
 
-@app.on_event("shutdown")
+async def ensure_archive_report_index():
+    """Unique-Index auf reports.incident_id - Grundlage für die idempotente Vorfall-Abschließung
+
+    Bestehen noch doppelte Archiv-Berichte, schlägt das Anlegen fehl; bereinigt wird nur
+    explizit per init_database.py --dedupe-incident-reports.
+    """
+    try:
+        await repos.reports.create_index(
+            "incident_id", unique=True, partialFilterExpression={"incident_id": {"$type": "string"}}
+        )
+    except Exception as e:
+        print(f"❌ Unique-Index reports.incident_id konnte nicht angelegt werden: {e}")
+        print("   Doppelte Archiv-Berichte bereinigen: python init_database.py --dedupe-incident-reports")
+
+async def apply_sql_migrations():
+    """Versionierte Migrationen (sql_migrations.py) beim Start - ohne sie fehlen die zusammengesetzten Indizes
+
+    Starten mehrere Worker gleichzeitig, kann ein zweiter an der bereits eingetragenen
+    Version scheitern; ein erneuter Lauf sieht sie dann als angewendet.
+    """
+    import sql_migrations
+
+    try:
+        applied = await sql_migrations.migrate(repos.engine)
+    except Exception as e:
+        print(f"⚠️ Migration fehlgeschlagen, neuer Versuch: {e}")
+        try:
+            applied = await sql_migrations.migrate(repos.engine)
+        except Exception as e:
+            print(f"❌ SQL-Migrationen konnten nicht angewendet werden: {e}")
+            raise RuntimeError("pending SQL migrations could not be applied") from e
+    if applied:
+        print(f"🗄️ {len(applied)} SQL-Migration(en) angewendet")
+
+async def load_app_config_snapshot():
+    if not repos.is_mongo:
+        # SQL-Backend: Tabellen anlegen und offene Migrationen anwenden (u.a. Unique-Index der Rollups)
+        await apply_sql_migrations()
+        print(f"🗃️ Repositories mit {repos.backend} initialisiert")
+    else:
+        await ensure_archive_report_index()
+    try:
+        await app_config.reload(repos)
+    except Exception as e:
+        print(f"⚠️ App-Konfiguration konnte nicht vorgeladen werden: {e}")
+    app.state.search_sync = asyncio.create_task(run_search_sync())
+    app.state.roster_refresh = asyncio.create_task(run_roster_refresh())
+    app.state.check_in_watch = asyncio.create_task(run_check_in_watch())
+    if repos.is_mongo:
+        # Change-Events und Kalt-Archiv gibt es nur mit MongoDB
+        app.state.app_config_listener = asyncio.create_task(
+            app_config_store.listen_for_changes(db, reload_app_config)
+        )
+        app.state.report_archiving = asyncio.create_task(run_report_archiving())
+    try:
+        await checkin_rollups.ensure_indexes(repos)
+    except Exception as e:
+        print(f"⚠️ Indizes für Check-In-Rollups konnten nicht angelegt werden: {e}")
+    try:
+        backfilled = await person_duplicates.backfill_keys(repos.persons)
+        if backfilled:
+            print(f"👥 Dubletten-Keys für {backfilled} Personen nachgetragen")
+    except Exception as e:
+        print(f"⚠️ Dubletten-Keys konnten nicht nachgetragen werden: {e}")
+
 async def shutdown_db_client():
-    client.close()
+    for task_name in ("app_config_listener", "search_sync", "report_archiving", "roster_refresh", "check_in_watch",
+                      "static_precompress"):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
+    if repos.resolved:
+        await repos.close()
+    if client.resolved:
+        client.close()
 
 # Server starten
 if __name__ == "__main__":
@@ -0,0 +1,448 @@
+# 🗄️ Versionierte Schema-Migrationen für die SQL-Backends (MySQL, PostgreSQL, SQLite)
+# Dateien in backend/migrations:
+#   0001_beschreibung.sql              - SQL für alle Backends
+#   0001_beschreibung.postgresql.sql   - Variante nur für ein Backend (hat Vorrang)
+#   0002_beschreibung.districts.jsonl  - Seed-Daten, ein JSON-Objekt pro Zeile
+# Jede Version läuft in einer eigenen Transaktion zusammen mit ihrem Eintrag in
+# schema_migrations - schlägt ein Statement fehl, bleibt die Version offen.
+# (MySQL committet DDL implizit - dort nur Seeds und DML wirklich atomar.)
+
+import asyncio
+import hashlib
+import os
+import re
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import repositories
+
+MIGRATIONS_DIR = Path(os.getenv("MIGRATIONS_DIR", Path(__file__).parent / "migrations"))
+MIGRATIONS_TABLE = "schema_migrations"
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "5000"))
+DIALECTS = ("mysql", "postgresql", "sqlite")
+
+# Erste Zeile einer .sql-Datei: Statements ohne Transaktion ausführen (z.B. CREATE INDEX CONCURRENTLY)
+NO_TRANSACTION = "-- migrate:no-transaction"
+# Sperre gegen parallele Migrationsläufe (mehrere Worker/Deployments)
+LOCK_NAME = "stadtwache_migrations"
+LOCK_KEY = 734_121_045
+LOCK_TIMEOUT_SECONDS = 60
+
+_FILENAME = re.compile(r"^(\d+)_([A-Za-z0-9_\-]+?)(?:\.([A-Za-z0-9_]+))?\.(sql|jsonl)$")
+
+
+class MigrationError(Exception):
+    pass
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: Path
+    kind: str  # "sql" oder "seed"
+    table: Optional[str] = None
+    transactional: bool = True
+    checksum: str = ""
+
+    @property
+    def label(self) -> str:
+        return f"{self.version:04d}_{self.name}"
+
+
+# ================================================
+# SQL IN STATEMENTS ZERLEGEN
+# ================================================
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+_DOLLAR_TAG = re.compile(r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$")
+_DELIMITER = re.compile(r"[ \t]*DELIMITER[ \t]+(\S+)[ \t]*(?:\r?\n|$)", re.IGNORECASE)
+_ROUTINE = re.compile(
+    r"^\s*CREATE\s+(?:OR\s+REPLACE\s+)?(?:DEFINER\s*=\s*\S+\s+)?(?:TEMP(?:ORARY)?\s+)?"
+    r"(?:TRIGGER|PROCEDURE|FUNCTION|EVENT)\b",
+    re.IGNORECASE
+)
+_TRANSACTION_CONTROL = re.compile(r"^\s*(?:BEGIN|COMMIT|ROLLBACK|START\s+TRANSACTION|END)\s*(?:TRANSACTION|WORK)?\s*$",
+                                  re.IGNORECASE)
+# END IF / END LOOP / ... schließen Blöcke, die nicht mitgezählt werden
+_END_SUFFIXES = {"IF", "LOOP", "WHILE", "REPEAT"}
+
+
+def _quoted_end(script: str, start: int, quote: str, backslash: bool) -> int:
+    """Index hinter dem schließenden Anführungszeichen ('' bzw. "" gelten als Escape)"""
+    i = start + 1
+    while i < len(script):
+        ch = script[i]
+        if backslash and ch == "\\":
+            i += 2
+        elif ch == quote:
+            if script.startswith(quote, i + 1):
+                i += 2
+            else:
+                return i + 1
+        else:
+            i += 1
+    raise MigrationError(f"Nicht geschlossenes {quote} ab Zeichen {start}")
+
+
+def _skip_whitespace(script: str, i: int) -> int:
+    while i < len(script) and script[i].isspace():
+        i += 1
+    return i
+
+
+def split_statements(script: str, dialect: str = "sqlite") -> List[str]:
+    """SQL-Skript in einzelne Statements zerlegen
+
+    Beachtet String-Literale, Bezeichner in Anführungszeichen, Kommentare,
+    Dollar-Quoting (PostgreSQL), DELIMITER (MySQL-Client) und BEGIN ... END
+    in Triggern/Prozeduren. Kommentare werden entfernt.
+    """
+    statements: List[str] = []
+    current: List[str] = []
+    delimiter = ";"
+    depth = 0
+    line_start = True
+    backslash = dialect == "mysql"
+    i = 0
+
+    def flush():
+        nonlocal depth
+        statement = "".join(current).strip()
+        current.clear()
+        depth = 0
+        if statement:
+            statements.append(statement)
+
+    while i < len(script):
+        ch = script[i]
+        if line_start:
+            line_start = False
+            match = _DELIMITER.match(script, i)
+            if match and not "".join(current).strip():
+                delimiter = match.group(1)
+                i = match.end()
+                line_start = True
+                continue
+        if script.startswith("--", i) or (ch == "#" and dialect == "mysql"):
+            end = script.find("\n", i)
+            i = len(script) if end == -1 else end
+            continue
+        if script.startswith("/*", i):
+            end = script.find("*/", i + 2)
+            if end == -1:
+                raise MigrationError(f"Nicht geschlossener Kommentar ab Zeichen {i}")
+            current.append(" ")
+            i = end + 2
+            continue
+        if ch in "'\"`":
+            end = _quoted_end(script, i, ch, backslash and ch == "'")
+            current.append(script[i:end])
+            i = end
+            continue
+        if ch == "$" and dialect == "postgresql":
+            match = _DOLLAR_TAG.match(script, i)
+            if match:
+                end = script.find(match.group(0), match.end())
+                if end == -1:
+                    raise MigrationError(f"Nicht geschlossenes {match.group(0)} ab Zeichen {i}")
+                end += len(match.group(0))
+                current.append(script[i:end])
+                i = end
+                continue
+        if ch.isalpha() or ch == "_":
+            word = _WORD.match(script, i).group(0)
+            current.append(word)
+            i += len(word)
+            upper = word.upper()
+            if upper == "E" and dialect == "postgresql" and script.startswith("'", i):
+                # E'...' - String mit Backslash-Escapes
+                end = _quoted_end(script, i, "'", True)
+                current.append(script[i:end])
+                i = end
+            elif upper == "BEGIN" and _ROUTINE.match("".join(current)):
+                depth += 1
+            elif upper == "CASE" and depth:
+                depth += 1
+            elif upper == "END" and depth:
+                following = _WORD.match(script, _skip_whitespace(script, i))
+                suffix = following.group(0).upper() if following else ""
+                if suffix not in _END_SUFFIXES:
+                    depth -= 1
+                    if suffix == "CASE":
+                        # END CASE schließt genau einen Block
+                        current.append(script[i:following.end()])
+                        i = following.end()
+            continue
+        if script.startswith(delimiter, i) and (depth == 0 or delimiter != ";"):
+            flush()
+            i += len(delimiter)
+            continue
+        if ch == "\n":
+            line_start = True
+        current.append(ch)
+        i += 1
+    flush()
+    return statements
+
+
+# ================================================
+# MIGRATIONEN FINDEN
+# ================================================
+
+def discover(directory: Path = MIGRATIONS_DIR, dialect: str = "sqlite") -> List[Migration]:
+    """Migrationen für ein Backend, nach Version sortiert"""
+    versions: Dict[int, List[Migration]] = {}
+    for path in sorted(Path(directory).glob("*")) if Path(directory).is_dir() else []:
+        match = _FILENAME.match(path.name)
+        if not match:
+            continue
+        version, name, qualifier, extension = int(match.group(1)), match.group(2), match.group(3), match.group(4)
+        content = path.read_bytes()
+        if extension == "jsonl":
+            if not qualifier:
+                raise MigrationError(f"{path.name}: Seed-Dateien heißen <version>_<name>.<tabelle>.jsonl")
+            migration = Migration(version, name, path, "seed", table=qualifier)
+        else:
+            if qualifier and qualifier not in DIALECTS:
+                raise MigrationError(f"{path.name}: unbekanntes Backend {qualifier}")
+            if qualifier and qualifier != dialect:
+                continue
+            first_line = content.decode("utf-8").lstrip().split("\n", 1)[0].strip().lower()
+            migration = Migration(version, name, path, "sql", table=qualifier,
+                                  transactional=first_line != NO_TRANSACTION)
+        migration.checksum = hashlib.sha256(content).hexdigest()
+        versions.setdefault(version, []).append(migration)
+
+    migrations = []
+    for version, candidates in sorted(versions.items()):
+        # Backend-spezifische Datei vor der allgemeinen
+        candidates.sort(key=lambda m: m.kind != "sql" or m.table is None)
+        if len(candidates) > 1 and not (candidates[0].table == dialect and len(candidates) == 2
+                                        and candidates[1].kind == "sql"):
+            raise MigrationError(f"Version {version:04d} ist mehrfach vergeben: {[m.path.name for m in candidates]}")
+        migrations.append(candidates[0])
+    return migrations
+
+
+# ================================================
+# SEED-DATEN (COPY / executemany)
+# ================================================
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _seed_table(conn, table_name: str):
+    from sqlalchemy import MetaData, Table
+
+    if table_name in repositories.ENTITY_COLUMNS:
+        table = repositories.build_tables(MetaData())[table_name]
+        await conn.run_sync(lambda sync_conn: table.create(sync_conn, checkfirst=True))
+        return table
+    return await conn.run_sync(lambda sync_conn: Table(table_name, MetaData(), autoload_with=sync_conn))
+
+
+async def bulk_load(conn, table_name: str, rows: Iterable[Dict[str, Any]], batch_size: int = SEED_BATCH_SIZE) -> int:
+    """Zeilen in Batches einfügen - COPY bei PostgreSQL/asyncpg, sonst executemany
+
+    Für Repository-Tabellen (users, districts, ...) sind die Zeilen Dokumente,
+    sonst Spaltenwerte.
+    """
+    table = await _seed_table(conn, table_name)
+    columns = repositories.ENTITY_COLUMNS.get(table_name)
+    if columns is not None:
+        rows = (repositories.document_row(columns, doc) for doc in rows)
+    copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg"
+    count = 0
+    for batch in _batches(rows, batch_size):
+        if copy:
+            names = [column.name for column in table.columns if column.name in batch[0]]
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                table.name, records=[tuple(row.get(name) for name in names) for row in batch],
+                columns=names, schema_name=table.schema
+            )
+        else:
+            await conn.execute(table.insert(), batch)
+        count += len(batch)
+    return count
+
+
+def _read_seed(path: Path) -> Iterator[Dict[str, Any]]:
+    """JSON Lines wie beim Export ({"$date": ...} für Zeitstempel)"""
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield repositories.loads_document(line)
+            except ValueError as e:
+                raise MigrationError(f"{path.name}:{number}: {e}")
+
+
+# ================================================
+# RUNNER
+# ================================================
+
+def _history_table(metadata):
+    from sqlalchemy import Column, DateTime, Integer, String, Table
+
+    return Table(
+        MIGRATIONS_TABLE, metadata,
+        Column("version", Integer, primary_key=True, autoincrement=False),
+        Column("name", String(255), nullable=False),
+        Column("checksum", String(64), nullable=False),
+        Column("applied_at", DateTime, nullable=False),
+        Column("duration_ms", Integer),
+    )
+
+
+@asynccontextmanager
+async def _migration_lock(engine):
+    """Session-Lock auf einer eigenen Verbindung (SQLite serialisiert Schreiber selbst)"""
+    dialect = engine.dialect.name
+    if dialect not in ("postgresql", "mysql"):
+        yield
+        return
+    async with engine.connect() as conn:
+        if dialect == "postgresql":
+            await conn.exec_driver_sql(f"SELECT pg_advisory_lock({LOCK_KEY})")
+        else:
+            acquired = (await conn.exec_driver_sql(f"SELECT GET_LOCK('{LOCK_NAME}', {LOCK_TIMEOUT_SECONDS})")).scalar()
+            if acquired != 1:
+                raise MigrationError("Migrations-Lock nicht erhalten - läuft bereits eine Migration?")
+        await conn.commit()
+        try:
+            yield
+        finally:
+            if dialect == "postgresql":
+                await conn.exec_driver_sql(f"SELECT pg_advisory_unlock({LOCK_KEY})")
+            else:
+                await conn.exec_driver_sql(f"SELECT RELEASE_LOCK('{LOCK_NAME}')")
+            await conn.commit()
+
+
+async def _apply(conn, migration: Migration, dialect: str) -> int:
+    if migration.kind == "seed":
+        return await bulk_load(conn, migration.table, _read_seed(migration.path))
+    statements = split_statements(migration.path.read_text(encoding="utf-8"), dialect)
+    for statement in statements:
+        if _TRANSACTION_CONTROL.match(statement):
+            raise MigrationError(f"{migration.path.name}: {statement} - Transaktionen steuert der Runner")
+        try:
+            # exec_driver_sql: keine Auswertung von :name-Platzhaltern in Literalen
+            await conn.exec_driver_sql(statement)
+        except Exception as e:
+            raise MigrationError(f"{migration.path.name}: {' '.join(statement.split())[:120]} - {e}") from e
+    return len(statements)
+
+
+async def _applied_versions(engine, history) -> Dict[int, Any]:
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: history.create(sync_conn, checkfirst=True))
+        return {row.version: row for row in (await conn.execute(history.select())).all()}
+
+
+async def migrate(engine, directory: Path = MIGRATIONS_DIR, target: Optional[int] = None) -> List[Migration]:
+    """Repository-Tabellen anlegen und offene Migrationen der Reihe nach anwenden"""
+    from sqlalchemy import MetaData
+
+    dialect = engine.dialect.name
+    migrations = discover(directory, dialect)
+    history = _history_table(MetaData())
+    applied_now = []
+    async with _migration_lock(engine):
+        metadata = MetaData()
+        repositories.build_tables(metadata)
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+
+        applied = await _applied_versions(engine, history)
+        for migration in migrations:
+            row = applied.get(migration.version)
+            if row is not None and row.checksum != migration.checksum:
+                raise MigrationError(f"{migration.label} wurde nach dem Anwenden geändert (Checksumme)")
+        latest = max(applied, default=0)
+        pending = [m for m in migrations if m.version not in applied and (target is None or m.version <= target)]
+        for migration in pending:
+            if migration.version < latest:
+                raise MigrationError(f"{migration.label} ist älter als die angewendete Version {latest:04d}")
+
+        for migration in pending:
+            started = time.perf_counter()
+            entry = {"version": migration.version, "name": migration.name, "checksum": migration.checksum,
+                     "applied_at": datetime.utcnow()}
+            if migration.transactional:
+                async with engine.begin() as conn:
+                    # Eintrag zuerst: startet die Transaktion und blockiert parallele Läufe derselben Version
+                    await conn.execute(history.insert().values(**entry))
+                    count = await _apply(conn, migration, dialect)
+                    await conn.execute(
+                        history.update().where(history.c.version == migration.version)
+                        .values(duration_ms=int((time.perf_counter() - started) * 1000))
+                    )
+            else:
+                async with engine.connect() as conn:
+                    conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    count = await _apply(conn, migration, dialect)
+                    await conn.execute(history.insert().values(
+                        **entry, duration_ms=int((time.perf_counter() - started) * 1000)
+                    ))
+            unit = "Zeilen" if migration.kind == "seed" else "Statements"
+            print(f"✅ Migration {migration.label}: {count} {unit} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+            applied_now.append(migration)
+    return applied_now
+
+
+async def status(engine, directory: Path = MIGRATIONS_DIR) -> List[Dict[str, Any]]:
+    from sqlalchemy import MetaData
+
+    applied = await _applied_versions(engine, _history_table(MetaData()))
+    return [
+        {
+            "version": migration.version,
+            "name": migration.name,
+            "kind": migration.kind,
+            "applied_at": applied[migration.version].applied_at if migration.version in applied else None,
+            "changed": migration.version in applied and applied[migration.version].checksum != migration.checksum,
+        }
+        for migration in discover(directory, engine.dialect.name)
+    ]
+
+
+if __name__ == "__main__":
+    # python sql_migrations.py sqlite [status|migrate] [ziel-version]
+    from database_config import create_database_engine
+
+    async def main(db_type: str, command: str, target: Optional[int]):
+        engine = create_database_engine(db_type)
+        try:
+            if command == "status":
+                for entry in await status(engine):
+                    state = "geändert ⚠️" if entry["changed"] else (entry["applied_at"] or "offen")
+                    print(f"{entry['version']:04d}_{entry['name']} ({entry['kind']}): {state}")
+            else:
+                applied = await migrate(engine, target=target)
+                print(f"🎉 {len(applied)} Migration(en) angewendet")
+        finally:
+            await engine.dispose()
+
+    args = sys.argv[1:]
+    asyncio.run(main(
+        args[0] if args else os.getenv("DATABASE_TYPE", "sqlite"),
+        args[1] if len(args) > 1 else "migrate",
+        int(args[2]) if len(args) > 2 else None,
+    ))
@@ -0,0 +1,237 @@
+# 📦 Auslieferung des Web-Builds (frontend/dist) ohne CDN
+# Beim Start entsteht ein Manifest aller Dateien (URL -> Datei, Typ, ETag). Gehashte
+# Bundles werden ein Jahr "immutable" gecacht, index.html und ungehashte Dateien per
+# ETag revalidiert (304). Brotli-/Gzip-Varianten werden einmal vorberechnet (im
+# Hintergrund, wiederverwendet über STATIC_CACHE_DIR), kleine Dateien liegen im Speicher.
+
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+from response_cache import etag_matches
+
+try:
+    import brotli
+except ImportError:  # Brotli optional - dann nur Gzip
+    brotli = None
+
+STATIC_CACHE_DIR = Path(os.getenv("STATIC_CACHE_DIR", Path(tempfile.gettempdir()) / "stadtwache-static"))
+# Dateien bis zu dieser Größe (inkl. Varianten) im Speicher halten, insgesamt höchstens STATIC_MEMORY_BUDGET_BYTES
+STATIC_MEMORY_MAX_FILE_BYTES = int(os.getenv("STATIC_MEMORY_MAX_FILE_BYTES", str(64 * 1024)))
+STATIC_MEMORY_BUDGET_BYTES = int(os.getenv("STATIC_MEMORY_BUDGET_BYTES", str(32 * 1024 * 1024)))
+BROTLI_QUALITY = int(os.getenv("STATIC_BROTLI_QUALITY", "11"))
+GZIP_LEVEL = int(os.getenv("STATIC_GZIP_LEVEL", "9"))
+# Kleinere Dateien lohnen keine Kompression
+COMPRESS_MIN_BYTES = 1024
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Inhalts-Hash im Dateinamen (entry-3f2a9c1b.js, icon.5d41402abc4b2a76b9719d911017c592.png)
+_HASHED_NAME = re.compile(r"[.-][0-9a-f]{8,}\.[A-Za-z0-9]+$", re.IGNORECASE)
+# Expo legt gehashte Bundles unter _expo/static/ ab
+_HASHED_DIRS = ("/_expo/static/",)
+
+_COMPRESSIBLE_TYPES = {
+    "application/javascript", "application/json", "application/manifest+json", "application/wasm",
+    "application/xml", "image/svg+xml", "image/x-icon", "font/ttf", "font/otf", "application/vnd.ms-fontobject",
+    # Dynamische Antworten (response_compression): NDJSON-Exporte
+    "application/x-ndjson",
+}
+# Bevorzugte Reihenfolge bei gleicher Gewichtung im Accept-Encoding
+_ENCODINGS = ("br", "gzip")
+_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+mimetypes.add_type("application/json", ".map")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """Beste Kodierung aus Accept-Encoding (q-Werte, q=0 schließt aus) - None für unkomprimiert"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(media_type: str) -> bool:
+    media_type = media_type.split(";", 1)[0].strip()
+    return media_type.startswith("text/") or media_type in _COMPRESSIBLE_TYPES
+
+
+@dataclass
+class Asset:
+    path: Path
+    size: int
+    media_type: str
+    etag: str
+    immutable: bool
+    # Kodierung -> Datei bzw. Inhalt im Speicher (None = unkomprimiert)
+    files: Dict[Optional[str], Path] = field(default_factory=dict)
+    bodies: Dict[Optional[str], bytes] = field(default_factory=dict)
+
+    @property
+    def digest(self) -> str:
+        return self.etag.strip('"')
+
+    @property
+    def compressible(self) -> bool:
+        return self.size >= COMPRESS_MIN_BYTES and is_compressible(self.media_type)
+
+    def encodings(self):
+        return [encoding for encoding in _ENCODINGS if encoding in self.files or encoding in self.bodies]
+
+
+class StaticAssets:
+    """Manifest URL -> Asset, gebaut beim Start"""
+
+    def __init__(self, cache_dir: Path = STATIC_CACHE_DIR, memory_max_file: int = STATIC_MEMORY_MAX_FILE_BYTES,
+                 memory_budget: int = STATIC_MEMORY_BUDGET_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_max_file = memory_max_file
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self.assets: Dict[str, Asset] = {}
+        self.index: Optional[Asset] = None
+
+    def __len__(self):
+        return len(self.assets)
+
+    def get(self, url_path: str) -> Optional[Asset]:
+        return self.assets.get(url_path)
+
+    def _keep_in_memory(self, encoding: Optional[str], asset: Asset, data: bytes):
+        if len(data) <= self.memory_max_file and self.memory_used + len(data) <= self.memory_budget:
+            asset.bodies[encoding] = data
+            self.memory_used += len(data)
+
+    def add_directory(self, root: Path, prefix: str = "") -> int:
+        """Alle Dateien unter root als prefix/<relativer Pfad> aufnehmen (vorhandene URLs bleiben)"""
+        root = Path(root)
+        if not root.is_dir():
+            return 0
+        added = 0
+        for path in sorted(root.rglob("*")):
+            if not path.is_file():
+                continue
+            # Vom Build vorkomprimierte Geschwister (bundle.js.br) sind Varianten, keine eigenen URLs
+            if path.suffix in (".br", ".gz") and path.with_suffix("").is_file():
+                continue
+            url_path = f"{prefix.rstrip('/')}/{path.relative_to(root).as_posix()}"
+            if url_path in self.assets:
+                continue
+            self.assets[url_path] = self._load(path, url_path)
+            added += 1
+        if self.index is None and f"{prefix.rstrip('/')}/index.html" in self.assets:
+            self.index = self.assets[f"{prefix.rstrip('/')}/index.html"]
+        return added
+
+    def _load(self, path: Path, url_path: str) -> Asset:
+        digest = hashlib.blake2b(digest_size=16)
+        size = path.stat().st_size
+        data = None
+        if size <= self.memory_max_file:
+            data = path.read_bytes()
+            digest.update(data)
+        else:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+            media_type += "; charset=utf-8"
+        asset = Asset(
+            path=path, size=size, media_type=media_type, etag=f'"{digest.hexdigest()}"',
+            immutable=bool(_HASHED_NAME.search(path.name)) or any(url_path.startswith(d) for d in _HASHED_DIRS),
+            files={None: path},
+        )
+        if data is not None:
+            self._keep_in_memory(None, asset, data)
+        for encoding in _ENCODINGS:
+            sibling = path.with_name(path.name + _SUFFIXES[encoding])
+            if sibling.is_file():
+                asset.files[encoding] = sibling
+        return asset
+
+    # --- Vorkomprimierung ---------------------------------------------------
+
+    def _compress(self, asset: Asset):
+        data = asset.bodies.get(None)
+        for encoding in _ENCODINGS:
+            if encoding == "br" and brotli is None:
+                continue
+            target = asset.files.get(encoding) or self.cache_dir / f"{asset.digest}{_SUFFIXES[encoding]}"
+            if target.is_file():
+                encoded = target.read_bytes() if target.stat().st_size <= self.memory_max_file else None
+            else:
+                if data is None:
+                    data = asset.path.read_bytes()
+                if encoding == "br":
+                    encoded = brotli.compress(data, quality=BROTLI_QUALITY)
+                else:
+                    encoded = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+                if len(encoded) >= asset.size:
+                    continue  # bringt nichts
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                temporary = target.with_name(f".{target.name}.{os.getpid()}")
+                temporary.write_bytes(encoded)
+                os.replace(temporary, target)
+            asset.files[encoding] = target
+            if encoded is not None:
+                self._keep_in_memory(encoding, asset, encoded)
+
+    async def precompress(self):
+        """Brotli-/Gzip-Varianten im Thread-Pool erzeugen - bis dahin wird unkomprimiert ausgeliefert"""
+        count = 0
+        for asset in list(self.assets.values()):
+            if not asset.compressible:
+                continue
+            try:
+                await asyncio.to_thread(self._compress, asset)
+                count += 1
+            except OSError as e:
+                print(f"⚠️ Vorkomprimierung von {asset.path.name} fehlgeschlagen: {e}")
+        print(f"🗜️ Statische Dateien vorkomprimiert: {count} (Speicher-Cache {self.memory_used // 1024} KB)")
+
+    # --- Auslieferung -------------------------------------------------------
+
+    def response(self, asset: Asset, request: Request) -> Response:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), asset.encodings())
+        # Jede Kodierung hat ihren eigenen ETag, sonst verwechseln Caches die Varianten
+        etag = asset.etag if encoding is None else f'{asset.etag[:-1]}-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": IMMUTABLE if asset.immutable else REVALIDATE}
+        if asset.compressible:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        body = asset.bodies.get(encoding)
+        if body is not None:
+            return Response(content=body, media_type=asset.media_type, headers=headers)
+        return FileResponse(asset.files[encoding], media_type=asset.media_type, headers=headers)
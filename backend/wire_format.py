@@ -0,0 +1,316 @@
+# 📦 Kompaktes Wire-Format für Socket.IO Events
+# MessagePack mit Feld-IDs, Delta-Koordinaten und Diff-Updates für Vorfälle
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+try:
+    import msgpack
+except ImportError:  # msgpack ist optional - Fallback auf kompaktes JSON
+    msgpack = None
+
+# ================================================
+# FORMATE & FELD-IDS
+# ================================================
+
+FORMAT_JSON = "json"          # Standard: volle Python-Dicts (bisheriges Verhalten)
+FORMAT_COMPACT = "compact"    # Feld-IDs als Keys, JSON-Transport
+FORMAT_MSGPACK = "msgpack"    # Feld-IDs als Keys, binär via MessagePack
+
+SUPPORTED_FORMATS = (FORMAT_JSON, FORMAT_COMPACT, FORMAT_MSGPACK)
+
+# Koordinaten werden als Mikrograd (1e-6°, ~11 cm) übertragen
+COORD_SCALE = 1_000_000
+
+# Nach so vielen Deltas wird wieder ein absoluter Keyframe gesendet
+KEYFRAME_INTERVAL = 50
+
+LOCATION_FIELDS = {
+    "user_id": 0,
+    "location": 1,
+    "timestamp": 2,
+}
+
+MESSAGE_FIELDS = {
+    "id": 0,
+    "content": 1,
+    "sender_id": 2,
+    "sender_name": 3,
+    "recipient_id": 4,
+    "channel": 5,
+    "timestamp": 6,
+    "message_type": 7,
+    "created_at": 8,
+}
+
+INCIDENT_FIELDS = {
+    "id": 0,
+    "title": 1,
+    "description": 2,
+    "priority": 3,
+    "status": 4,
+    "location": 5,
+    "address": 6,
+    "reported_by": 7,
+    "assigned_to": 8,
+    "assigned_to_name": 9,
+    "assigned_at": 10,
+    "images": 11,
+    "created_at": 12,
+    "updated_at": 13,
+}
+
+# Reservierte Keys außerhalb der Feld-IDs
+KEY_EXTRA = "x"        # Felder ohne Feld-ID
+KEY_BASE = "b"         # updated_at (ms) des Stands, auf dem ein Diff aufbaut
+KEY_DIFF = "d"         # geänderte Felder eines Diffs
+KEY_REMOVED = "r"      # entfernte Felder eines Diffs
+
+
+def _encode_value(value):
+    """Datetimes als Epoch-Millisekunden, Rest unverändert"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            # Naive Zeitstempel sind im Projekt immer UTC (datetime.utcnow)
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return value
+
+
+def encode_fields(data: Dict[str, Any], field_ids: Dict[str, int]) -> Dict[Any, Any]:
+    """Dict mit Feldnamen in Dict mit Feld-IDs umwandeln"""
+    encoded = {}
+    extra = {}
+    for key, value in data.items():
+        if key == "_id":
+            continue
+        field_id = field_ids.get(key)
+        if field_id is None:
+            extra[key] = _encode_value(value)
+        else:
+            encoded[field_id] = _encode_value(value)
+    if extra:
+        encoded[KEY_EXTRA] = extra
+    return encoded
+
+
+def _quantize(location: Optional[Dict[str, Any]]) -> Optional[Tuple[int, int]]:
+    """lat/lng (oder latitude/longitude) in Mikrograd umrechnen"""
+    if not isinstance(location, dict):
+        return None
+    lat = location.get("lat", location.get("latitude"))
+    lng = location.get("lng", location.get("longitude"))
+    if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+        return None
+    return round(lat * COORD_SCALE), round(lng * COORD_SCALE)
+
+
+# ================================================
+# CLIENT-REGISTRY
+# ================================================
+
+class WireClient:
+    """Ausgehandeltes Format eines einzelnen Socket-Clients"""
+
+    __slots__ = ("format", "diff", "known_users")
+
+    def __init__(self, wire_format: str, diff: bool):
+        self.format = wire_format
+        self.diff = diff
+        # User-IDs, für die der Client bereits einen Keyframe erhalten hat
+        self.known_users = set()
+
+
+def negotiate(environ: Dict[str, Any], auth: Optional[Dict[str, Any]] = None) -> Tuple[str, bool]:
+    """Format aus Socket.IO auth-Payload oder Query-String lesen
+
+    Beispiel: io(url, {auth: {wire: "msgpack", diff: true}})
+    oder ?wire=msgpack&diff=1
+    """
+    requested = None
+    diff = False
+    if isinstance(auth, dict):
+        requested = auth.get("wire")
+        diff = bool(auth.get("diff", False))
+    if requested is None:
+        query = parse_qs(environ.get("QUERY_STRING", ""))
+        requested = (query.get("wire") or [None])[0]
+        diff = (query.get("diff") or ["0"])[0] in ("1", "true", "yes")
+
+    if requested not in SUPPORTED_FORMATS:
+        return FORMAT_JSON, False
+    if requested == FORMAT_MSGPACK and msgpack is None:
+        requested = FORMAT_COMPACT
+    return requested, diff
+
+
+class WireFormatRegistry:
+    """Verwaltet Client-Formate und kodiert Events pro Format genau einmal"""
+
+    def __init__(self):
+        self.clients: Dict[str, WireClient] = {}
+        # Letzte gesendete Position je User (Basis für Deltas)
+        self._last_coords: Dict[str, Tuple[int, int]] = {}
+        self._coord_sequence: Dict[str, int] = {}
+        # Letzter gesendeter Stand je Vorfall (Basis für Diffs)
+        self._incident_snapshots: Dict[str, Dict[Any, Any]] = {}
+
+    # ---------- Verbindungen ----------
+
+    def register(self, sid: str, wire_format: str, diff: bool = False):
+        if wire_format == FORMAT_JSON:
+            self.clients.pop(sid, None)
+            return
+        self.clients[sid] = WireClient(wire_format, diff)
+
+    def unregister(self, sid: str):
+        self.clients.pop(sid, None)
+
+    def compact_sids(self) -> List[str]:
+        return list(self.clients)
+
+    def forget_incident(self, incident_id: str):
+        self._incident_snapshots.pop(incident_id, None)
+
+    # ---------- Kodierung ----------
+
+    def pack(self, wire_format: str, payload: Dict[Any, Any]):
+        if wire_format == FORMAT_MSGPACK:
+            return msgpack.packb(payload, use_bin_type=True)
+        # JSON erlaubt nur String-Keys
+        return _stringify_keys(payload)
+
+    def _group(self, sids: List[str], build) -> List[Tuple[Any, List[str]]]:
+        """Clients nach (Format, Variante) gruppieren und jede Gruppe einmal kodieren"""
+        groups: Dict[Tuple[str, Any], List[str]] = {}
+        for sid in sids:
+            client = self.clients.get(sid)
+            if client is None:
+                continue
+            variant = build.variant(client)
+            groups.setdefault((client.format, variant), []).append(sid)
+
+        batches = []
+        for (wire_format, variant), group_sids in groups.items():
+            payload = build.payload(variant)
+            if payload is None:
+                continue
+            batches.append((self.pack(wire_format, payload), group_sids))
+        build.commit()
+        return batches
+
+    def encode_location(self, data: Dict[str, Any], sids: List[str]):
+        return self._group(sids, _LocationBuild(self, data))
+
+    def encode_message(self, data: Dict[str, Any], sids: List[str]):
+        return self._group(sids, _StaticBuild(encode_fields(data, MESSAGE_FIELDS)))
+
+    def encode_incident(self, data: Dict[str, Any], sids: List[str]):
+        return self._group(sids, _IncidentBuild(self, data))
+
+
+def _stringify_keys(payload):
+    if isinstance(payload, dict):
+        return {str(k): _stringify_keys(v) for k, v in payload.items()}
+    if isinstance(payload, list):
+        return [_stringify_keys(v) for v in payload]
+    return payload
+
+
+class _StaticBuild:
+    """Gleicher Payload für alle Clients"""
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def variant(self, client):
+        return None
+
+    def payload(self, variant):
+        return self._payload
+
+    def commit(self):
+        pass
+
+
+class _LocationBuild:
+    """Keyframe für Clients, die den User noch nicht kennen, sonst Delta"""
+
+    def __init__(self, registry: WireFormatRegistry, data: Dict[str, Any]):
+        self.registry = registry
+        self.user_id = data.get("user_id")
+        self.coords = _quantize(data.get("location"))
+        self.previous = registry._last_coords.get(self.user_id)
+        sequence = registry._coord_sequence.get(self.user_id, 0) + 1
+        self.keyframe_only = self.previous is None or sequence >= KEYFRAME_INTERVAL
+        self.sequence = 0 if self.keyframe_only else sequence
+        self.base = encode_fields(
+            {k: v for k, v in data.items() if k != "location"}, LOCATION_FIELDS
+        )
+        self.location = data.get("location")
+
+    def variant(self, client: WireClient):
+        if self.coords is None:
+            return "raw"
+        if self.keyframe_only or self.user_id not in client.known_users:
+            client.known_users.add(self.user_id)
+            return "key"
+        return "delta"
+
+    def payload(self, variant):
+        payload = dict(self.base)
+        field_id = LOCATION_FIELDS["location"]
+        if variant == "raw":
+            payload[field_id] = self.location
+        elif variant == "key":
+            payload[field_id] = [0, self.coords[0], self.coords[1]]
+        else:
+            payload[field_id] = [
+                1,
+                self.coords[0] - self.previous[0],
+                self.coords[1] - self.previous[1],
+            ]
+        return payload
+
+    def commit(self):
+        if self.coords is None:
+            return
+        self.registry._last_coords[self.user_id] = self.coords
+        self.registry._coord_sequence[self.user_id] = self.sequence
+
+
+class _IncidentBuild:
+    """Voller Vorfall oder nur geänderte Felder (Diff-Modus)"""
+
+    def __init__(self, registry: WireFormatRegistry, data: Dict[str, Any]):
+        self.registry = registry
+        self.incident_id = data.get("id")
+        self.full = encode_fields(data, INCIDENT_FIELDS)
+        self.previous = registry._incident_snapshots.get(self.incident_id)
+
+    def variant(self, client: WireClient):
+        if client.diff and self.previous is not None:
+            return "diff"
+        return "full"
+
+    def payload(self, variant):
+        if variant == "full":
+            return self.full
+        changed = {
+            key: value for key, value in self.full.items()
+            if key not in self.previous or self.previous[key] != value
+        }
+        removed = [key for key in self.previous if key not in self.full]
+        payload = {
+            INCIDENT_FIELDS["id"]: self.incident_id,
+            KEY_BASE: self.previous.get(INCIDENT_FIELDS["updated_at"]),
+            KEY_DIFF: changed,
+        }
+        if removed:
+            payload[KEY_REMOVED] = removed
+        return payload
+
+    def commit(self):
+        if self.incident_id:
+            self.registry._incident_snapshots[self.incident_id] = self.full
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Backend-Module (flach unter backend/) importierbar machen
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+# SQLite-Backend der Repository-Schicht in eine Wegwerf-Datenbank
+os.environ.setdefault("DATABASE_TYPE", "sqlite")
+os.environ.setdefault("SQLITE_DB", os.path.join(tempfile.mkdtemp(prefix="stadtwache-tests-"), "test.db"))
+
+
+@pytest.fixture
+def client():
+    """API-Client mit angemeldetem Admin, Datenbank wird danach geleert"""
+    from fastapi.testclient import TestClient
+
+    import server
+
+    with TestClient(server.app) as client:
+        client.post("/api/auth/register", json={"email": "admin@test.de", "username": "Admin",
+                                                "password": "pw", "role": "admin"})
+        token = client.post("/api/auth/login", json={"email": "admin@test.de", "password": "pw"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+        client.delete("/api/admin/reset-database")
@@ -0,0 +1,44 @@
+"""Check-In-Rollups (Neuaufbau und Monatsübersicht) gegen das SQLite-Backend"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import checkin_rollups
+import repositories
+
+
+@pytest.fixture
+def repos():
+    repos = repositories.create_repositories("sqlite")
+    asyncio.run(repos.create_schema())
+    yield repos
+    for name in ("users", "checkins", checkin_rollups.ROLLUP_COLLECTION):
+        asyncio.run(repos[name].delete_many({}))
+    asyncio.run(repos.close())
+
+
+def test_rebuild_and_monthly_attendance(repos):
+    asyncio.run(repos.users.insert_one({"id": "u1", "username": "Streife 1", "check_in_interval": 30}))
+    asyncio.run(repos.checkins.insert_many([
+        {"id": "c1", "user_id": "u1", "user_name": "Streife 1", "timestamp": datetime(2026, 3, 2, 8, 0)},
+        {"id": "c2", "user_id": "u1", "user_name": "Streife 1", "timestamp": datetime(2026, 3, 2, 8, 20)},
+        # 50 Minuten Abstand bei 30 Minuten Intervall: verspätet
+        {"id": "c3", "user_id": "u1", "user_name": "Streife 1", "timestamp": datetime(2026, 3, 2, 9, 10)},
+        {"id": "c4", "user_id": "u1", "user_name": "Streife 1", "timestamp": datetime(2026, 3, 3, 8, 0)},
+    ]))
+
+    # Kleine Batches: mehrere bulk_write-Aufrufe, derselbe Tag über Batch-Grenzen hinweg
+    assert asyncio.run(checkin_rollups.rebuild(repos, batch_size=2)) == 4
+    # Wiederholbar ohne doppelt zu zählen
+    assert asyncio.run(checkin_rollups.rebuild(repos, batch_size=2)) == 4
+
+    days = asyncio.run(checkin_rollups.daily_attendance(repos, "u1", "2026-03"))
+    assert [(day["day"], day["count"], day["late_check_ins"]) for day in days] == [
+        ("2026-03-02", 3, 1), ("2026-03-03", 1, 0)
+    ]
+    [row] = asyncio.run(checkin_rollups.monthly_attendance(repos, "2026-03"))
+    assert row["user_id"] == "u1"
+    assert row["days_present"] == 2 and row["check_ins"] == 4 and row["late_check_ins"] == 1
+    assert row["max_gap_seconds"] == 3000 and row["avg_gap_seconds"] == 2100.0
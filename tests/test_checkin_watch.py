@@ -0,0 +1,67 @@
+"""Zählen verpasster Check-Ins (checkin_watch.missed_filter) gegen das SQLite-Backend"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import checkin_watch
+import repositories
+
+
+@pytest.fixture
+def users():
+    repos = repositories.create_repositories("sqlite")
+    asyncio.run(repos.create_schema())
+    yield repos.users
+    asyncio.run(repos.users.delete_many({}))
+    asyncio.run(repos.close())
+
+
+def escalate(users, user_id, entry):
+    return asyncio.run(users.find_one_and_update(
+        checkin_watch.missed_filter(user_id, entry),
+        {"$inc": {"missed_check_ins": 1}, "$set": {"missed_check_in_deadline": entry["deadline"]}},
+        return_document=True
+    ))
+
+
+def tracked(last_check_in, minutes=30):
+    watch = checkin_watch.CheckInWatch()
+    watch.track("u1", "Streife 1", last_check_in, minutes)
+    return watch._entries["u1"]
+
+
+def test_on_duty_never_checked_in_is_counted(users):
+    # Dienstbeginn ohne Check-In: die Frist läuft ab "jetzt", last_check_in ist null
+    asyncio.run(users.insert_one({"id": "u1", "username": "Streife 1", "status": "Im Dienst",
+                                  "last_check_in": None, "missed_check_ins": 0}))
+    entry = tracked(None)
+    user = escalate(users, "u1", entry)
+    assert user is not None and user["missed_check_ins"] == 1
+    # Dieselbe Frist zählt nur einmal (auch über mehrere Worker)
+    assert escalate(users, "u1", entry) is None
+
+
+def test_missing_last_check_in_is_counted(users):
+    asyncio.run(users.insert_one({"id": "u1", "username": "Streife 1", "status": "Streife", "missed_check_ins": 0}))
+    user = escalate(users, "u1", tracked(None))
+    assert user is not None and user["missed_check_ins"] == 1
+
+
+def test_stale_check_in_is_counted_newer_is_not(users):
+    last = checkin_watch.as_stored(datetime.utcnow() - timedelta(minutes=45))
+    asyncio.run(users.insert_one({"id": "u1", "username": "Streife 1", "status": "Im Dienst",
+                                  "last_check_in": last, "missed_check_ins": 0}))
+    entry = tracked(last)
+    asyncio.run(users.update_one({"id": "u1"}, {"$set": {"last_check_in": last + timedelta(minutes=40)}}))
+    assert escalate(users, "u1", entry) is None
+    entry = tracked(last + timedelta(minutes=40))
+    entry["deadline"] = entry["deadline"] + timedelta(seconds=1)
+    assert escalate(users, "u1", entry)["missed_check_ins"] == 1
+
+
+def test_off_duty_is_not_counted(users):
+    asyncio.run(users.insert_one({"id": "u1", "username": "Streife 1", "status": "Pause",
+                                  "last_check_in": None, "missed_check_ins": 0}))
+    assert escalate(users, "u1", tracked(None)) is None
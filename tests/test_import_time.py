@@ -0,0 +1,36 @@
+"""Import-Budget für den Kaltstart (check_import_time.run_probe) als Teil der Test-Suite"""
+
+import os
+
+import pytest
+
+import check_import_time
+
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+
+@pytest.fixture(scope="module", params=["mongodb", "sqlite"])
+def probe(request):
+    """Bester von mehreren Läufen - ein einzelner langsamer Kaltstart soll nicht rot werden"""
+    best = None
+    for _ in range(check_import_time.RUNS):
+        result, modules, forbidden = check_import_time.run_probe(request.param)
+        assert result.returncode == 0, result.stderr[-2000:]
+        if best is None or modules["server"][1] < best[1]["server"][1]:
+            best = (result, modules, forbidden)
+    return best
+
+
+def test_server_import_within_budget(probe):
+    _, modules, _ = probe
+    assert modules["server"][1] / 1000 <= BUDGET_MS
+
+
+def test_no_heavy_modules_at_import(probe):
+    _, _, forbidden = probe
+    assert forbidden == []
+
+
+def test_no_output_at_import(probe):
+    result, _, _ = probe
+    assert result.stdout.strip() == ""
@@ -0,0 +1,15 @@
+"""Berichts-Ordner nach Jahr/Monat über die API gegen das SQLite-Backend"""
+
+import pytest
+
+
+@pytest.mark.parametrize("year, month", [(0, 1), (10000, 1), (-1, 5), (2026, 13), (2026, "Brumaire")])
+def test_invalid_folder_is_rejected(client, year, month):
+    assert client.get(f"/api/reports/folders/{year}/{month}").status_code == 400
+
+
+@pytest.mark.parametrize("year, month", [(1, 1), (9999, 12), (2026, "march")])
+def test_folder_at_calendar_bounds(client, year, month):
+    response = client.get(f"/api/reports/folders/{year}/{month}")
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
@@ -0,0 +1,409 @@
+"""Mongo-Semantik der Repository-Schicht (Filter, Updates, Projektion, Sortierung) und SqlRepository gegen SQLite"""
+
+import asyncio
+import re
+from datetime import datetime
+
+import pytest
+from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import repositories
+from repositories import apply_update, matches, project, sort_documents
+
+DOC = {
+    "id": "p1",
+    "status": "vermisst",
+    "age": 30,
+    "note": None,
+    "tags": ["a", "b"],
+    "address": {"city": "Schwelm", "zip": "58332"},
+    "created_at": datetime(2026, 1, 1, 12, 0),
+}
+
+
+# ================================================
+# FILTER
+# ================================================
+
+@pytest.mark.parametrize("query, expected", [
+    ({}, True),
+    ({"status": "vermisst"}, True),
+    ({"status": "gefunden"}, False),
+    # null passt auf null und auf fehlende Felder, aber nicht auf Werte
+    ({"note": None}, True),
+    ({"missing": None}, True),
+    ({"status": None}, False),
+    # Arrays: Element-Treffer oder exakt gleiches Array
+    ({"tags": "a"}, True),
+    ({"tags": "c"}, False),
+    ({"tags": ["a", "b"]}, True),
+    ({"tags": ["b", "a"]}, False),
+    # Punkt-Pfade
+    ({"address.city": "Schwelm"}, True),
+    ({"address.city.name": None}, True),
+    ({"address": {"city": "Schwelm", "zip": "58332"}}, True),
+    ({"age": {"$eq": 30}}, True),
+    ({"age": {"$ne": 30}}, False),
+    ({"missing": {"$ne": None}}, False),
+    ({"note": {"$ne": None}}, False),
+    ({"status": {"$ne": None}}, True),
+    ({"tags": {"$ne": "a"}}, False),
+    ({"status": {"$in": ["vermisst", "gefunden"]}}, True),
+    ({"missing": {"$in": [None, "x"]}}, True),
+    ({"tags": {"$in": ["c", "b"]}}, True),
+    ({"status": {"$nin": ["gefunden"]}}, True),
+    ({"tags": {"$nin": ["b"]}}, False),
+    ({"note": {"$exists": True}}, True),
+    ({"missing": {"$exists": True}}, False),
+    ({"missing": {"$exists": False}}, True),
+    ({"age": {"$gt": 29, "$lte": 30}}, True),
+    ({"age": {"$gte": 31}}, False),
+    ({"age": {"$lt": 31}}, True),
+    ({"created_at": {"$gte": datetime(2026, 1, 1), "$lt": datetime(2026, 1, 2)}}, True),
+    # Vergleiche nur innerhalb desselben Typs, null und fehlende Felder nie
+    ({"age": {"$gt": "10"}}, False),
+    ({"note": {"$lt": 1}}, False),
+    ({"missing": {"$gte": 0}}, False),
+    ({"tags": {"$gt": "a"}}, True),
+    ({"status": {"$regex": "^VER", "$options": "i"}}, True),
+    ({"status": {"$regex": "^VER"}}, False),
+    ({"status": re.compile("miss")}, True),
+    ({"tags": {"$regex": "^b$"}}, True),
+    ({"age": {"$regex": "3"}}, False),
+    ({"status": {"$type": "string"}}, True),
+    ({"age": {"$type": "string"}}, False),
+    ({"note": {"$type": "null"}}, True),
+    ({"missing": {"$type": "null"}}, False),
+    ({"created_at": {"$type": "date"}}, True),
+    ({"tags": {"$type": "array"}}, True),
+    ({"status": {"$not": {"$regex": "^ge"}}}, True),
+    ({"age": {"$not": {"$gt": 20}}}, False),
+    ({"missing": {"$not": {"$gt": 20}}}, True),
+    ({"$or": [{"status": "gefunden"}, {"age": 30}]}, True),
+    ({"$or": [{"status": "gefunden"}, {"age": 31}]}, False),
+    ({"$and": [{"status": "vermisst"}, {"age": 30}]}, True),
+    ({"$and": [{"status": "vermisst"}, {"age": 31}]}, False),
+    ({"$nor": [{"status": "gefunden"}, {"age": 31}]}, True),
+    ({"$nor": [{"status": "vermisst"}]}, False),
+    ({"$or": [{"missing": None}], "status": "vermisst"}, True),
+])
+def test_matches(query, expected):
+    assert matches(DOC, query) is expected
+
+
+def test_unsupported_query_operator_raises():
+    with pytest.raises(ValueError):
+        matches(DOC, {"tags": {"$size": 2}})
+
+
+# ================================================
+# UPDATES
+# ================================================
+
+def updated(update, doc=None, inserting=False):
+    doc = dict(doc if doc is not None else {"id": "d1", "count": 1, "tags": ["a"], "nested": {"x": 1, "y": 2}})
+    apply_update(doc, update, inserting=inserting)
+    return doc
+
+
+def test_set_and_unset():
+    doc = updated({"$set": {"name": "A", "nested.z": 3, "new.deep": 1}, "$unset": {"nested.x": "", "absent.path": ""}})
+    assert doc["name"] == "A" and doc["new"] == {"deep": 1}
+    assert doc["nested"] == {"y": 2, "z": 3}
+
+
+def test_set_on_insert_only_when_inserting():
+    assert "created" not in updated({"$setOnInsert": {"created": 1}})
+    assert updated({"$setOnInsert": {"created": 1}}, inserting=True)["created"] == 1
+
+
+def test_inc_starts_from_zero():
+    doc = updated({"$inc": {"count": 2, "missing": 5, "nested.x": -1}})
+    assert (doc["count"], doc["missing"], doc["nested"]["x"]) == (3, 5, 0)
+    assert updated({"$inc": {"count": 1}}, {"count": None})["count"] == 1
+
+
+def test_min_and_max():
+    doc = updated({"$min": {"count": 0, "low": 7}, "$max": {"nested.y": 1, "high": 9}})
+    assert (doc["count"], doc["low"], doc["nested"]["y"], doc["high"]) == (0, 7, 2, 9)
+    first, later = datetime(2026, 1, 1), datetime(2026, 1, 2)
+    assert updated({"$min": {"at": later}}, {"at": first})["at"] == first
+    assert updated({"$max": {"at": later}}, {"at": first})["at"] == later
+
+
+def test_push_add_to_set_and_pull():
+    assert updated({"$push": {"tags": "a"}})["tags"] == ["a", "a"]
+    assert updated({"$push": {"tags": {"$each": ["b", "c"]}, "new": 1}})["tags"] == ["a", "b", "c"]
+    assert updated({"$push": {"new": 1}})["new"] == [1]
+    assert updated({"$addToSet": {"tags": {"$each": ["a", "b"]}}})["tags"] == ["a", "b"]
+    assert updated({"$pull": {"tags": "a", "missing": "a"}})["tags"] == []
+
+
+def test_update_rejects_replacement_and_unknown_operators():
+    with pytest.raises(ValueError):
+        updated({"name": "A"})
+    with pytest.raises(ValueError):
+        updated({"$rename": {"count": "total"}})
+
+
+# ================================================
+# PROJEKTION UND SORTIERUNG
+# ================================================
+
+def test_projection():
+    doc = {"_id": 1, **DOC}
+    assert project(doc, {"status": 1, "address.city": 1}) == {"_id": 1, "status": "vermisst", "address": {"city": "Schwelm"}}
+    assert project(doc, {"_id": 0, "id": 1, "missing": 1}) == {"id": "p1"}
+    excluded = project(doc, {"_id": 0, "tags": 0, "address.zip": 0})
+    assert "_id" not in excluded and "tags" not in excluded and excluded["address"] == {"city": "Schwelm"}
+    assert project(doc, None) == doc and project(doc, None) is not doc
+
+
+def test_sort_orders_types_like_mongodb():
+    docs = [{"id": "date", "v": datetime(2026, 1, 1)}, {"id": "str", "v": "a"}, {"id": "missing"},
+            {"id": "num", "v": 2}, {"id": "null", "v": None}, {"id": "num1", "v": 1}]
+    assert [doc["id"] for doc in sort_documents(list(docs), [("v", 1)])][2:] == ["num1", "num", "str", "date"]
+    assert [doc["id"] for doc in sort_documents(list(docs), [("v", -1)])][:4] == ["date", "str", "num", "num1"]
+
+
+def test_sort_by_several_fields():
+    docs = [{"a": 1, "b": 1}, {"a": 2, "b": 1}, {"a": 1, "b": 2}]
+    assert sort_documents(docs, [("a", 1), ("b", -1)]) == [{"a": 1, "b": 2}, {"a": 1, "b": 1}, {"a": 2, "b": 1}]
+
+
+# ================================================
+# SQLITE-BACKEND
+# ================================================
+
+PERSONS = [
+    {"id": f"p{i}", "status": status, "is_active": i % 4 != 0, "age": age, "tags": tags,
+     "created_at": datetime(2026, 1, 1 + i)}
+    for i, (status, age, tags) in enumerate([
+        ("vermisst", 30, ["a"]), ("gefunden", 41, ["b"]), ("vermisst", None, []),
+        ("gesucht", 25, ["a", "b"]), ("vermisst", 52, ["c"]), ("gefunden", 30, ["a"]),
+        ("vermisst", 19, ["b", "c"]), ("gesucht", 33, ["a"]),
+    ])
+]
+# Ein Altdokument ohne Spaltenwerte (Status fehlt)
+PERSONS.append({"id": "legacy", "age": 60, "tags": ["a"]})
+
+
+@pytest.fixture
+def repos():
+    repos = repositories.create_repositories("sqlite")
+    asyncio.run(repos.create_schema())
+    yield repos
+    for name in ("persons", "users", "checkin_rollups"):
+        asyncio.run(repos[name].delete_many({}))
+    asyncio.run(repos.close())
+
+
+@pytest.fixture
+def persons(repos):
+    asyncio.run(repos.persons.insert_many([dict(person) for person in PERSONS]))
+    return repos.persons
+
+
+def ids(docs):
+    return [doc["id"] for doc in docs]
+
+
+QUERIES = [
+    {},
+    {"status": "vermisst"},
+    {"status": None},
+    {"is_active": True},
+    {"status": {"$in": ["vermisst", "gesucht"]}},
+    {"status": {"$in": ["vermisst", None]}},
+    {"created_at": {"$gte": datetime(2026, 1, 3), "$lt": datetime(2026, 1, 7)}},
+    {"id": {"$in": ["p1", "p3", "nope"]}},
+    {"status": {"$ne": "vermisst"}},
+    {"age": {"$gte": 30}},
+    {"tags": "a"},
+    {"status": "vermisst", "age": {"$lt": 40}},
+    {"status": "vermisst", "tags": {"$in": ["c"]}},
+    {"$or": [{"status": "gesucht"}, {"age": None}]},
+    {"is_active": True, "$nor": [{"tags": "b"}]},
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_sql_pushdown_matches_python_filter(persons, query):
+    expected = sorted(person["id"] for person in PERSONS if matches(person, query))
+    assert sorted(ids(asyncio.run(persons.find(query).to_list(None)))) == expected
+    assert asyncio.run(persons.count_documents(query)) == len(expected)
+
+
+def test_split_pushes_column_conditions_only(repos):
+    split = repos.persons._split
+    assert split({"status": "vermisst", "created_at": {"$gte": datetime(2026, 1, 1)}, "id": "p1"})[1] == {}
+    # Nicht-Spalten, null und nicht übersetzbare Operatoren bleiben für Python
+    for query in ({"age": 30}, {"status": None}, {"status": {"$ne": "x"}},
+                  {"status": {"$in": ["x", None]}}, {"created_at": {"$gte": "2026-01-01"}}, {"$or": [{"status": "x"}]}):
+        conditions, residual = split(query)
+        assert conditions == [] and residual == query
+    conditions, residual = split({"status": "vermisst", "age": {"$gt": 20}})
+    assert len(conditions) == 1 and residual == {"age": {"$gt": 20}}
+
+
+@pytest.mark.parametrize("query, sort, skip, limit", [
+    ({}, [("created_at", 1)], 2, 3),
+    ({"status": "vermisst"}, [("created_at", -1)], 1, 2),
+    # Rest-Filter: skip/limit zählen erst passende Dokumente
+    ({"age": {"$gte": 25}}, [("created_at", 1)], 1, 3),
+    ({"tags": "a"}, [("id", -1)], 0, 2),
+    # Sortierung ohne Spalte läuft im Speicher
+    ({"status": {"$ne": None}}, [("age", -1), ("id", 1)], 2, 4),
+    ({}, [("age", 1)], 0, None),
+])
+def test_cursor_sort_skip_limit_and_stream(persons, query, sort, skip, limit):
+    expected = [person for person in PERSONS if matches(person, query)]
+    expected = sort_documents(expected, sort)[skip:skip + limit if limit is not None else None]
+
+    cursor = persons.find(query).sort(sort).skip(skip)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    assert ids(asyncio.run(cursor.to_list(None))) == ids(expected)
+
+    async def streamed(batch_size):
+        return [doc async for doc in persons._stream(query, sort, skip, limit, None, batch_size=batch_size)]
+
+    # Kleine Batches: Treffer über mehrere Partitionen verteilt
+    assert ids(asyncio.run(streamed(2))) == ids(expected)
+
+    async def iterated():
+        cursor = persons.find(query, {"_id": 0, "id": 1}).sort(sort).skip(skip)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [doc async for doc in cursor]
+
+    assert asyncio.run(iterated()) == [{"id": doc["id"]} for doc in expected]
+
+
+def test_to_list_length_caps_limit(persons):
+    assert len(asyncio.run(persons.find({}).limit(5).to_list(3))) == 3
+    assert len(asyncio.run(persons.find({}).limit(2).to_list(3))) == 2
+
+
+def test_documents_round_trip(repos):
+    doc = {"id": "x", "status": "vermisst", "created_at": datetime(2026, 5, 1, 8, 30, 15, 123000),
+           "nested": {"at": datetime(2026, 5, 2)}, "tags": ["a"], "none": None}
+    asyncio.run(repos.persons.insert_one(dict(doc)))
+    assert asyncio.run(repos.persons.find_one({"id": "x"}, {"_id": 0})) == doc
+
+
+def test_update_many_keeps_columns_in_sync(persons):
+    result = asyncio.run(persons.update_many({"status": "gefunden"}, {"$set": {"status": "erledigt"}, "$inc": {"visits": 1}}))
+    assert (result.matched_count, result.modified_count) == (2, 2)
+    assert sorted(ids(asyncio.run(persons.find({"status": "erledigt"}).to_list(None)))) == ["p1", "p5"]
+    assert asyncio.run(persons.count_documents({"status": "gefunden"})) == 0
+    # Unveränderte Dokumente zählen nicht als modified
+    result = asyncio.run(persons.update_many({"status": "erledigt"}, {"$set": {"status": "erledigt"}}))
+    assert (result.matched_count, result.modified_count) == (2, 0)
+
+
+def test_upsert_builds_document_from_filter_equalities(repos):
+    rollups = repos.checkin_rollups
+    result = asyncio.run(rollups.update_one(
+        {"user_id": "u1", "day": "2026-03-02", "count": {"$gte": 0}},
+        {"$setOnInsert": {"month": "2026-03"}, "$inc": {"count": 1}},
+        upsert=True
+    ))
+    assert result.upserted_id is not None and result.matched_count == 0
+    doc = asyncio.run(rollups.find_one({"user_id": "u1"}, {"_id": 0}))
+    assert doc == {"user_id": "u1", "day": "2026-03-02", "month": "2026-03", "count": 1}
+    # Zweiter Upsert trifft das Dokument - $setOnInsert greift nicht mehr
+    result = asyncio.run(rollups.update_one(
+        {"user_id": "u1", "day": "2026-03-02"},
+        {"$setOnInsert": {"month": "changed"}, "$inc": {"count": 1}},
+        upsert=True
+    ))
+    assert result.upserted_id is None and result.matched_count == 1
+    assert asyncio.run(rollups.find_one({"month": "2026-03"}))["count"] == 2
+
+
+def test_find_one_and_update_returns_before_or_after(persons):
+    before = asyncio.run(persons.find_one_and_update({"id": "p0"}, {"$inc": {"age": 1}}, projection={"_id": 0, "age": 1}))
+    after = asyncio.run(persons.find_one_and_update({"id": "p0"}, {"$inc": {"age": 1}}, projection={"_id": 0, "age": 1},
+                                                    return_document=True))
+    assert (before, after) == ({"age": 30}, {"age": 32})
+    assert asyncio.run(persons.find_one_and_update({"id": "nope"}, {"$set": {"age": 1}})) is None
+    created = asyncio.run(persons.find_one_and_update({"id": "new"}, {"$set": {"age": 1}}, upsert=True, return_document=True))
+    assert created["id"] == "new" and created["age"] == 1
+
+
+def test_replace_one(persons):
+    asyncio.run(persons.replace_one({"id": "p0"}, {"id": "p0", "status": "gefunden"}))
+    assert asyncio.run(persons.find_one({"id": "p0"}, {"_id": 0})) == {"id": "p0", "status": "gefunden"}
+    assert asyncio.run(persons.replace_one({"id": "nope"}, {"id": "nope"})).matched_count == 0
+    assert asyncio.run(persons.replace_one({"id": "nope"}, {"id": "nope"}, upsert=True)).upserted_id is not None
+    assert asyncio.run(persons.count_documents({"id": "nope"})) == 1
+
+
+def test_delete(persons):
+    assert asyncio.run(persons.delete_one({"status": "vermisst"})).deleted_count == 1
+    assert asyncio.run(persons.delete_many({"age": {"$gte": 30}})).deleted_count == 5
+    assert asyncio.run(persons.count_documents({})) == 3
+
+
+def user(email):
+    return {"id": email, "email": email, "username": email}
+
+
+def test_insert_one_duplicate_raises(repos):
+    asyncio.run(repos.users.insert_one(user("a@x.de")))
+    with pytest.raises(DuplicateKeyError):
+        asyncio.run(repos.users.insert_one(user("a@x.de")))
+
+
+def test_insert_many_ordered_stops_at_first_duplicate(repos):
+    asyncio.run(repos.users.insert_one(user("b@x.de")))
+    with pytest.raises(BulkWriteError) as error:
+        asyncio.run(repos.users.insert_many([user("a@x.de"), user("b@x.de"), user("c@x.de")]))
+    details = error.value.details
+    assert details["nInserted"] == 1 and [e["index"] for e in details["writeErrors"]] == [1]
+    assert all(e["code"] == 11000 for e in details["writeErrors"])
+    assert sorted(ids(asyncio.run(repos.users.find({}).to_list(None)))) == ["a@x.de", "b@x.de"]
+
+
+def test_insert_many_unordered_inserts_the_rest(repos):
+    asyncio.run(repos.users.insert_one(user("b@x.de")))
+    with pytest.raises(BulkWriteError) as error:
+        asyncio.run(repos.users.insert_many([user("a@x.de"), user("b@x.de"), user("c@x.de"), user("c@x.de")],
+                                            ordered=False))
+    details = error.value.details
+    assert details["nInserted"] == 2 and [e["index"] for e in details["writeErrors"]] == [1, 3]
+    assert sorted(ids(asyncio.run(repos.users.find({}).to_list(None)))) == ["a@x.de", "b@x.de", "c@x.de"]
+
+
+def test_insert_many_without_duplicates(repos):
+    result = asyncio.run(repos.users.insert_many([user("a@x.de"), user("b@x.de")]))
+    assert result.inserted_ids == ["a@x.de", "b@x.de"]
+    assert asyncio.run(repos.users.insert_many([])).inserted_ids == []
+
+
+def test_bulk_write(repos):
+    asyncio.run(repos.users.insert_one(user("a@x.de")))
+    result = asyncio.run(repos.users.bulk_write([
+        InsertOne(user("b@x.de")),
+        UpdateOne({"email": "a@x.de"}, {"$set": {"role": "admin"}}),
+        UpdateOne({"email": "c@x.de"}, {"$set": {"username": "c"}}, upsert=True),
+        ReplaceOne({"email": "b@x.de"}, {**user("b@x.de"), "role": "police"}),
+        DeleteOne({"email": "nope"}),
+    ]))
+    assert (result.inserted_count, result.matched_count, result.modified_count, result.upserted_count) == (1, 2, 2, 1)
+    assert list(result.upserted_ids) == [2]
+    assert asyncio.run(repos.users.find_one({"email": "c@x.de"}, {"_id": 0})) == {"email": "c@x.de", "username": "c"}
+    assert asyncio.run(repos.users.count_documents({"role": {"$in": ["admin", "police"]}})) == 2
+
+
+def test_bulk_write_collects_duplicates(repos):
+    asyncio.run(repos.users.insert_one(user("a@x.de")))
+    requests = [InsertOne(user("a@x.de")), InsertOne(user("b@x.de"))]
+    with pytest.raises(BulkWriteError) as error:
+        asyncio.run(repos.users.bulk_write(requests))
+    assert error.value.details["nInserted"] == 0
+    with pytest.raises(BulkWriteError) as error:
+        asyncio.run(repos.users.bulk_write(requests, ordered=False))
+    assert error.value.details["nInserted"] == 1 and [e["index"] for e in error.value.details["writeErrors"]] == [0]
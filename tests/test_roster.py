@@ -0,0 +1,61 @@
+"""Dienstplan laden und lokale Änderungen während des Neuladens (SQLite-Backend)"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import repositories
+import roster
+import server
+
+
+@pytest.fixture
+def repos():
+    repos = repositories.create_repositories("sqlite")
+    asyncio.run(repos.create_schema())
+    yield repos
+    for name in ("teams", "shifts", "vacations"):
+        asyncio.run(repos[name].delete_many({}))
+    asyncio.run(repos.close())
+
+
+def vacation(vacation_id, end, **fields):
+    return {"id": vacation_id, "user_id": "u1", "status": "approved", **fields,
+            "start_date": (end - timedelta(days=3)).date().isoformat(), "end_date": end.date().isoformat()}
+
+
+def test_load_roster_skips_old_vacations(repos):
+    now = datetime.utcnow()
+    old = now - timedelta(days=roster.ROSTER_VACATION_HISTORY_DAYS + 10)
+    asyncio.run(repos.vacations.insert_many([
+        vacation("recent", now, start_at=now - timedelta(days=3), end_at=now),
+        vacation("old", old, start_at=old - timedelta(days=3), end_at=old),
+        # Altdaten ohne geparstes Intervall
+        vacation("legacy-recent", now),
+        vacation("legacy-old", old),
+        vacation("pending", now, status="pending"),
+    ]))
+    loaded = asyncio.run(roster.load_roster(repos))
+    assert set(loaded.vacations) == {"recent", "legacy-recent"}
+
+
+def test_shift_added_during_reload_is_kept(monkeypatch):
+    start = datetime.utcnow() + timedelta(hours=1)
+    shift = {"id": "s1", "team_id": "t1", "district_id": "d1", "start_time": start, "end_time": start + timedelta(hours=8)}
+
+    async def slow_load(db):
+        # Ein lokaler Request legt die Schicht an, während der Worker noch lädt
+        server.change_roster(lambda target: target.add_shift(shift))
+        return roster.Roster()
+
+    async def stop(_):
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(roster, "load_roster", slow_load)
+    monkeypatch.setattr(asyncio, "sleep", stop)
+    monkeypatch.setattr(server, "duty_roster", roster.Roster())
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(server.run_roster_refresh())
+    assert "s1" in server.duty_roster.shifts
+    assert server.roster_changes is None
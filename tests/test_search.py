@@ -0,0 +1,33 @@
+"""Volltextsuche über die API (/api/search) gegen das SQLite-Backend"""
+
+import asyncio
+
+import server
+
+
+def archive(report_id):
+    # Wie report_archive.archive_old_reports: ins Archiv kopieren, aus dem heißen Bestand löschen
+    async def move():
+        report = await server.repos.reports.find_one({"id": report_id}, {"_id": 0})
+        await server.repos["reports_archive"].insert_one(report)
+        await server.repos.reports.delete_one({"id": report_id})
+    asyncio.run(move())
+
+
+def test_archived_report_stays_searchable(client):
+    report = client.post("/api/reports", json={"title": "Nachtschicht Hafen", "content": "Schlägerei am Kai",
+                                               "shift_date": "2026-01-01"}).json()
+    archive(report["id"])
+
+    response = client.get("/api/search", params={"q": "Hafen", "types": "reports"})
+    assert response.status_code == 200
+    assert [hit["id"] for hit in response.json()["results"]] == [report["id"]]
+
+
+def test_deleted_report_drops_out_of_search(client):
+    report = client.post("/api/reports", json={"title": "Frühschicht Markt", "content": "Taschendiebstahl",
+                                               "shift_date": "2026-01-02"}).json()
+    asyncio.run(server.repos.reports.delete_one({"id": report["id"]}))
+
+    response = client.get("/api/search", params={"q": "Markt", "types": "reports"})
+    assert response.json()["results"] == []
@@ -0,0 +1,24 @@
+"""Schichten und Dienstplan über die API gegen das SQLite-Backend"""
+
+import pytest
+
+
+@pytest.fixture
+def team(client):
+    return client.post("/api/admin/teams", json={"name": "Streife Nord"}).json()
+
+
+@pytest.mark.parametrize("start_time, end_time", [
+    ("", "2026-03-01T14:00:00"),
+    ("2026-03-01T06:00:00", ""),
+])
+def test_missing_shift_time_is_rejected(client, team, start_time, end_time):
+    response = client.post("/api/shifts", json={"team_id": team["id"], "district_id": "d1",
+                                                "start_time": start_time, "end_time": end_time})
+    assert response.status_code == 400
+
+
+def test_shift_end_before_start_is_rejected(client, team):
+    response = client.post("/api/shifts", json={"team_id": team["id"], "district_id": "d1",
+                                                "start_time": "2026-03-01T14:00:00", "end_time": "2026-03-01T06:00:00"})
+    assert response.status_code == 400
@@ -0,0 +1,21 @@
+"""Registrierung und Benutzer-Import legen gleich aufgebaute Benutzer an (SQLite-Backend)"""
+
+import asyncio
+
+import server
+
+
+def stored_user(email):
+    return asyncio.run(server.repos.users.find_one({"email": email}, {"_id": 0}))
+
+
+def test_registered_and_imported_users_have_the_same_fields(client):
+    client.post("/api/auth/register", json={"email": "neu@test.de", "username": "Neu", "password": "pw"})
+    response = client.post("/api/admin/import/users", headers={"Content-Type": "application/x-ndjson"},
+                           content=b'{"email": "import@test.de", "username": "Import", "password": "pw"}\n')
+    assert response.json()["imported"] == 1
+
+    registered, imported = stored_user("neu@test.de"), stored_user("import@test.de")
+    assert set(registered) == set(imported)
+    assert imported["status"] == "Im Dienst" and imported["is_active"] is True
+    assert server.verify_password("pw", imported["hashed_password"])